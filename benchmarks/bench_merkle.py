@@ -0,0 +1,115 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Micro benchmarks for merkle tree reduction.
+
+Compares the list based reduction that `merkle_root` used to perform with
+the in place `MerkleTree` engine at 1K, 64K and 1M leaves.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from hashlib import sha256
+
+from torrentfile.hasher import MerkleTree
+
+SIZES = [2**10, 2**16, 2**20]
+
+
+def list_root(blocks: list) -> bytes:
+    """
+    Reduce a list of hashes one level at a time with new lists.
+
+    Parameters
+    ----------
+    blocks : list
+        leaf hashes
+
+    Returns
+    -------
+    bytes
+        merkle root
+    """
+    while len(blocks) > 1:
+        blocks = [sha256(x + y).digest() for x, y in zip(*[iter(blocks)] * 2)]
+    return blocks[0]
+
+
+def buffer_root(leaves: bytes) -> bytes:
+    """
+    Reduce a contiguous buffer of hashes in place.
+
+    Parameters
+    ----------
+    leaves : bytes
+        concatenated leaf hashes
+
+    Returns
+    -------
+    bytes
+        merkle root
+    """
+    return MerkleTree.from_leaves(bytearray(leaves)).root
+
+
+def measure(func, arg) -> tuple:
+    """
+    Measure the time and peak traced memory of func(arg).
+
+    Returns
+    -------
+    tuple
+        seconds elapsed, peak KiB allocated and the result.
+    """
+    start = time.perf_counter()
+    func(arg)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024, result
+
+
+def main(sizes: list = None):
+    """
+    Run the benchmark and print a table of results.
+
+    Parameters
+    ----------
+    sizes : list
+        leaf counts to benchmark.
+    """
+    print(f"{'leaves':>9}{'engine':>8}{'ms':>10}{'peak KiB':>12}")
+    for count in sizes or SIZES:
+        leaves = os.urandom(32 * count)
+        blocks = [leaves[i:i + 32] for i in range(0, len(leaves), 32)]
+        results = []
+        for name, func, arg in [("list", list_root, blocks),
+                                ("buffer", buffer_root, leaves)]:
+            elapsed, peak, root = measure(func, arg)
+            results.append(root)
+            print(f"{count:>9}{name:>8}{elapsed * 1000:>10.1f}{peak:>12.1f}")
+        assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,139 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Compare time and Python allocations of the hasher io modes.
+
+Allocations are measured with `tracemalloc`, which only sees memory
+allocated by Python objects, so data copied into new `bytes` or
+`bytearray` objects shows up while memory mapped pages do not.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+from torrentfile.hasher import FileHasher, Hasher, HasherV2
+from torrentfile.mixins import ProgMixin
+from torrentfile.reader import IO_MODES
+
+
+def make_file(directory: str, size: int) -> str:
+    """
+    Write a file of random data to directory.
+
+    Parameters
+    ----------
+    directory : str
+        parent directory
+    size : int
+        size of the file in bytes
+
+    Returns
+    -------
+    str
+        path to the file
+    """
+    path = os.path.join(directory, "bench.bin")
+    with open(path, "wb") as binfile:
+        remaining = size
+        while remaining:
+            chunk = min(remaining, 2**22)
+            binfile.write(os.urandom(chunk))
+            remaining -= chunk
+    return path
+
+
+def run_hasher(name: str, path: str, piece_length: int, io_mode: str):
+    """
+    Hash path with the named hasher class.
+
+    Parameters
+    ----------
+    name : str
+        one of "v1", "v2" or "hybrid"
+    path : str
+        file to hash
+    piece_length : int
+        piece length for hashing
+    io_mode : str
+        io mode passed to the hasher
+    """
+    kws = {"progress": 2, "progress_bar": ProgMixin.NoProg()}
+    kws["io_mode"] = io_mode
+    if name == "v1":
+        for _ in Hasher([path], piece_length, **kws):
+            pass
+    elif name == "v2":
+        HasherV2(path, piece_length, **kws)
+    else:
+        for _ in FileHasher(path, piece_length, hybrid=True, **kws):
+            pass
+
+
+def measure(name: str, path: str, piece_length: int, io_mode: str) -> dict:
+    """
+    Measure elapsed time and traced allocations for a single run.
+
+    Returns
+    -------
+    dict
+        results of the measurement.
+    """
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    run_hasher(name, path, piece_length, io_mode)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run_hasher(name, path, piece_length, io_mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "hasher": name,
+        "io_mode": io_mode,
+        "MB/s": size / elapsed / 2**20,
+        "peak_kib": peak / 1024,
+    }
+
+
+def main(size: int = 2**28, piece_length: int = 2**20):
+    """
+    Run the benchmark and print a table of results.
+
+    Parameters
+    ----------
+    size : int
+        size of the generated file
+    piece_length : int
+        piece length used for hashing
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_file(directory, size)
+        header = f"{'hasher':<8}{'io_mode':<10}{'MB/s':>10}{'peak KiB':>12}"
+        print(header)
+        for name in ["v1", "v2", "hybrid"]:
+            for io_mode in IO_MODES:
+                result = measure(name, path, piece_length, io_mode)
+                print(f"{name:<8}{io_mode:<10}{result['MB/s']:>10.1f}"
+                      f"{result['peak_kib']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
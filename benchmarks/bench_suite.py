@@ -0,0 +1,316 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Benchmark creating, rechecking and rebuilding torrents of generated content.
+
+Every workload runs for each dataset shape and meta version in a freshly
+spawned process, so the peak resident set size reported for it is its
+own.  Results are printed as a table and can be written as JSON, along
+with the commit they were measured at, and two JSON files compared::
+
+    python -m benchmarks.bench_suite run --scale 0.01 -o new.json
+    python -m benchmarks.bench_suite compare old.json new.json
+
+See `benchmarks.dataset` for the shapes of content.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.dataset import SHAPES, generate
+
+try:
+    import resource
+except ImportError:  # pragma: nocover
+    resource = None
+
+WORKLOADS = ("create", "recheck", "rebuild")
+VERSIONS = ("1", "2", "3")
+
+
+def peak_rss() -> float:
+    """
+    Return the peak resident set size of this process in KiB.
+
+    Returns
+    -------
+    float
+        peak memory, or None where it can not be measured.
+    """
+    if resource is None:  # pragma: nocover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # pragma: nocover
+        return peak / 1024
+    return float(peak)
+
+
+def run_workload(workload: str, content: str, metafile: str,
+                 meta_version: str, scratch: str) -> dict:
+    """
+    Run a single workload and measure it, called in a new process.
+
+    Parameters
+    ----------
+    workload : str
+        one of `WORKLOADS`.
+    content : str
+        path to the content.
+    metafile : str
+        path of the torrent, written by create and read by the others.
+    meta_version : str
+        meta version of the torrent.
+    scratch : str
+        directory rebuild copies content to.
+
+    Returns
+    -------
+    dict
+        seconds elapsed and peak resident set size in KiB.
+    """
+    # pylint: disable=import-outside-toplevel
+    from torrentfile.rebuild import Assembler
+    from torrentfile.recheck import Checker
+    from torrentfile.torrent import TorrentAssembler, TorrentFile
+
+    with open(os.devnull, "wt", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            if workload == "create":
+                if meta_version == "1":
+                    torrent = TorrentFile(path=content, outfile=metafile)
+                else:
+                    torrent = TorrentAssembler(path=content,
+                                               meta_version=meta_version,
+                                               outfile=metafile)
+                torrent.write()
+            elif workload == "recheck":
+                Checker(metafile, content).results()
+            else:
+                dest = os.path.join(scratch, "rebuild")
+                Assembler([metafile], [content], dest).assemble_torrents()
+            elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "peak_rss_kib": peak_rss()}
+
+
+def measure(workload: str, dataset, meta_version: str, scratch: str) -> dict:
+    """
+    Run a workload in a new process and return its results.
+
+    Parameters
+    ----------
+    workload : str
+        one of `WORKLOADS`.
+    dataset : Dataset
+        the content.
+    meta_version : str
+        meta version of the torrent.
+    scratch : str
+        directory for torrents and rebuilt content.
+
+    Returns
+    -------
+    dict
+        the measurements of the workload.
+    """
+    name = f"{dataset.shape}-v{meta_version}.torrent"
+    metafile = os.path.join(scratch, name)
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+        result = pool.submit(run_workload, workload, dataset.path, metafile,
+                             meta_version, scratch).result()
+    shutil.rmtree(os.path.join(scratch, "rebuild"), ignore_errors=True)
+    seconds = max(result["seconds"], 1e-9)
+    return {
+        "workload": workload,
+        "shape": dataset.shape,
+        "meta_version": meta_version,
+        "files": dataset.files,
+        "bytes": dataset.size,
+        "seconds": result["seconds"],
+        "MB/s": dataset.size / seconds / 2**20,
+        "files/s": dataset.files / seconds,
+        "peak_rss_kib": result["peak_rss_kib"],
+    }
+
+
+def commit() -> str:
+    """
+    Return the git commit of the working tree, if there is one.
+
+    Returns
+    -------
+    str
+        the commit hash, or None.
+    """
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"],
+                                cwd=os.path.dirname(__file__),
+                                capture_output=True,
+                                check=True,
+                                text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def run(args) -> dict:
+    """
+    Run the selected workloads and return the report.
+
+    Parameters
+    ----------
+    args : Namespace
+        command line arguments.
+
+    Returns
+    -------
+    dict
+        settings of the run and list of results.
+    """
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "sparse": not args.random,
+        "results": [],
+    }
+    root = args.data or tempfile.mkdtemp(prefix="torrentfile-bench-")
+    scratch = tempfile.mkdtemp(prefix="torrentfile-scratch-")
+    print(f"{'shape':<7}{'ver':>4}{'workload':>10}{'MB/s':>10}"
+          f"{'files/s':>12}{'peak KiB':>12}")
+    try:
+        for shape in args.shapes:
+            dataset = generate(shape, root, args.scale, not args.random)
+            for version in args.versions:
+                # recheck and rebuild read the torrent create writes
+                for workload in WORKLOADS:
+                    if workload not in args.workloads and workload != "create":
+                        continue
+                    result = measure(workload, dataset, version, scratch)
+                    if workload not in args.workloads:
+                        continue
+                    report["results"].append(result)
+                    print(f"{shape:<7}{version:>4}{workload:>10}"
+                          f"{result['MB/s']:>10.1f}"
+                          f"{result['files/s']:>12.1f}"
+                          f"{result['peak_rss_kib'] or 0:>12.0f}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        if not args.data:
+            shutil.rmtree(root, ignore_errors=True)
+    if args.output:
+        with open(args.output, "wt", encoding="utf-8") as fd:
+            json.dump(report, fd, indent=2)
+    return report
+
+
+def compare(args) -> list:
+    """
+    Print the change in throughput and memory between two reports.
+
+    Parameters
+    ----------
+    args : Namespace
+        command line arguments.
+
+    Returns
+    -------
+    list
+        tuples of workload key, old and new MB/s.
+    """
+    reports = []
+    for path in (args.old, args.new):
+        with open(path, "rt", encoding="utf-8") as fd:
+            report = json.load(fd)
+        reports.append({(result["shape"], result["meta_version"],
+                         result["workload"]): result
+                        for result in report["results"]})
+    old, new = reports
+    print(f"{'shape':<7}{'ver':>4}{'workload':>10}{'old MB/s':>10}"
+          f"{'new MB/s':>10}{'change':>9}{'RSS change':>12}")
+    rows = []
+    for key in old:
+        if key not in new:
+            continue
+        before, after = old[key], new[key]
+        change = (after["MB/s"] / max(before["MB/s"], 1e-9) - 1) * 100
+        rss = ""
+        if before["peak_rss_kib"] and after["peak_rss_kib"]:
+            ratio = after["peak_rss_kib"] / before["peak_rss_kib"]
+            rss = f"{(ratio - 1) * 100:+.1f}%"
+        print(f"{key[0]:<7}{key[1]:>4}{key[2]:>10}{before['MB/s']:>10.1f}"
+              f"{after['MB/s']:>10.1f}{change:>+8.1f}%{rss:>12}")
+        rows.append((key, before["MB/s"], after["MB/s"]))
+    return rows
+
+
+def main(args: list = None):
+    """
+    Run or compare benchmarks from the command line.
+
+    Parameters
+    ----------
+    args : list
+        command line arguments.
+    """
+    parser = argparse.ArgumentParser(prog="benchmarks.bench_suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--shapes",
+                            nargs="+",
+                            choices=SHAPES,
+                            default=list(SHAPES))
+    run_parser.add_argument("--versions",
+                            nargs="+",
+                            choices=VERSIONS,
+                            default=list(VERSIONS))
+    run_parser.add_argument("--workloads",
+                            nargs="+",
+                            choices=WORKLOADS,
+                            default=list(WORKLOADS))
+    run_parser.add_argument("--scale", type=float, default=0.01)
+    run_parser.add_argument("--random",
+                            action="store_true",
+                            help="write random content, not sparse files")
+    run_parser.add_argument("--data",
+                            help="directory generated content is kept in")
+    run_parser.add_argument("-o", "--output", help="path of the JSON report")
+    run_parser.set_defaults(func=run)
+    compare_parser = commands.add_parser("compare",
+                                         help="compare two JSON reports")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.set_defaults(func=compare)
+    values = parser.parse_args(sys.argv[1:] if args is None else args)
+    values.func(values)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Generate synthetic content for the benchmark suite.
+
+Each shape describes a layout of files at scale 1.0, the file counts and
+sizes are multiplied by the scale so the same shapes can be run quickly on
+a laptop or at full size on a benchmark machine:
+
+- ``huge``: a single 4GiB file.
+- ``tiny``: a million files of up to 4KiB in 1000 directories.
+- ``mixed``: 10000 files from 1KiB to 16MiB, log uniformly distributed.
+- ``deep``: 100000 files of up to 1MiB, 8 to 64 directories deep.
+
+Layouts are generated from a seed, so they are the same between runs and
+commits.  By default files are created sparse with `truncate`, which is
+cheap even for large datasets, since the hashes of the content do not
+matter to the benchmarks.  Sparse files read as zeros without touching
+the disk, so ``random`` content can be written to measure disk bound
+workloads.  A dataset is only generated again when its settings change.
+
+Can be run directly::
+
+    python -m benchmarks.dataset mixed /tmp/bench --scale 0.01
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+from typing import NamedTuple
+
+SHAPES = ("huge", "tiny", "mixed", "deep")
+
+
+class Dataset(NamedTuple):
+    """
+    Generated benchmark content.
+
+    Parameters
+    ----------
+    shape : str
+        name of the shape.
+    path : str
+        path to the content directory.
+    files : int
+        number of files.
+    size : int
+        total size of the files.
+    """
+
+    shape: str
+    path: str
+    files: int
+    size: int
+
+
+def _count(number: int, scale: float) -> int:
+    """
+    Scale a file count, keeping at least one file.
+    """
+    return max(int(number * scale), 1)
+
+
+def layout(shape: str, scale: float = 1.0, seed: int = 0) -> list:
+    """
+    Return the relative paths and sizes of the files of a shape.
+
+    Parameters
+    ----------
+    shape : str
+        one of `SHAPES`.
+    scale : float
+        multiplier for the number and size of files.
+    seed : int
+        seed of the random layout.
+
+    Returns
+    -------
+    list
+        tuples of relative path and size.
+    """
+    rng = random.Random(f"{shape}-{seed}")
+    files = []
+    if shape == "huge":
+        files.append(("huge.bin", max(int(2**32 * scale), 1)))
+    elif shape == "tiny":
+        for i in range(_count(10**6, scale)):
+            path = os.path.join(f"d{i % 1000:03}", f"f{i}.txt")
+            files.append((path, rng.randint(0, 2**12)))
+    elif shape == "mixed":
+        for i in range(_count(10**4, scale)):
+            size = int(2**rng.uniform(10, 24))
+            files.append((os.path.join(f"d{i % 16}", f"f{i}.bin"), size))
+    elif shape == "deep":
+        for i in range(_count(10**5, scale)):
+            depth = rng.randint(8, 64)
+            parts = [f"l{rng.randint(0, 3)}" for _ in range(depth)]
+            size = rng.randint(0, 2**20)
+            files.append((os.path.join(*parts, f"f{i}.bin"), size))
+    else:
+        raise ValueError(f"unknown shape {shape}, choose from {SHAPES}")
+    return files
+
+
+def generate(shape: str,
+             root: str,
+             scale: float = 1.0,
+             sparse: bool = True,
+             seed: int = 0) -> Dataset:
+    """
+    Create the files of a shape under root, unless they already exist.
+
+    Parameters
+    ----------
+    shape : str
+        one of `SHAPES`.
+    root : str
+        directory the content directory is created in.
+    scale : float
+        multiplier for the number and size of files.
+    sparse : bool
+        create sparse files instead of writing random data.
+    seed : int
+        seed of the random layout.
+
+    Returns
+    -------
+    Dataset
+        the generated content.
+    """
+    path = os.path.join(root, shape)
+    settings = {"scale": scale, "sparse": sparse, "seed": seed}
+    record = os.path.join(root, shape + ".json")
+    if os.path.exists(record):
+        with open(record, "rt", encoding="utf-8") as fd:
+            saved = json.load(fd)
+        if saved["settings"] == settings:
+            return Dataset(shape, path, saved["files"], saved["size"])
+    shutil.rmtree(path, ignore_errors=True)
+    files = layout(shape, scale, seed)
+    for relpath, size in files:
+        filepath = os.path.join(path, relpath)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "wb") as binfile:
+            if sparse:
+                binfile.truncate(size)
+            else:
+                _write_random(binfile, size)
+    total = sum(size for _, size in files)
+    with open(record, "wt", encoding="utf-8") as fd:
+        json.dump({
+            "settings": settings,
+            "files": len(files),
+            "size": total
+        }, fd)
+    return Dataset(shape, path, len(files), total)
+
+
+def _write_random(binfile, size: int):
+    """
+    Write size bytes of random data.
+    """
+    while size:
+        chunk = min(size, 2**22)
+        binfile.write(os.urandom(chunk))
+        size -= chunk
+
+
+def main(args: list = None):
+    """
+    Generate datasets from the command line.
+
+    Parameters
+    ----------
+    args : list
+        command line arguments.
+    """
+    parser = argparse.ArgumentParser(prog="benchmarks.dataset")
+    parser.add_argument("shapes", nargs="+", choices=SHAPES)
+    parser.add_argument("root")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--random", action="store_true")
+    values = parser.parse_args(sys.argv[1:] if args is None else args)
+    for shape in values.shapes:
+        dataset = generate(shape, values.root, values.scale,
+                           not values.random, values.seed)
+        print(f"{dataset.shape:<8}{dataset.files:>10} files"
+              f"{dataset.size / 2**20:>12.1f} MiB  {dataset.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,30 +19,29 @@
 #ifndef HASHER_H
 #define HASHER_H
 
+#include <stddef.h>
 #include <stdint.h>
-
-typedef uint8_t uint8;
-
-typedef struct {
-    uint8 *ptr;
-    int size;
-    int allocated;
-    int logical;
-} HASH;
-
-typedef struct { // Hash Result Object
-    uint8 *piece_layer;
-    uint8 *pieces_root;
-} HASHV2;
-
-typedef struct { // Hash Result Object
-    uint8 *piece_layerV3;
-    uint8 *pieces_root;
-    uint8 *hashv1;
-} HASHHYBRID;
-
-HASH *HASHER(char **filelist, unsigned piece_length);
-HASHV2 *HasherV2(char *path, unsigned piece_length);
-HASHHYBRID *HasherHybrid(char *path, unsigned piece_length);
+#include "sha.h"
+
+#define BLOCKSIZE 16384
+#define HASHSIZE 32
+#define V1HASHSIZE 20
+#define MAXLEVEL 64
+
+typedef struct {  // Incremental merkle tree, one pending node per level
+    uint8 nodes[MAXLEVEL][HASHSIZE];
+    uint64_t count;
+    int level;
+} MERKLE;
+
+void HasherInit(void);
+const uint8 *ZeroRoot(int level);
+void SHA256Digest(uint8 *hash, const uint8 *data, size_t len);
+void MerkleInit(MERKLE *tree, int level);
+void MerkleAdd(MERKLE *tree, const uint8 *leaf);
+void MerkleRoot(const MERKLE *tree, uint64_t width, uint8 *root);
+void PieceRoot(const uint8 *data, size_t len, uint64_t width, uint8 *root);
+void LayerRoot(const uint8 *layer, size_t count, uint64_t width, int level,
+               uint8 *root);
 
 #endif
@@ -0,0 +1,142 @@
+/*
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+*/
+
+
+/*
+ * torrentfile._hasher
+ *
+ * CPython bindings for the block hashing and merkle tree routines in
+ * hasher.c.  The GIL is released while hashing so several threads can hash
+ * pieces at the same time.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include "hasher.h"
+
+
+static int
+check_width(uint64_t width, uint64_t count)
+{
+    if (!width || (width & (width - 1)) || width < count) {
+        PyErr_Format(PyExc_ValueError,
+                     "width %llu must be a power of 2 covering %llu leaves",
+                     (unsigned long long)width, (unsigned long long)count);
+        return -1;
+    }
+    return 0;
+}
+
+
+PyDoc_STRVAR(piece_root_doc,
+"piece_root(data, width)\n--\n\n"
+"Hash 16KiB blocks of data and return their merkle root padded to width.");
+
+static PyObject *
+piece_root(PyObject *module, PyObject *args)
+{
+    Py_buffer data;
+    unsigned long long width;
+    uint8 root[HASHSIZE];
+    if (!PyArg_ParseTuple(args, "y*K:piece_root", &data, &width))
+        return NULL;
+    uint64_t count = (data.len + BLOCKSIZE - 1) / BLOCKSIZE;
+    if (check_width(width, count) < 0) {
+        PyBuffer_Release(&data);
+        return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    PieceRoot(data.buf, data.len, width, root);
+    Py_END_ALLOW_THREADS
+    PyBuffer_Release(&data);
+    return PyBytes_FromStringAndSize((const char *)root, HASHSIZE);
+}
+
+
+PyDoc_STRVAR(merkle_root_doc,
+"merkle_root(layer, width, level=0)\n--\n\n"
+"Return the merkle root of concatenated 32 byte hashes padded to width\n"
+"with zero subtrees of height level.");
+
+static PyObject *
+merkle_root(PyObject *module, PyObject *args)
+{
+    Py_buffer layer;
+    unsigned long long width;
+    int level = 0;
+    uint8 root[HASHSIZE];
+    if (!PyArg_ParseTuple(args, "y*K|i:merkle_root", &layer, &width, &level))
+        return NULL;
+    uint64_t count = layer.len / HASHSIZE;
+    if (layer.len % HASHSIZE) {
+        PyErr_SetString(PyExc_ValueError,
+                        "layer length must be a multiple of 32");
+        PyBuffer_Release(&layer);
+        return NULL;
+    }
+    if (check_width(width, count) < 0) {
+        PyBuffer_Release(&layer);
+        return NULL;
+    }
+    int top = 0;
+    while (((uint64_t)1 << top) < width)
+        top++;
+    if (level < 0 || level + top >= MAXLEVEL) {
+        PyErr_Format(PyExc_ValueError, "level %d out of range", level);
+        PyBuffer_Release(&layer);
+        return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    LayerRoot(layer.buf, count, width, level, root);
+    Py_END_ALLOW_THREADS
+    PyBuffer_Release(&layer);
+    return PyBytes_FromStringAndSize((const char *)root, HASHSIZE);
+}
+
+
+static PyMethodDef hasher_methods[] = {
+    {"piece_root", piece_root, METH_VARARGS, piece_root_doc},
+    {"merkle_root", merkle_root, METH_VARARGS, merkle_root_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+
+static struct PyModuleDef hasher_module = {
+    PyModuleDef_HEAD_INIT,
+    "_hasher",
+    "Compiled block hashing and merkle tree backend for torrentfile.",
+    -1,
+    hasher_methods
+};
+
+
+PyMODINIT_FUNC
+PyInit__hasher(void)
+{
+    PyObject *module;
+    HasherInit();
+    module = PyModule_Create(&hasher_module);
+    if (module == NULL)
+        return NULL;
+#ifdef TORRENTFILE_OPENSSL
+    PyModule_AddStringConstant(module, "SHA256", "openssl");
+#else
+    PyModule_AddStringConstant(module, "SHA256", "builtin");
+#endif
+    return module;
+}
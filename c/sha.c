@@ -20,7 +20,8 @@
 #include <stdint.h>
 #include "sha.h"
 
-typedef uint8_t uint8;
+/* never modify the caller's data while hashing */
+#define SHA1HANDSOFF
 
 #define rol(value, bits) (((value) << (bits)) | ((value) >> (32 - (bits))))
 
@@ -169,12 +170,9 @@ void SHA1Final(uint8 digest[20], SHA1_CTX *context)
 void SHA1(uint8 *hash_out, const uint8 *str, int len)
 {
     SHA1_CTX ctx;
-    unsigned int ii;
     SHA1Init(&ctx);
-    for (ii=0; ii<len; ii+=1)
-        SHA1Update(&ctx, (const uint8 *)str + ii, 1);
+    SHA1Update(&ctx, (const uint8 *)str, len);
     SHA1Final((uint8 *)hash_out, &ctx);
-    hash_out[20] = '\0';
 }
 
 #define rrot(val, cnt) ((val >> cnt) | (val << (32 - cnt)))
@@ -312,5 +310,4 @@ void SHA256(uint8_t *hash, const void *input, size_t len)
     SHA256Init(&ctx, hash);
     SHA256Update(&ctx, input, len);
     SHA256Final(&ctx);
-    hash[32] = '\0';
 }
@@ -18,7 +18,10 @@
 #ifndef SHA_H
 #define SHA_H
 
-#include "stdint.h"
+#include <stddef.h>
+#include <stdint.h>
+
+typedef uint8_t uint8;
 
 typedef struct
 {
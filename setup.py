@@ -15,8 +15,59 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 ##############################################################################
-"""Setup for Torrentfile package."""
-from setuptools import setup
+"""Setup for Torrentfile package.
 
+The compiled hashing backend in `c/` is optional.  It is skipped when
+`TORRENTFILE_PUREPYTHON` is set or when it fails to compile, and torrentfile
+falls back to its pure python hashers.
+"""
+import os
+import tempfile
+import warnings
 
-setup()
+from setuptools import Extension, setup
+from setuptools.command.build_ext import build_ext
+
+
+class OptionalBuildExt(build_ext):
+    """Build the C backend, never failing the install when it can't."""
+
+    def has_openssl(self):
+        """Check that a program using libcrypto compiles and links."""
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "probe.c")
+            with open(source, "w", encoding="utf-8") as probe:
+                probe.write("#include <openssl/evp.h>\n"
+                            "int main(void) { return !EVP_sha256(); }\n")
+            try:
+                objects = self.compiler.compile([source], output_dir=tmp)
+                self.compiler.link_executable(objects,
+                                              os.path.join(tmp, "probe"),
+                                              libraries=["crypto"])
+            except Exception:  # pylint: disable=broad-except
+                return False
+        return True
+
+    def build_extension(self, ext):
+        """Link against libcrypto when available, else use c/sha.c."""
+        if self.has_openssl():
+            ext.define_macros.append(("TORRENTFILE_OPENSSL", "1"))
+            ext.libraries.append("crypto")
+        try:
+            super().build_extension(ext)
+        except Exception as err:  # pylint: disable=broad-except
+            warnings.warn(f"Skipping compiled backend {ext.name}: {err}")
+
+
+ext_modules = []
+if not os.environ.get("TORRENTFILE_PUREPYTHON"):
+    ext_modules.append(
+        Extension(
+            "torrentfile._hasher",
+            sources=["c/hashermodule.c", "c/hasher.c", "c/sha.c"],
+            include_dirs=["c"],
+            optional=True,
+        ))
+
+
+setup(ext_modules=ext_modules, cmdclass={"build_ext": OptionalBuildExt})
@@ -138,6 +138,23 @@ def tempdir(ext="1"):
     return os.path.commonpath(paths)
 
 
+def contents(torrent) -> dict:
+    """
+    Return the meta dictionary of a torrent without its creation date.
+    """
+    return {
+        key: value
+        for key, value in torrent.meta.items() if key != "creation date"
+    }
+
+
+def no_hashing(*_, **__):
+    """
+    Fail when a file is hashed.
+    """
+    raise AssertionError("file was hashed")
+
+
 @atexit.register
 def teardown():  # pragma: nocover
     """
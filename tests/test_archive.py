@@ -0,0 +1,174 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for creating torrents from archives.
+"""
+
+import os
+import sys
+import tarfile
+import zipfile
+
+import pyben
+import pytest
+
+from tests import dir1, rmpath, tempfile
+from torrentfile.archive import Archive
+from torrentfile.cli import execute
+from torrentfile.torrent import TorrentArchive, TorrentAssembler, TorrentFile
+from torrentfile.utils import filelist_total, get_file_list
+
+SIZES = [0, 1, 5000, 2**14, 2**15 + 3, 40000, 2**17 + 1, 3]
+
+
+@pytest.fixture()
+def tree(dir1):
+    """
+    Yield a directory of files of several sizes.
+    """
+    filelist_total.cache.clear()
+    for path, size in zip(get_file_list(dir1), SIZES):
+        with open(path, "r+b") as binfile:
+            binfile.truncate(size)
+    filelist_total.cache.clear()
+    yield dir1
+    filelist_total.cache.clear()
+
+
+def _archive(root, suffix, paths=None):
+    """
+    Store the files under root in reverse order in an archive.
+    """
+    path = str(root) + suffix
+    parent = os.path.dirname(root)
+    paths = paths or get_file_list(root)[::-1]
+    if suffix == ".zip":
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name in paths:
+                archive.write(name, os.path.relpath(name, parent))
+    else:
+        mode = "w:gz" if suffix.endswith("gz") else "w"
+        with tarfile.open(path, mode) as archive:
+            for name in paths:
+                archive.add(name, os.path.relpath(name, parent))
+    return path
+
+
+@pytest.mark.parametrize("suffix", [".tar", ".tar.gz", ".zip"])
+@pytest.mark.parametrize("meta_version", ["1", "2", "3"])
+@pytest.mark.parametrize("align", [False, True])
+def test_archive_matches_tree(tree, suffix, meta_version, align):
+    """
+    Test torrents of archives match torrents of the extracted files.
+    """
+    path = _archive(tree, suffix)
+    args = {
+        "piece_length": 2**14,
+        "meta_version": meta_version,
+        "align": align
+    }
+    torrent = TorrentArchive(path=path, **args)
+    if meta_version == "1":
+        expected = TorrentFile(path=tree, **args)
+    else:
+        expected = TorrentAssembler(path=tree, **args)
+    assert torrent.meta["info"] == expected.meta["info"]
+    assert torrent.meta.get("piece layers") == expected.meta.get(
+        "piece layers")
+    rmpath(path)
+
+
+@pytest.mark.parametrize("suffix", [".tar", ".zip"])
+@pytest.mark.parametrize("meta_version", ["2", "3"])
+def test_archive_empty_directories(tree, suffix, meta_version):
+    """
+    Test empty directories are kept in the file tree like on disk.
+    """
+    empties = [os.path.join(tree, "empty"), os.path.join(tree, "subdir", "zz")]
+    for empty in empties:
+        os.mkdir(empty)
+    path = _archive(tree, suffix, get_file_list(tree) + empties)
+    args = {"piece_length": 2**14, "meta_version": meta_version}
+    torrent = TorrentArchive(path=path, **args)
+    expected = TorrentAssembler(path=tree, **args)
+    assert torrent.meta["info"]["file tree"]["empty"] == {}
+    # key order matters to the info hash
+    assert pyben.dumps(torrent.sort_meta()["info"]) == pyben.dumps(
+        expected.sort_meta()["info"])
+    rmpath(path, *empties)
+
+
+def test_archive_single_pass(tree, monkeypatch):
+    """
+    Test an uncompressed tar is read once from start to end.
+    """
+    path = _archive(tree, ".tar")
+    offsets = []
+    original = tarfile.TarFile.extractfile
+
+    def extractfile(self, member):
+        offsets.append(member.offset_data)
+        return original(self, member)
+
+    monkeypatch.setattr(tarfile.TarFile, "extractfile", extractfile)
+    TorrentArchive(path=path, piece_length=2**14)
+    assert len(offsets) == len(SIZES)
+    assert offsets == sorted(offsets)
+    rmpath(path)
+
+
+def test_archive_names(tree):
+    """
+    Test torrent names of archives with and without a top directory.
+    """
+    paths = get_file_list(tree)
+    path = _archive(tree, ".tar", paths=paths[:1])
+    torrent = TorrentArchive(path=path, meta_version="3")
+    expected = TorrentAssembler(path=paths[0], meta_version="3")
+    assert torrent.meta["info"] == expected.meta["info"]
+    rmpath(path)
+    path = _archive(tree, ".zip", paths=[os.path.join(tree, "file1.png")])
+    with zipfile.ZipFile(path, "a") as archive:
+        archive.writestr("other/file", b"data")
+    assert Archive(path).name == os.path.basename(tree)
+    assert TorrentArchive(path=path, name="bundle").name == "bundle"
+    rmpath(path)
+
+
+def test_archive_not_archive():
+    """
+    Test other files are refused.
+    """
+    path = tempfile(exp=14)
+    with pytest.raises(ValueError):
+        Archive(path)
+    rmpath(path)
+
+
+def test_cli_archive(tree):
+    """
+    Test the archive cli option.
+    """
+    path = _archive(tree, ".tar")
+    outfile = path + ".torrent"
+    sys.argv = ["torrentfile", "create", path, "--archive", "-o", outfile]
+    args = execute()
+    expected = TorrentFile(path=tree, piece_length=args.torrent.piece_length)
+    assert args.meta["info"] == expected.meta["info"]
+    rmpath(path, outfile)
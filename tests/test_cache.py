@@ -0,0 +1,256 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for the cache module.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from tests import contents, dir1, no_hashing, rmpath, tempfile
+from torrentfile import torrent as torrent_module
+from torrentfile.cache import HashCache, default_cache_path
+from torrentfile.cli import execute
+from torrentfile.torrent import TorrentAssembler, TorrentFile
+from torrentfile.utils import get_file_list
+
+
+@pytest.fixture()
+def cache():
+    """
+    Yield a hash cache in the test directory.
+    """
+    path = Path(__file__).parent / "TESTDIR" / "cache" / "hashes.sqlite3"
+    hash_cache = HashCache(path)
+    yield hash_cache
+    hash_cache.db.close()
+    rmpath(path.parent)
+
+
+def test_fixtures():
+    """
+    Test pytest fixtures.
+    """
+    assert dir1
+
+
+def test_default_cache_path(monkeypatch):
+    """
+    Test the cache is kept in the user's cache directory.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join("base", "cache"))
+    path = default_cache_path()
+    assert path == os.path.join("base", "cache", "torrentfile",
+                                "hashes.sqlite3")
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    assert default_cache_path().startswith(os.path.expanduser("~"))
+
+
+def test_cache_put_get(cache):
+    """
+    Test stored hashes are returned and merged with later ones.
+    """
+    tfile = tempfile(exp=16)
+    key = cache.key(tfile, 2**14)
+    assert cache.get(key) is None
+    cache.put(key, root=b"r" * 32, layer=b"l" * 128)
+    entry = cache.get(key)
+    assert entry.root == b"r" * 32 and entry.layer == b"l" * 128
+    assert cache.get(key, v1=True) is None
+    cache.put(key, pieces=b"p" * 80)
+    entry = cache.get(key, v1=True)
+    assert entry == (b"r" * 32, b"l" * 128, b"p" * 80)
+    assert cache.stats() == {
+        "entries": 1,
+        "bytes": 240,
+        "hits": 2,
+        "misses": 2
+    }
+    rmpath(tfile)
+
+
+def test_cache_key_changes(cache):
+    """
+    Test modified files and other piece lengths have different keys.
+    """
+    tfile = tempfile(exp=16)
+    key = cache.key(tfile, 2**14)
+    cache.put(key, root=bytes(32), layer=bytes(32))
+    assert cache.get(cache.key(tfile, 2**15)) is None
+    with open(tfile, "ab") as binfile:
+        binfile.write(b"1")
+    assert cache.key(tfile, 2**14) != key
+    assert cache.get(cache.key(tfile, 2**14)) is None
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("limits", [{
+    "max_entries": 3
+}, {
+    "max_size": 3 * 64
+}])
+def test_cache_prune(cache, limits):
+    """
+    Test the least recently used entries are removed first.
+    """
+    for name, value in limits.items():
+        setattr(cache, name, value)
+    keys = [(0, i, 1, 1, 2**14) for i in range(5)]
+    for key in keys:
+        cache.put(key, root=bytes(32), layer=bytes(32))
+    assert cache.get(keys[0])
+    cache.commit()
+    assert cache.stats()["entries"] == 3
+    assert cache.get(keys[0]) and cache.get(keys[4])
+    assert cache.get(keys[1]) is None
+
+
+def test_cache_invalidate(cache, dir1):
+    """
+    Test invalidating files, directories and the whole cache.
+    """
+    paths = get_file_list(dir1)
+    for path in paths:
+        cache.put(cache.key(path, 2**14), root=bytes(32), layer=bytes(32))
+        cache.put(cache.key(path, 2**15), root=bytes(32), layer=bytes(32))
+    assert cache.invalidate(paths[0]) == 2
+    subdir = os.path.dirname(paths[-1])
+    removed = cache.invalidate(subdir)
+    assert removed == 2 * len(get_file_list(subdir))
+    remaining = 2 * len(paths) - 2 - removed
+    assert cache.stats()["entries"] == remaining
+    assert cache.invalidate() == remaining
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("meta_version", ["2", "3"])
+def test_assembler_cache(cache, dir1, meta_version, workers, monkeypatch):
+    """
+    Test unchanged files are not hashed again.
+    """
+    args = {
+        "path": dir1,
+        "meta_version": meta_version,
+        "piece_length": 2**15,
+        "workers": workers,
+        "pool": "thread",
+        "progress": 2,
+    }
+    expected = contents(TorrentAssembler(**args))
+    TorrentAssembler(cache=cache, **args)
+    assert cache.misses == len(get_file_list(dir1))
+    with monkeypatch.context() as patch:
+        patch.setattr(torrent_module, "FileHasher", no_hashing)
+        patch.setattr(torrent_module, "hash_file", no_hashing)
+        patch.setattr(torrent_module, "hash_segment", no_hashing)
+        torrent = TorrentAssembler(cache=cache, **args)
+    assert contents(torrent) == expected
+    assert cache.hits == len(get_file_list(dir1))
+
+
+def test_assembler_cache_changed_file(cache, dir1):
+    """
+    Test only files that changed are hashed again.
+    """
+    args = {"path": dir1, "meta_version": "3", "piece_length": 2**15}
+    TorrentAssembler(cache=cache, **args)
+    paths = get_file_list(dir1)
+    with open(paths[0], "ab") as binfile:
+        binfile.write(bytes(100))
+    misses = cache.misses
+    torrent = TorrentAssembler(cache=cache, **args)
+    assert cache.misses == misses + 1
+    assert contents(torrent) == contents(TorrentAssembler(**args))
+
+
+def test_assembler_cache_version_upgrade(cache, dir1):
+    """
+    Test hybrid torrents hash files that were only cached for v2.
+    """
+    args = {"path": dir1, "piece_length": 2**15}
+    TorrentAssembler(cache=cache, meta_version="2", **args)
+    torrent = TorrentAssembler(cache=cache, meta_version="3", **args)
+    assert cache.hits == 0
+    expected = TorrentAssembler(meta_version="3", **args)
+    assert contents(torrent) == contents(expected)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_torrentfile_align_cache(cache, dir1, workers, monkeypatch):
+    """
+    Test piece aligned v1 torrents reuse cached pieces.
+    """
+    args = {
+        "path": dir1,
+        "align": True,
+        "piece_length": 2**16,
+        "workers": workers
+    }
+    with open(get_file_list(dir1)[0], "ab") as binfile:
+        binfile.write(bytes(1000))
+    expected = contents(TorrentFile(**args))
+    assert contents(TorrentFile(cache=cache, **args)) == expected
+    with monkeypatch.context() as patch:
+        patch.setattr(torrent_module, "Hasher", no_hashing)
+        torrent = TorrentFile(cache=cache, **args)
+    assert contents(torrent) == expected
+
+
+def test_torrentfile_hybrid_cache_shared(cache, dir1):
+    """
+    Test aligned v1 torrents reuse pieces cached by hybrid torrents.
+    """
+    TorrentAssembler(path=dir1, meta_version="3", cache=cache)
+    hits = cache.hits
+    torrent = TorrentFile(path=dir1, align=True, cache=cache)
+    assert cache.hits == hits + len(get_file_list(dir1))
+    expected = TorrentFile(path=dir1, align=True)
+    assert contents(torrent) == contents(expected)
+
+
+def test_cli_cache(dir1):
+    """
+    Test the cache options of the create and cache subcommands.
+    """
+    path = str(Path(__file__).parent / "TESTDIR" / "cli.sqlite3")
+    outfile = str(dir1) + ".torrent"
+    sys.argv = [
+        "torrentfile", "create", str(dir1), "--meta-version", "2",
+        "--cache-path", path, "-o", outfile
+    ]
+    args = execute()
+    assert args.torrent.cache.misses == len(get_file_list(dir1))
+    args = execute()
+    assert args.torrent.cache.hits == len(get_file_list(dir1))
+    args.torrent.cache.db.close()
+    paths = get_file_list(dir1)
+    sys.argv = [
+        "torrentfile", "cache", "--cache-path", path, "--invalidate",
+        paths[0]
+    ]
+    stats = execute()
+    assert stats["removed"] == 1
+    assert stats["entries"] == len(paths) - 1
+    sys.argv = ["torrentfile", "cache", "--cache-path", path, "--clear"]
+    assert execute()["entries"] == 0
+    rmpath(path, outfile)
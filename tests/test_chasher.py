@@ -0,0 +1,141 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Differential tests for the compiled hashing backend.
+
+Skipped unless the `torrentfile._hasher` extension has been built.
+"""
+
+import os
+
+import pytest
+
+from tests import dir2, rmpath, tempfile
+from torrentfile.hasher import (BACKENDS, BLOCK_SIZE, HASH_SIZE,
+                                MerkleAccumulator, hash_file, pieces_root)
+from torrentfile.torrent import (TorrentAssembler, TorrentFile, TorrentFileV2,
+                                 TorrentFileHybrid)
+from torrentfile.utils import next_power_2
+
+_hasher = pytest.importorskip("torrentfile._hasher")
+
+
+def test_fixtures():
+    """
+    Test pytest fixtures.
+    """
+    assert dir2
+
+
+@pytest.mark.parametrize(
+    "size", [1, BLOCK_SIZE - 1, BLOCK_SIZE, BLOCK_SIZE * 5 + 7, 2**20])
+@pytest.mark.parametrize("extra", [0, 1, 3])
+def test_piece_root(size, extra):
+    """
+    Test compiled piece roots match the python implementation.
+    """
+    data = os.urandom(size)
+    width = next_power_2(-(-size // BLOCK_SIZE)) << extra
+    compiled = _hasher.piece_root(data, width)
+    assert compiled == BACKENDS["hashlib"].piece_root(data, width)
+    assert compiled == _hasher.piece_root(memoryview(data), width)
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 8, 13, 1000])
+@pytest.mark.parametrize("level", [0, 2, 6])
+def test_merkle_root(count, level):
+    """
+    Test compiled layer roots match the python accumulator.
+    """
+    layer = os.urandom(count * HASH_SIZE)
+    acc = MerkleAccumulator(level)
+    for i in range(0, len(layer), HASH_SIZE):
+        acc.add(layer[i:i + HASH_SIZE])
+    width = next_power_2(count)
+    assert _hasher.merkle_root(layer, width, level) == acc.root(width)
+    assert _hasher.merkle_root(bytearray(layer), width * 4,
+                               level) == acc.root(width * 4)
+
+
+@pytest.mark.parametrize("width", [0, 3, 1])
+def test_piece_root_bad_width(width):
+    """
+    Test widths that are not powers of 2 covering the piece are rejected.
+    """
+    with pytest.raises(ValueError):
+        _hasher.piece_root(bytes(BLOCK_SIZE * 2), width)
+
+
+def test_merkle_root_bad_layer():
+    """
+    Test layers that are not made of whole hashes are rejected.
+    """
+    with pytest.raises(ValueError):
+        _hasher.merkle_root(bytes(HASH_SIZE + 1), 2)
+
+
+@pytest.mark.parametrize("exp", [14, 18, 22])
+@pytest.mark.parametrize("piece_length", [2**14, 2**16, 2**18])
+def test_pieces_root(exp, piece_length):
+    """
+    Test compiled pieces roots match the python implementation.
+    """
+    layer = os.urandom(HASH_SIZE * max(2**exp // piece_length, 1))
+    compiled = pieces_root(layer, piece_length, "compiled")
+    assert compiled == pieces_root(layer, piece_length, "hashlib")
+
+
+def build(cls, path, piece_length, **kwargs):
+    """
+    Return the info dictionary and piece layers of a new torrent.
+    """
+    torrent = cls(path=path, piece_length=piece_length, **kwargs)
+    return torrent.meta["info"], torrent.meta.get("piece layers")
+
+
+@pytest.mark.parametrize("cls, kwargs", [
+    (TorrentFile, {}),
+    (TorrentFileV2, {}),
+    (TorrentFileHybrid, {}),
+    (TorrentAssembler, {"meta_version": 2}),
+    (TorrentAssembler, {"meta_version": 3}),
+])
+@pytest.mark.parametrize("piece_length", [2**14, 2**15, 2**18])
+def test_torrents_match(dir2, cls, kwargs, piece_length):
+    """
+    Test torrents are byte identical with and without the backend.
+    """
+    compiled = build(cls, dir2, piece_length, hash_backend="compiled",
+                     **kwargs)
+    assert compiled == build(cls, dir2, piece_length, hash_backend="hashlib",
+                             **kwargs)
+
+
+@pytest.mark.parametrize("hybrid", [True, False])
+@pytest.mark.parametrize("extra", [0, 100, 2**14 + 3])
+def test_single_file_match(hybrid, extra):
+    """
+    Test a single file hashed by the backend matches the python path.
+    """
+    tfile = tempfile(exp=20)
+    with open(tfile, "ab") as binfile:
+        binfile.write(bytes(extra))
+    compiled = hash_file(tfile, 2**16, hybrid, backend="compiled")
+    assert hash_file(tfile, 2**16, hybrid, backend="hashlib") == compiled
+    rmpath(tfile)
@@ -647,3 +647,120 @@ def test_cli_configfile_params(configfile, folder):
     assert meta["info"]["piece length"] == 2**15
     assert meta["announce"] == "example"
     assert meta["info"]["meta version"] == 2
+
+
+@pytest.mark.parametrize("align", [[], ["--align"]])
+def test_cli_workers(folder, align):
+    """
+    Test workers cli flag produces the same pieces as serial hashing.
+    """
+    folder, torrent = folder
+    args = ["torrentfile", "create", folder, *align, "-o", torrent]
+    sys.argv = args
+    execute()
+    expected = pyben.load(torrent)["info"]["pieces"]
+    sys.argv = args + ["--workers", "4"]
+    execute()
+    assert pyben.load(torrent)["info"]["pieces"] == expected
+
+
+def test_cli_workers_not_number(folder):
+    """
+    Test a workers value that is not a number fails while parsing.
+    """
+    folder, torrent = folder
+    sys.argv = ["torrentfile", "create", folder, "--workers", "x"]
+    sys.argv += ["-o", torrent]
+    with pytest.raises(SystemExit):
+        execute()
+
+
+@pytest.mark.parametrize("backend", ["hashlib", "batched", "compiled"])
+@pytest.mark.parametrize("version", ["1", "2", "3"])
+def test_cli_hash_backend(folder, backend, version):
+    """
+    Test hash backend cli flag produces the same torrent as the default.
+    """
+    folder, torrent = folder
+    args = ["torrentfile", "create", folder, "--meta-version", version]
+    sys.argv = args + ["-o", torrent]
+    execute()
+    expected = pyben.load(torrent)["info"]
+    sys.argv = args + ["--hash-backend", backend, "-o", torrent]
+    execute()
+    assert pyben.load(torrent)["info"] == expected
+
+
+@pytest.mark.parametrize("version", ["1", "2", "3"])
+def test_cli_read_ahead(folder, version):
+    """
+    Test read ahead cli flag produces the same torrent.
+    """
+    folder, torrent = folder
+    args = ["torrentfile", "create", folder, "--meta-version", version]
+    sys.argv = args + ["-o", torrent]
+    execute()
+    expected = pyben.load(torrent)["info"]
+    sys.argv = args + ["--read-ahead", "3", "-o", torrent]
+    execute()
+    assert pyben.load(torrent)["info"] == expected
+
+
+@pytest.mark.parametrize("io_mode", ["dontneed", "direct"])
+@pytest.mark.parametrize("version", ["1", "2", "3"])
+def test_cli_io_mode(folder, version, io_mode):
+    """
+    Test page cache friendly io modes produce the same torrent.
+    """
+    folder, torrent = folder
+    args = ["torrentfile", "create", folder, "--meta-version", version]
+    sys.argv = args + ["-o", torrent]
+    execute()
+    expected = pyben.load(torrent)["info"]
+    sys.argv = args + ["--io-mode", io_mode, "-o", torrent]
+    execute()
+    assert pyben.load(torrent)["info"] == expected
+
+
+@pytest.mark.parametrize("read_size", ["14", "20", "8388608"])
+@pytest.mark.parametrize("version", ["2", "3"])
+def test_cli_read_size(folder, version, read_size):
+    """
+    Test read size cli flag produces the same torrent.
+    """
+    folder, torrent = folder
+    args = ["torrentfile", "create", folder, "--meta-version", version]
+    sys.argv = args + ["-o", torrent]
+    execute()
+    expected = pyben.load(torrent)
+    sys.argv = args + ["--read-size", read_size, "-o", torrent]
+    execute()
+    result = pyben.load(torrent)
+    assert result["info"] == expected["info"]
+    assert result["piece layers"] == expected["piece layers"]
+
+
+def test_cli_read_size_not_number(folder):
+    """
+    Test a read size that is not a number fails while parsing.
+    """
+    folder, torrent = folder
+    sys.argv = ["torrentfile", "create", folder, "--read-size", "abc"]
+    sys.argv += ["-o", torrent]
+    with pytest.raises(SystemExit):
+        execute()
+
+
+@pytest.mark.parametrize("version", ["1", "2", "3"])
+def test_cli_walkers(folder, version):
+    """
+    Test walking the content on several threads produces the same torrent.
+    """
+    folder, torrent = folder
+    args = ["torrentfile", "create", folder, "--meta-version", version]
+    sys.argv = args + ["-o", torrent]
+    execute()
+    expected = pyben.load(torrent)["info"]
+    sys.argv = args + ["--walkers", "4", "-o", torrent]
+    execute()
+    assert pyben.load(torrent)["info"] == expected
@@ -0,0 +1,367 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for the hasher module.
+"""
+
+import pytest
+
+from tests import dir1, dir2, rmpath, tempfile
+from torrentfile import hasher
+from torrentfile.hasher import (
+    BACKENDS, HASH_BACKEND_ENV, HASH_SIZE, FileHasher, Hasher, HasherHybrid,
+    HasherV2, MerkleAccumulator, MerkleTree, get_backend, hash_file,
+    hash_segment, merkle_root, padded_root, piece_spans, pieces_root,
+    read_chunk_size, segment_ranges, zero_root)
+from torrentfile.torrent import TorrentAssembler, TorrentFile
+from torrentfile.utils import get_file_list, next_power_2
+
+
+def test_fixtures():
+    """
+    Test pytest fixtures.
+    """
+    assert dir1 and dir2
+
+
+@pytest.mark.parametrize("align", [True, False])
+@pytest.mark.parametrize("piece_length", [2**i for i in range(14, 19)])
+def test_piece_spans_cover_content(align, piece_length):
+    """
+    Test piece spans cover every byte of every file exactly once.
+    """
+    sizes = [0, 1, 2**14, 2**15 + 3, 2**18 + 10]
+    paths = [f"file{i}" for i in range(len(sizes))]
+    covered = dict.fromkeys(paths, 0)
+    for spans, pad in piece_spans(paths, sizes, piece_length, align):
+        length = sum(span[-1] for span in spans)
+        assert length + pad <= piece_length
+        for path, offset, size in spans:
+            assert offset == covered[path]
+            covered[path] += size
+    assert list(covered.values()) == sizes
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+@pytest.mark.parametrize("align", [True, False])
+@pytest.mark.parametrize("piece_length", [2**i for i in range(14, 19)])
+def test_parallel_hasher_matches_serial(dir2, workers, align, piece_length):
+    """
+    Test parallel piece hashing produces the same pieces as serial hashing.
+    """
+    paths = get_file_list(dir2)
+    serial = b"".join(Hasher(paths, piece_length, align=align, progress=0,
+                             progress_bar=Hasher.NoProg()))
+    parallel = b"".join(
+        Hasher(paths,
+               piece_length,
+               align=align,
+               progress=1,
+               workers=workers))
+    assert serial == parallel
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_torrentfile_workers(workers):
+    """
+    Test TorrentFile accepts workers option for a single file.
+    """
+    tfile = tempfile(exp=20)
+    serial = TorrentFile(path=tfile, progress=0, piece_length=2**15)
+    torrent = TorrentFile(path=tfile, workers=workers, piece_length=2**15)
+    assert torrent.meta["info"]["pieces"] == serial.meta["info"]["pieces"]
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("hybrid", [True, False])
+@pytest.mark.parametrize("exp", [15, 18, 20])
+@pytest.mark.parametrize("piece_length", [2**i for i in range(14, 18)])
+def test_hash_segment_matches_file_hasher(hybrid, exp, piece_length):
+    """
+    Test hashing a file in segments produces the same layers and root.
+    """
+    tfile = tempfile(exp=exp)
+    with open(tfile, "ab") as binfile:
+        binfile.write(bytes(1000))
+    size = 2**exp + 1000
+    root, layers, pieces, _ = hash_file(tfile, piece_length, hybrid)
+    step = piece_length * 3
+    results = [
+        hash_segment(tfile, piece_length, start, min(start + step, size),
+                     hybrid) for start in range(0, size, step)
+    ]
+    assert b"".join(i[0] for i in results) == layers
+    assert b"".join(i[1] for i in results) == pieces
+    assert pieces_root(layers, piece_length) == root
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("workers", [1, 4, 64])
+@pytest.mark.parametrize("size", [2**14, 2**20 + 5, 2**30])
+def test_segment_ranges(workers, size):
+    """
+    Test segment ranges are piece aligned and cover the whole file.
+    """
+    piece_length = 2**16
+    ranges = segment_ranges(size, piece_length, workers)
+    assert ranges[0][0] == 0 and ranges[-1][1] == size
+    for (_, stop), (start, _) in zip(ranges, ranges[1:]):
+        assert stop == start and start % piece_length == 0
+
+
+@pytest.mark.parametrize("meta_version", ["2", "3"])
+def test_assembler_segments(meta_version, monkeypatch):
+    """
+    Test a single large file hashed in segments matches serial hashing.
+    """
+    monkeypatch.setattr(hasher, "SEGMENT_SIZE", 2**16)
+    monkeypatch.setattr(hasher, "MIN_SEGMENT_SIZE", 2**14)
+    tfile = tempfile(exp=20)
+    with open(tfile, "ab") as binfile:
+        binfile.write(bytes(12345))
+    args = {
+        "path": tfile,
+        "piece_length": 2**14,
+        "meta_version": meta_version,
+        "progress": 0,
+    }
+    serial = TorrentAssembler(**args)
+    parallel = TorrentAssembler(workers=4, pool="thread", **args)
+    assert serial.meta["info"] == parallel.meta["info"]
+    assert serial.meta["piece layers"] == parallel.meta["piece layers"]
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("level", list(range(0, 12)))
+def test_zero_root(level):
+    """
+    Test cached zero subtree roots match hashing zero filled leaves.
+    """
+    leaves = [bytes(HASH_SIZE) for _ in range(2**level)]
+    assert zero_root(level) == merkle_root(leaves)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8, 13])
+@pytest.mark.parametrize("width", [16, 32])
+@pytest.mark.parametrize("level", [0, 3])
+def test_padded_root(count, width, level):
+    """
+    Test padded root matches explicitly padding the layer with zeros.
+    """
+    hashes = [hasher.sha256(bytes([i])).digest() for i in range(count)]
+    padding = [zero_root(level) for _ in range(width - count)]
+    assert padded_root(hashes, width, level) == merkle_root(hashes + padding)
+
+
+@pytest.mark.parametrize("count", [2, 4, 2**10, 2**13 + 2**12])
+def test_merkle_tree_from_leaves(count):
+    """
+    Test the buffer merkle engine matches pairwise hashing of lists.
+    """
+    leaves = [hasher.sha256(str(i).encode()).digest() for i in range(count)]
+    nodes = leaves + [bytes(HASH_SIZE)] * (next_power_2(count) - count)
+    while len(nodes) > 1:
+        nodes = [
+            hasher.sha256(x + y).digest()
+            for x, y in zip(nodes[::2], nodes[1::2])
+        ]
+    buffer = bytearray(b"".join(leaves))
+    tree = MerkleTree.from_leaves(buffer)
+    assert tree.root == nodes[0] == merkle_root(leaves)
+    assert tree.count == count
+    assert buffer[:HASH_SIZE] == tree.root
+
+
+@pytest.mark.parametrize("leaves", [b"", bytes(HASH_SIZE) * 3])
+def test_merkle_tree_readonly_input(leaves):
+    """
+    Test immutable input is copied rather than reduced in place.
+    """
+    tree = MerkleTree.from_leaves(leaves, width=4)
+    assert tree.root == zero_root(2)
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 7, 8, 13, 100])
+@pytest.mark.parametrize("width", [None, 128, 256])
+@pytest.mark.parametrize("level", [0, 4])
+def test_merkle_accumulator(count, width, level):
+    """
+    Test the incremental accumulator matches padding the whole layer.
+    """
+    leaves = [hasher.sha256(str(i).encode()).digest() for i in range(count)]
+    acc = MerkleAccumulator(level)
+    for leaf in leaves:
+        acc.add(leaf)
+    expected = width if width else next_power_2(count)
+    assert acc.count == count
+    assert len(acc.pending) <= expected.bit_length()
+    assert acc.root(width) == padded_root(leaves, expected, level)
+
+
+def test_merkle_accumulator_reset():
+    """
+    Test a reset accumulator computes the same root again.
+    """
+    acc = MerkleAccumulator()
+    for i in range(5):
+        acc.add(hasher.sha256(bytes([i])).digest())
+    root = acc.root(8)
+    acc.reset()
+    assert acc.count == 0 and acc.root(8) == zero_root(3)
+    for i in range(5):
+        acc.add(hasher.sha256(bytes([i])).digest())
+    assert acc.root(8) == root
+
+
+@pytest.mark.parametrize("exp, extra", [(15, 2**14), (20, 100)])
+def test_hasherv2_piece_layer_buffer(exp, extra):
+    """
+    Test the piece layer is one contiguous buffer of layer hashes.
+    """
+    path = tempfile(exp=exp)
+    with open(path, "ab") as fd:
+        fd.write(bytes(extra))
+    size = 2**exp + extra
+    v2 = HasherV2(path, 2**16)
+    assert isinstance(v2.piece_layer, bytearray)
+    assert len(v2.piece_layer) == HASH_SIZE * -(-size // 2**16)
+    assert v2.root == pieces_root(bytes(v2.piece_layer), 2**16)
+    assert v2.root == hash_file(path, 2**16)[0]
+    rmpath(path)
+
+
+@pytest.mark.parametrize("name", list(BACKENDS))
+def test_get_backend_environment(name, monkeypatch):
+    """
+    Test the backend can be selected with the environment variable.
+    """
+    monkeypatch.setenv(HASH_BACKEND_ENV, name)
+    backend = get_backend()
+    assert backend.name == name or not BACKENDS[name].available()
+    assert get_backend("batched").name == "batched"
+
+
+def test_get_backend_unknown():
+    """
+    Test an unknown backend name is rejected.
+    """
+    with pytest.raises(ValueError):
+        get_backend("md5")
+
+
+def test_get_backend_unavailable(monkeypatch):
+    """
+    Test the hashlib backend replaces a backend that was not built.
+    """
+    monkeypatch.setattr(hasher, "_hasher", None)
+    assert hasher.default_backend() == "hashlib"
+    assert get_backend("compiled").name == "hashlib"
+
+
+@pytest.mark.parametrize("count", [0, 1, 5, 64])
+@pytest.mark.parametrize("width", [64, 128])
+def test_backends_match(count, width):
+    """
+    Test every backend calculates the same roots.
+    """
+    data = bytes(range(256)) * 64 * count
+    layer = data[:count * HASH_SIZE]
+    roots = {(backend.piece_root(data, width),
+              backend.layer_root(layer, width, 2),
+              backend.leaf_hash(data),
+              backend.piece_hash(data).digest())
+             for backend in BACKENDS.values() if backend.available()}
+    assert len(roots) == 1
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+@pytest.mark.parametrize("meta_version", [2, 3])
+def test_assembler_backends(backend, meta_version):
+    """
+    Test torrents are identical whichever backend hashes them.
+    """
+    tfile = tempfile(exp=20)
+    expected = TorrentAssembler(path=tfile, meta_version=meta_version,
+                                piece_length=2**14, hash_backend="hashlib")
+    torrent = TorrentAssembler(path=tfile, meta_version=meta_version,
+                               piece_length=2**14, hash_backend=backend,
+                               workers=2, pool="thread")
+    assert torrent.meta["info"] == expected.meta["info"]
+    assert torrent.meta["piece layers"] == expected.meta["piece layers"]
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("read_size, expected", [(None, 2**20), (1, 2**16),
+                                                 (2**16 + 5, 2**16),
+                                                 (2**23 + 1, 2**23)])
+def test_read_chunk_size(read_size, expected):
+    """
+    Test read sizes are rounded down to whole pieces.
+    """
+    assert read_chunk_size(2**16, read_size) == expected
+
+
+@pytest.mark.parametrize("io_mode", ["buffered", "mmap"])
+@pytest.mark.parametrize("read_size", [2**16, 2**18, 2**20, 2**23])
+@pytest.mark.parametrize("exp, extra", [(14, 0), (18, 0), (20, 12345)])
+def test_large_reads_match(io_mode, read_size, exp, extra):
+    """
+    Test hashing with large reads matches reading one piece at a time.
+    """
+    path = tempfile(exp=exp)
+    with open(path, "ab") as fd:
+        fd.write(bytes(extra))
+    results = []
+    for size in [2**16, read_size]:
+        kws = {"io_mode": io_mode, "read_size": size}
+        v2 = HasherV2(path, 2**16, **kws)
+        hybrid = HasherHybrid(path, 2**16, **kws)
+        hasher = FileHasher(path, 2**16, hybrid=True, **kws)
+        layers = list(hasher)
+        results.append((v2.root, bytes(v2.piece_layer), hybrid.root,
+                        hybrid.pieces, hybrid.padding_file, hasher.root,
+                        layers, hasher.padding_file))
+    assert results[0] == results[1]
+    rmpath(path)
+
+
+@pytest.mark.parametrize("read_size", [2**16, 2**20])
+def test_large_reads_progress(read_size):
+    """
+    Test progress is reported once for each large read.
+    """
+    path = tempfile(exp=20)
+    updates = []
+
+    class Progress(Hasher.NoProg):
+        """
+        Record progress updates.
+        """
+
+        @staticmethod
+        def update(value):
+            """
+            Record an update.
+            """
+            updates.append(value)
+
+    HasherV2(path, 2**14, progress=2, progress_bar=Progress(),
+             read_size=read_size)
+    assert updates == [read_size] * (2**20 // read_size)
+    rmpath(path)
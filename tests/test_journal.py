@@ -0,0 +1,233 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for the journal module.
+"""
+
+import os
+import sys
+
+import pytest
+
+from tests import dir1, rmpath
+from torrentfile import hasher, journal
+from torrentfile import torrent as torrent_module
+from torrentfile.cli import execute
+from torrentfile.journal import Journal, read_journal
+from torrentfile.torrent import TorrentAssembler, TorrentFile
+from torrentfile.utils import get_file_list
+
+
+class Interrupted(Exception):
+    """
+    Stands in for a crash while hashing.
+    """
+
+
+def _crash_after(count, func, calls):
+    """
+    Wrap a hashing function to fail after it was called count times.
+    """
+
+    def wrapper(*args, **kwargs):
+        if len(calls) == count:
+            raise Interrupted
+        calls.append(args[0])
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+class CrashingHasher(hasher.Hasher):
+    """
+    Piece hasher that fails after hashing 20 pieces.
+    """
+
+    def __next__(self):
+        """
+        Return the next piece or fail.
+        """
+        self.count = getattr(self, "count", 0) + 1
+        if self.count > 20:
+            raise Interrupted
+        return super().__next__()
+
+
+@pytest.fixture()
+def outfile(dir1):
+    """
+    Yield the output path of a torrent and remove it and its journal.
+    """
+    path = str(dir1) + ".torrent"
+    yield path
+    rmpath(path, path + ".journal")
+
+
+def test_fixtures():
+    """
+    Test pytest fixtures.
+    """
+    assert dir1
+
+
+def test_journal_records(outfile):
+    """
+    Test records are read back up to a record cut short.
+    """
+    path = outfile + ".journal"
+    jrnl = Journal(path)
+    jrnl.start({"settings": 1}, [{"n": 0}])
+    jrnl.add({"n": 1}, 10)
+    jrnl.close()
+    assert read_journal(path) == ({"settings": 1}, [{"n": 0}, {"n": 1}])
+    with open(path, "ab") as binfile:
+        binfile.write(journal.HEADER.pack(100) + b"d1:n")
+    assert read_journal(path) == ({"settings": 1}, [{"n": 0}, {"n": 1}])
+    assert Journal(path, resume=True).records == [{"n": 0}, {"n": 1}]
+    jrnl.discard()
+    assert not os.path.exists(path)
+    assert read_journal(path) == ({}, [])
+
+
+def test_journal_not_journal(outfile):
+    """
+    Test other files are not read as journals.
+    """
+    with open(outfile, "wb") as binfile:
+        binfile.write(b"d8:announce")
+    assert read_journal(outfile) == ({}, [])
+
+
+def test_journal_checkpoint(outfile, monkeypatch):
+    """
+    Test records are flushed to disk every checkpoint size bytes.
+    """
+    monkeypatch.setattr(journal, "CHECKPOINT_SIZE", 100)
+    jrnl = Journal(outfile + ".journal")
+    jrnl.start({})
+    jrnl.add({"n": 1}, 60)
+    assert jrnl.pending == 60
+    jrnl.add({"n": 2}, 60)
+    assert jrnl.pending == 0
+    jrnl.discard()
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("align", [False, True])
+def test_torrentfile_resume(dir1, outfile, align, workers, monkeypatch):
+    """
+    Test resumed v1 torrents are identical to uninterrupted ones.
+    """
+    monkeypatch.setattr(journal, "CHECKPOINT_SIZE", 2**15)
+    args = {
+        "path": dir1,
+        "piece_length": 2**14,
+        "align": align,
+        "workers": workers,
+        "outfile": outfile,
+        "checkpoint": True,
+    }
+    with monkeypatch.context() as patch:
+        patch.setattr(torrent_module, "Hasher", CrashingHasher)
+        with pytest.raises(Interrupted):
+            TorrentFile(**args)
+    header, records = read_journal(outfile + ".journal")
+    assert records and header["settings"]["align"] == int(align)
+    torrent = TorrentFile(resume=True, **args)
+    assert torrent.meta["creation date"] == header["creation date"]
+    expected = TorrentFile(**args)
+    expected.meta["creation date"] = header["creation date"]
+    _, meta = torrent.write()
+    assert not os.path.exists(outfile + ".journal")
+    assert meta == expected.sort_meta()
+
+
+def test_torrentfile_resume_changed_file(dir1, outfile):
+    """
+    Test pieces of files changed since the journal was written are hashed.
+    """
+    args = {"path": dir1, "piece_length": 2**14, "outfile": outfile}
+    TorrentFile(checkpoint=True, **args)
+    paths = get_file_list(dir1)
+    with open(paths[2], "ab") as binfile:
+        binfile.write(b"1")
+    torrent = TorrentFile(resume=True, **args)
+    assert torrent.meta["info"] == TorrentFile(**args).meta["info"]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("meta_version", ["2", "3"])
+def test_assembler_resume(dir1, outfile, meta_version, workers, monkeypatch):
+    """
+    Test resumed v2 and hybrid torrents only hash unfinished files.
+    """
+    args = {
+        "path": dir1,
+        "piece_length": 2**15,
+        "meta_version": meta_version,
+        "workers": workers,
+        "pool": "thread",
+        "outfile": outfile,
+    }
+    calls = []
+    with monkeypatch.context() as patch:
+        for name in ["FileHasher", "hash_file"]:
+            func = getattr(torrent_module, name)
+            patch.setattr(torrent_module, name, _crash_after(3, func, calls))
+        with pytest.raises(Interrupted):
+            TorrentAssembler(checkpoint=True, **args)
+    header, records = read_journal(outfile + ".journal")
+    assert [record["path"] for record in records] == [
+        os.path.relpath(path, dir1).split(os.sep) for path in calls
+    ]
+    calls.clear()
+    with monkeypatch.context() as patch:
+        for name in ["FileHasher", "hash_file"]:
+            func = getattr(torrent_module, name)
+            patch.setattr(torrent_module, name, _crash_after(-1, func, calls))
+        torrent = TorrentAssembler(resume=True, **args)
+    assert len(calls) == len(get_file_list(dir1)) - 3
+    expected = TorrentAssembler(**args)
+    expected.meta["creation date"] = header["creation date"]
+    _, meta = torrent.write()
+    assert meta == expected.sort_meta()
+
+
+def test_assembler_resume_other_settings(dir1, outfile):
+    """
+    Test journals of jobs with other settings are not resumed.
+    """
+    args = {"path": dir1, "meta_version": "2", "outfile": outfile}
+    TorrentAssembler(checkpoint=True, piece_length=2**14, **args)
+    torrent = TorrentAssembler(resume=True, piece_length=2**15, **args)
+    assert not torrent.journal_files
+    expected = TorrentAssembler(piece_length=2**15, **args)
+    assert torrent.meta["info"] == expected.meta["info"]
+
+
+def test_cli_resume(dir1, outfile):
+    """
+    Test the resume and no checkpoint cli options.
+    """
+    args = ["torrentfile", "create", str(dir1), "-o", outfile]
+    sys.argv = args + ["--no-checkpoint"]
+    assert execute().torrent.journal is None
+    sys.argv = args + ["--resume"]
+    assert execute().torrent.journal is not None
+    assert not os.path.exists(outfile + ".journal")
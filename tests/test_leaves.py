@@ -0,0 +1,197 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for the leaves module.
+"""
+
+import sys
+
+import pyben
+import pytest
+
+from tests import contents, dir1, no_hashing, rmpath, tempfile
+from torrentfile import hasher
+from torrentfile import torrent as torrent_module
+from torrentfile.cli import execute
+from torrentfile.hasher import BACKENDS, hash_file, leaves_to_layer
+from torrentfile.leaves import LeafReader, LeafWriter
+from torrentfile.torrent import TorrentAssembler
+from torrentfile.utils import ArgumentError, get_file_list
+
+
+@pytest.fixture()
+def sidecar(dir1):
+    """
+    Yield the path of a leaves sidecar next to a test directory.
+    """
+    path = str(dir1) + ".leaves"
+    yield path
+    rmpath(path)
+
+
+def test_fixtures():
+    """
+    Test pytest fixtures.
+    """
+    assert dir1
+
+
+def test_leaves_roundtrip(sidecar):
+    """
+    Test leaves written to a sidecar are read back by path and length.
+    """
+    with LeafWriter(sidecar) as writer:
+        writer.add(["a", "b"], 2**14 + 1, b"1" * 64)
+        writer.add(["c"], 10, b"2" * 32)
+    with LeafReader(sidecar) as reader:
+        assert reader.get(["c"], 10) == b"2" * 32
+        assert reader.get(["a", "b"], 2**14 + 1) == b"1" * 64
+        assert reader.get(["a", "b"], 2**14) is None
+        assert reader.get(["d"], 10) is None
+
+
+def test_leaves_errors(sidecar):
+    """
+    Test wrong leaf counts and other files are rejected.
+    """
+    with LeafWriter(sidecar) as writer:
+        with pytest.raises(ValueError):
+            writer.add(["a"], 2**15, b"1" * 32)
+    with open(sidecar, "wb") as binfile:
+        binfile.write(b"d8:announce")
+    with pytest.raises(ValueError):
+        LeafReader(sidecar)
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+@pytest.mark.parametrize("extra", [0, 1, 2**14 + 7])
+@pytest.mark.parametrize("piece_length", [2**i for i in range(14, 22)])
+def test_leaves_to_layer(backend, extra, piece_length):
+    """
+    Test piece layers calculated from leaves match hashing the file.
+    """
+    tfile = tempfile(exp=19)
+    with open(tfile, "ab") as binfile:
+        binfile.write(bytes(extra))
+    leaves = hash_file(tfile, 2**14, keep_leaves=True)[4]
+    root, layer = hash_file(tfile, piece_length, backend=backend)[:2]
+    assert leaves_to_layer(leaves, piece_length, backend) == (root, layer)
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("meta_version", ["2", "3"])
+def test_assembler_from_leaves(dir1, sidecar, meta_version, workers,
+                               monkeypatch):
+    """
+    Test torrents created from saved leaves match hashing the content.
+    """
+    monkeypatch.setattr(hasher, "SEGMENT_SIZE", 2**16)
+    monkeypatch.setattr(hasher, "MIN_SEGMENT_SIZE", 2**14)
+    args = {"path": dir1, "workers": workers, "pool": "thread"}
+    original = TorrentAssembler(piece_length=2**14,
+                                meta_version=meta_version,
+                                save_leaves=sidecar,
+                                **args)
+    expected = TorrentAssembler(piece_length=2**14,
+                                meta_version=meta_version,
+                                **args)
+    assert contents(original) == contents(expected)
+    for piece_length in [2**14, 2**16, 2**18, 2**20]:
+        expected = contents(
+            TorrentAssembler(piece_length=piece_length,
+                             meta_version="2",
+                             **args))
+        with monkeypatch.context() as patch:
+            patch.setattr(torrent_module, "FileHasher", no_hashing)
+            patch.setattr(torrent_module, "hash_file", no_hashing)
+            patch.setattr(torrent_module, "hash_segment", no_hashing)
+            torrent = TorrentAssembler(piece_length=piece_length,
+                                       meta_version="2",
+                                       from_leaves=sidecar,
+                                       **args)
+        assert contents(torrent) == expected
+
+
+def test_assembler_from_leaves_single_file(sidecar):
+    """
+    Test single file torrents created from saved leaves.
+    """
+    tfile = tempfile(exp=20)
+    TorrentAssembler(path=tfile, meta_version="2", save_leaves=sidecar)
+    torrent = TorrentAssembler(path=tfile,
+                               meta_version="2",
+                               piece_length=2**19,
+                               from_leaves=sidecar)
+    expected = TorrentAssembler(path=tfile,
+                                meta_version="2",
+                                piece_length=2**19)
+    assert contents(torrent) == contents(expected)
+    rmpath(tfile)
+
+
+def test_assembler_from_leaves_changed_file(dir1, sidecar):
+    """
+    Test files that changed size since the leaves were saved are hashed.
+    """
+    TorrentAssembler(path=dir1, meta_version="2", save_leaves=sidecar)
+    with open(get_file_list(dir1)[0], "ab") as binfile:
+        binfile.write(bytes(10))
+    torrent = TorrentAssembler(path=dir1,
+                               meta_version="2",
+                               piece_length=2**16,
+                               from_leaves=sidecar)
+    expected = TorrentAssembler(path=dir1,
+                                meta_version="2",
+                                piece_length=2**16)
+    assert contents(torrent) == contents(expected)
+
+
+def test_assembler_from_leaves_hybrid(dir1, sidecar):
+    """
+    Test hybrid torrents can not be created from leaves.
+    """
+    TorrentAssembler(path=dir1, meta_version="2", save_leaves=sidecar)
+    with pytest.raises(ArgumentError):
+        TorrentAssembler(path=dir1, meta_version="3", from_leaves=sidecar)
+
+
+def test_cli_from_leaves(dir1, sidecar):
+    """
+    Test the save leaves and from leaves cli options.
+    """
+    outfile = str(dir1) + ".torrent"
+    args = ["torrentfile", "create", str(dir1), "-o", outfile]
+    sys.argv = args + ["--meta-version", "3", "--save-leaves", sidecar]
+    execute()
+    sys.argv = args + ["--meta-version", "2", "--piece-length", "18"]
+    execute()
+    expected = pyben.load(outfile)
+    sys.argv = args + [
+        "--meta-version", "2", "--piece-length", "18", "--from-leaves",
+        sidecar
+    ]
+    execute()
+    torrent = pyben.load(outfile)
+    assert torrent["info"] == expected["info"]
+    assert torrent["piece layers"] == expected["piece layers"]
+    sys.argv = args + ["--from-leaves", sidecar]
+    with pytest.raises(ArgumentError):
+        execute()
+    rmpath(outfile)
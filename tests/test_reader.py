@@ -0,0 +1,450 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for the reader module.
+"""
+
+import os
+import threading
+
+import pytest
+
+from tests import dir2, rmpath, tempfile
+from torrentfile.hasher import FileHasher, Hasher, HasherHybrid, HasherV2
+from torrentfile import reader as reader_module
+from torrentfile.reader import (IO_MODES, BlockReader, DirectReader,
+                                DontNeedReader, ReadAhead, ReadAheadReader,
+                                open_ranges, open_reader)
+from torrentfile.stats import Stats
+from torrentfile.recheck import Checker, FeedChecker
+from torrentfile.torrent import TorrentAssembler, TorrentFile
+from torrentfile.utils import get_file_list
+
+
+def test_fixtures():
+    """
+    Test pytest fixtures.
+    """
+    assert dir2
+
+
+@pytest.mark.parametrize("io_mode", IO_MODES)
+@pytest.mark.parametrize("amount", [2**10, 2**14, 2**16 + 3])
+def test_reader_contents(io_mode, amount):
+    """
+    Test readers return the complete contents of the file.
+    """
+    tfile = tempfile(exp=18)
+    with open(tfile, "rb") as binfile:
+        expected = binfile.read()
+    data = bytearray()
+    with open_reader(tfile, amount, io_mode) as reader:
+        while True:
+            view = reader.read(amount)
+            if not view:
+                break
+            data.extend(view)
+    assert data == expected
+    rmpath(tfile)
+
+
+def test_reader_empty_file_fallback():
+    """
+    Test mmap mode falls back to buffered reads for empty files.
+    """
+    tfile = tempfile(exp=18)
+    with open(tfile, "wb") as _:
+        pass
+    reader = open_reader(tfile, 2**14, "mmap")
+    assert isinstance(reader, BlockReader)
+    assert not reader.read(2**14)
+    reader.close()
+    rmpath(tfile)
+
+
+def test_reader_grows_buffer():
+    """
+    Test buffered reader accepts reads larger than its buffer.
+    """
+    tfile = tempfile(exp=18)
+    with BlockReader(tfile, 2**10) as reader:
+        assert len(reader.read(2**16)) == 2**16
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("piece_length", [2**14, 2**16, 2**18])
+def test_io_mode_hashers_match(piece_length):
+    """
+    Test hashers produce the same results with each io mode.
+    """
+    tfile = tempfile(exp=19)
+    with open(tfile, "ab") as binfile:
+        binfile.write(bytes(777))
+    results = []
+    for io_mode in IO_MODES:
+        kws = {"progress": 0, "progress_bar": Hasher.NoProg()}
+        kws["io_mode"] = io_mode
+        pieces = b"".join(Hasher([tfile], piece_length, **kws))
+        v2 = HasherV2(tfile, piece_length, **kws)
+        hybrid = HasherHybrid(tfile, piece_length, **kws)
+        hasher = FileHasher(tfile, piece_length, hybrid=True, **kws)
+        layers = list(hasher)
+        results.append((pieces, v2.root, hybrid.root, hybrid.pieces,
+                        hasher.root, layers))
+    assert all(result == results[0] for result in results)
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("extra", [0, 1, 4095, 4097])
+def test_direct_reader_tail(extra):
+    """
+    Test direct reads return unaligned tails of files.
+    """
+    tfile = tempfile(exp=16)
+    with open(tfile, "ab") as binfile:
+        binfile.write(bytes(range(256)) * 20)
+    with open(tfile, "r+b") as binfile:
+        binfile.truncate(2**16 + extra)
+        expected = binfile.read()
+    with open_reader(tfile, 2**14, "direct") as reader:
+        data = bytearray()
+        while True:
+            view = reader.read(2**14)
+            if not view:
+                break
+            data.extend(view)
+    assert data == expected
+    rmpath(tfile)
+
+
+def test_direct_reader_refused_tail(monkeypatch):
+    """
+    Test the tail is read normally when direct reads of it fail.
+    """
+    tfile = tempfile(exp=14)
+    with open(tfile, "ab") as binfile:
+        binfile.write(bytes(100))
+    try:
+        reader = DirectReader(tfile, 2**14)
+    except OSError:  # pragma: nocover
+        pytest.skip("O_DIRECT is not supported here")
+    assert len(reader.read(2**14)) == 2**14
+
+    def refuse(*_):
+        raise OSError("unaligned")
+
+    monkeypatch.setattr(reader, "fd", type("Refuse", (), {
+        "readinto": refuse,
+        "close": lambda: None
+    }))
+    assert reader.read(2**14) == bytes(100)
+    assert not reader.read(2**14)
+    reader.close()
+    rmpath(tfile)
+
+
+def test_direct_reader_fallback(monkeypatch):
+    """
+    Test direct mode falls back to buffered reads when unsupported.
+    """
+    tfile = tempfile(exp=14)
+
+    def unsupported(*_):
+        raise OSError("O_DIRECT is not supported")
+
+    monkeypatch.setattr(reader_module, "DirectReader", unsupported)
+    with open_reader(tfile, 2**14, "direct") as reader:
+        assert type(reader) is BlockReader
+        assert len(reader.read(2**14)) == 2**14
+    rmpath(tfile)
+
+
+def test_dontneed_reader_drops_pages(monkeypatch):
+    """
+    Test the pages behind the read cursor are dropped from the cache.
+    """
+    calls = []
+    monkeypatch.setattr(reader_module, "DONTNEED_WINDOW", 2**15)
+    monkeypatch.setattr(reader_module, "fadvise",
+                        lambda fd, advice, *args: calls.append((advice, args)))
+    tfile = tempfile(exp=17)
+    with open_reader(tfile, 2**14, "dontneed") as reader:
+        assert isinstance(reader, DontNeedReader)
+        while reader.read(2**14):
+            pass
+    assert calls == [("DONTNEED", (start, 2**15))
+                     for start in range(0, 2**17, 2**15)]
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("io_mode", IO_MODES)
+@pytest.mark.parametrize("offset, length", [(0, 2**14), (5, 4091),
+                                            (4095, 2**15 + 2),
+                                            (2**17 - 7, 100),
+                                            (2**17 + 9, 10)])
+def test_range_reader_contents(io_mode, offset, length):
+    """
+    Test range readers return the same data at unaligned offsets.
+    """
+    tfile = tempfile(exp=17)
+    with open(tfile, "rb") as binfile:
+        data = binfile.read()
+    with open_ranges(tfile, io_mode) as reader:
+        assert reader.pread(length, offset) == data[offset:offset + length]
+    rmpath(tfile)
+
+
+def test_dontneed_range_reader_drops_pages(monkeypatch):
+    """
+    Test the whole pages a range touches are dropped from the cache.
+    """
+    calls = []
+    monkeypatch.setattr(reader_module, "fadvise",
+                        lambda fd, advice, *args: calls.append((advice, args)))
+    tfile = tempfile(exp=15)
+    with open_ranges(tfile, "dontneed") as reader:
+        reader.pread(5000, 3000)
+    page = reader_module.mmap.PAGESIZE
+    assert calls == [("DONTNEED", (0, -(-8000 // page) * page))]
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("io_mode", IO_MODES)
+def test_io_mode_workers(dir2, io_mode):
+    """
+    Test worker pools and resumed v1 jobs read with the io mode.
+    """
+    paths = get_file_list(dir2)
+    with open(paths[0], "ab") as binfile:
+        binfile.write(os.urandom(2**23))
+    size = sum(os.path.getsize(path) for path in paths)
+    with open_ranges(paths[0], io_mode) as reader:
+        mode = reader.mode
+    args = {"path": dir2, "io_mode": io_mode, "piece_length": 2**14}
+    torrents = [
+        TorrentFile(workers=4, **args),
+        TorrentAssembler(workers=4, pool="thread", meta_version="3", **args)
+    ]
+    pieces = torrents[0].meta["info"]["pieces"]
+    for torrent in torrents:
+        assert torrent.stats.counters["bytes_read_" + mode] == size
+        assert torrent.stats.bytes_read == size
+    assert pieces == TorrentFile(path=dir2,
+                                 piece_length=2**14).meta["info"]["pieces"]
+    assert torrents[1].meta["info"] == TorrentAssembler(
+        path=dir2, meta_version="3", piece_length=2**14).meta["info"]
+    resumed = Hasher(paths, 2**14, io_mode=io_mode)
+    job = Stats()
+    with job.collect():
+        assert b"".join(resumed._iter_parallel(2)) == pieces[40:]
+    assert job.counters["bytes_read_" + mode] == size - 2**15
+
+
+@pytest.mark.parametrize("io_mode", IO_MODES)
+def test_io_stats(io_mode):
+    """
+    Test the bytes read with each io mode are counted.
+    """
+    tfile = tempfile(exp=16)
+    job = Stats()
+    with job.collect(), open_reader(tfile, 2**14, io_mode) as reader:
+        while reader.read(2**14):
+            pass
+    with job.collect(), open_ranges(tfile, io_mode) as ranges:
+        assert ranges.mode == reader.mode
+        assert len(ranges.pread(2**15, 2**15 + 5)) == 2**15 - 5
+    modes = {mode: job.counters["bytes_read_" + mode] for mode in IO_MODES}
+    assert job.bytes_read == 2**16 + 2**15 - 5
+    assert modes == {
+        mode: job.bytes_read if mode == reader.mode else 0
+        for mode in IO_MODES
+    }
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("depth", [1, 2, 8])
+@pytest.mark.parametrize("size", [2**10, 2**14, 2**16])
+@pytest.mark.parametrize("amount", [1000, 2**14, 2**17])
+def test_read_ahead_contents(dir2, depth, size, amount):
+    """
+    Test the read ahead pipeline returns every file's contents in order.
+    """
+    paths = get_file_list(dir2)
+    with ReadAhead(paths, size, depth) as pipeline:
+        for path in paths:
+            data = bytearray()
+            with pipeline.open(path) as reader:
+                while True:
+                    view = reader.read(amount)
+                    if not view:
+                        break
+                    data.extend(view)
+            with open(path, "rb") as binfile:
+                assert data == binfile.read()
+
+
+@pytest.mark.parametrize("depth", [1, 3])
+def test_read_ahead_skips_files(dir2, depth):
+    """
+    Test files that are skipped or closed early are discarded.
+    """
+    paths = get_file_list(dir2)
+    with ReadAhead(paths, 2**12, depth) as pipeline:
+        with pipeline.open(paths[0]) as reader:
+            assert len(reader.read(10)) == 10
+        with pipeline.open(paths[-1]) as reader:
+            data = reader.read(os.path.getsize(paths[-1]) + 1)
+            with open(paths[-1], "rb") as binfile:
+                assert data == binfile.read()
+
+
+def test_read_ahead_missing_file():
+    """
+    Test errors opening a file are raised when it is read.
+    """
+    tfile = tempfile(exp=14)
+    missing = str(tfile) + ".missing"
+    with ReadAhead([missing, tfile], 2**14) as pipeline:
+        reader = pipeline.open(missing)
+        with pytest.raises(FileNotFoundError):
+            reader.read(10)
+        assert len(pipeline.open(tfile).read(2**15)) == 2**14
+    rmpath(tfile)
+
+
+def test_read_ahead_close_stops_opening(monkeypatch):
+    """
+    Test no more files are opened once the pipeline is closed.
+    """
+    paths = [tempfile(exp=12) for _ in range(8)]
+    gate = threading.Event()
+    opened = []
+    original = ReadAhead._open
+
+    def _open(self, path):
+        opened.append(path)
+        gate.wait()
+        return original(self, path)
+
+    monkeypatch.setattr(ReadAhead, "_open", _open)
+    pipeline = ReadAhead(paths, 2**12, 4)
+    closer = threading.Thread(target=pipeline.close)
+    closer.start()
+    while not pipeline.closed:
+        pass
+    gate.set()
+    closer.join()
+    assert opened == paths[:1]
+    for path in paths:
+        rmpath(path)
+
+
+def test_read_ahead_closed_on_error(dir2):
+    """
+    Test hashers stop reading ahead when hashing fails.
+    """
+
+    class Failing:
+        """Progress bar and hash backend that fail on first use."""
+
+        @staticmethod
+        def update(_):
+            """Raise an error."""
+            raise RuntimeError
+
+        piece_hash = update
+
+    paths = get_file_list(dir2)
+    hasher = Hasher(paths, 2**14, progress=0, progress_bar=Failing(),
+                    read_ahead=2)
+    with pytest.raises(RuntimeError):
+        next(hasher)
+    assert not hasher.pipeline.thread.is_alive()
+    outfile = str(dir2) + ".torrent"
+    TorrentFile(path=dir2, piece_length=2**14, outfile=outfile).write()
+    checker = Checker(outfile, str(dir2), read_ahead=2)
+    feeder = iter(FeedChecker(checker))
+    feeder.backend = Failing()
+    with pytest.raises(RuntimeError):
+        next(feeder)
+    assert not feeder.pipeline.thread.is_alive()
+    rmpath(outfile)
+
+
+def test_open_reader_read_ahead():
+    """
+    Test open_reader returns a reader that owns its pipeline.
+    """
+    tfile = tempfile(exp=18)
+    reader = open_reader(tfile, 2**14, read_ahead=2)
+    assert isinstance(reader, ReadAheadReader)
+    assert len(reader.read(2**18)) == 2**18
+    reader.close()
+    assert not reader.pipeline.thread.is_alive()
+    rmpath(tfile)
+
+
+@pytest.mark.parametrize("piece_length", [2**14, 2**16])
+@pytest.mark.parametrize("read_ahead", [1, 4])
+def test_read_ahead_hashers_match(dir2, piece_length, read_ahead):
+    """
+    Test hashers produce the same results reading ahead.
+    """
+    paths = get_file_list(dir2)
+    results = []
+    for depth in [0, read_ahead]:
+        kws = {"progress": 0, "progress_bar": Hasher.NoProg()}
+        kws["read_ahead"] = depth
+        pieces = b"".join(Hasher(paths, piece_length, **kws))
+        v2 = HasherV2(paths[-1], piece_length, **kws)
+        hybrid = HasherHybrid(paths[-1], piece_length, **kws)
+        hasher = FileHasher(paths[-1], piece_length, hybrid=True, **kws)
+        layers = list(hasher)
+        results.append((pieces, v2.root, hybrid.root, hybrid.pieces,
+                        hasher.root, layers))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("io_mode", IO_MODES)
+def test_read_ahead_io_modes(dir2, io_mode):
+    """
+    Test the read ahead pipeline reads files with each io mode.
+    """
+    paths = get_file_list(dir2)
+    with ReadAhead(paths, 2**14, 2, io_mode) as pipeline:
+        for path in paths:
+            with pipeline.open(path) as reader:
+                data = reader.read(os.path.getsize(path) + 1)
+                with open(path, "rb") as binfile:
+                    assert data == binfile.read()
+
+
+@pytest.mark.parametrize("io_mode", IO_MODES)
+@pytest.mark.parametrize("read_ahead", [0, 1, 4])
+def test_read_ahead_recheck(dir2, read_ahead, io_mode):
+    """
+    Test rechecking v1 content while reading ahead.
+    """
+    outfile = str(dir2) + ".torrent"
+    torrent = TorrentFile(path=dir2, piece_length=2**15, outfile=outfile)
+    torrent.write()
+    checker = Checker(outfile, str(dir2), read_ahead=read_ahead,
+                      io_mode=io_mode)
+    assert checker.results() == 100
+    rmpath(outfile)
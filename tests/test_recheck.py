@@ -24,6 +24,8 @@ import os
 import sys
 from pathlib import Path
 
+import pytest
+
 from tests import (
     dir1, dir2, file1, file2, filemeta1, filemeta2, metafile1, metafile2,
     rmpath, sizedfiles, sizes)
@@ -142,6 +144,32 @@ def test_checker_cli_args(dir1, metafile1):
     assert output == 100
 
 
+@pytest.mark.parametrize("backend", ["hashlib", "batched", "compiled"])
+def test_checker_hash_backend(dir1, metafile1, backend):
+    """
+    Test recheck with each hash backend selected on the command line.
+    """
+    sys.argv = [
+        "torrentfile", "check", "--hash-backend", backend,
+        str(metafile1),
+        str(dir1)
+    ]
+    assert main() == 100
+
+
+@pytest.mark.parametrize("io_mode", ["mmap", "dontneed", "direct"])
+def test_checker_io_mode(dir1, metafile1, io_mode):
+    """
+    Test recheck with each io mode selected on the command line.
+    """
+    sys.argv = [
+        "torrentfile", "check", "--io-mode", io_mode,
+        str(metafile1),
+        str(dir1)
+    ]
+    assert main() == 100
+
+
 def test_checker_parent_dir(dir1, metafile1):
     """
     Test providing the parent directory for torrent checking feature.
@@ -0,0 +1,194 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for the stats module.
+"""
+
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+from tests import dir1, rmpath
+from torrentfile import stats
+from torrentfile.cli import execute
+from torrentfile.rebuild import Assembler
+from torrentfile.recheck import Checker
+from torrentfile.stats import Stats, Timer
+from torrentfile.torrent import TorrentAssembler, TorrentFile
+from torrentfile.utils import get_file_list
+
+
+def test_fixtures():
+    """
+    Test pytest fixtures.
+    """
+    assert dir1
+
+
+def test_stats_collect():
+    """
+    Test only work done while collecting is counted, once when nested.
+    """
+    job = Stats()
+    stats.add("files", 5)
+    assert not stats.collecting()
+    with job.collect():
+        with job.collect():
+            assert stats.collecting()
+            stats.add("bytes_read", 10)
+            with Timer("hash"):
+                pass
+    assert not stats.collecting()
+    assert job.bytes_read == 10 and job.files == 0
+    assert job.hash > 0 and job.elapsed >= job.hash
+    assert job.peak_rss is None or job.peak_rss > 0
+    with pytest.raises(AttributeError):
+        job.missing  # pylint: disable=pointless-statement
+
+
+def test_stats_concurrent_jobs():
+    """
+    Test jobs collecting in different threads only count their own work.
+    """
+    jobs = [Stats(), Stats()]
+    barrier = threading.Barrier(2)
+
+    def run(job, amount):
+        with job.collect():
+            barrier.wait()
+            stats.add("bytes_read", amount)
+            barrier.wait()
+
+    threads = [
+        threading.Thread(target=run, args=(job, num + 1))
+        for num, job in enumerate(jobs)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [job.bytes_read for job in jobs] == [1, 2]
+
+
+def test_stats_bind_nested():
+    """
+    Test bound threads count towards the job, and nested jobs count twice.
+    """
+    outer, inner = Stats(), Stats()
+    with outer.collect():
+        with inner.collect():
+            thread = threading.Thread(
+                target=stats.bind(lambda: stats.add("pieces", 3)))
+            thread.start()
+            thread.join()
+            thread = threading.Thread(target=lambda: stats.add("pieces", 5))
+            thread.start()
+            thread.join()
+        stats.add("files")
+    assert inner.pieces == 3 and inner.files == 0
+    assert outer.pieces == 3 and outer.files == 1
+    assert stats.bind(len) is len
+
+
+def test_stats_format():
+    """
+    Test statistics are formatted as text and json.
+    """
+    job = Stats()
+    job.count("pieces", 3)
+    assert json.loads(job.format("json"))["pieces"] == 3
+    assert "pieces" in job.format()
+
+
+@pytest.mark.parametrize("meta_version", ["1", "2", "3"])
+def test_torrent_stats(dir1, meta_version):
+    """
+    Test the stats of creating and writing torrents.
+    """
+    args = {"path": dir1, "piece_length": 2**15, "meta_version": meta_version}
+    if meta_version == "1":
+        torrent = TorrentFile(**args)
+    else:
+        torrent = TorrentAssembler(**args)
+    size = sum(os.path.getsize(path) for path in get_file_list(dir1))
+    assert torrent.stats.bytes_read == size
+    assert torrent.stats.files == len(get_file_list(dir1))
+    assert torrent.stats.pieces == size // 2**15
+    assert torrent.stats.hash > 0 and torrent.stats.read > 0
+    assert torrent.stats.buffers > 0
+    if meta_version != "1":
+        assert torrent.stats.merkle > 0
+    torrent.write(str(dir1) + ".torrent")
+    assert torrent.stats.encode > 0 and torrent.stats.write > 0
+    rmpath(str(dir1) + ".torrent")
+
+
+@pytest.mark.parametrize("meta_version", ["1", "2"])
+def test_checker_stats(dir1, meta_version):
+    """
+    Test the stats of rechecking torrents.
+    """
+    outfile, _ = TorrentAssembler(path=dir1,
+                                  meta_version=meta_version,
+                                  piece_length=2**15).write(
+                                      str(dir1) + ".torrent")
+    if meta_version == "1":
+        outfile, _ = TorrentFile(path=dir1, piece_length=2**15).write(outfile)
+    checker = Checker(outfile, dir1)
+    checker.results()
+    size = sum(os.path.getsize(path) for path in get_file_list(dir1))
+    assert checker.stats.files == len(get_file_list(dir1))
+    assert checker.stats.bytes_read == size
+    assert checker.stats.pieces > 0 and checker.stats.hash > 0
+    assert checker.stats.encode > 0
+    rmpath(outfile)
+
+
+def test_assembler_stats(dir1):
+    """
+    Test the stats of rebuilding torrents.
+    """
+    outfile, _ = TorrentFile(path=dir1).write(str(dir1) + ".torrent")
+    dest = str(dir1) + "_rebuilt"
+    assembler = Assembler([outfile], [os.path.dirname(dir1)], dest)
+    copied = assembler.assemble_torrents()
+    assert copied and assembler.stats.files == copied
+    assert assembler.stats.pieces > 0 and assembler.stats.write > 0
+    rmpath(outfile, dest)
+
+
+def test_cli_stats(dir1, capsys):
+    """
+    Test the stats cli option.
+    """
+    outfile = str(dir1) + ".torrent"
+    sys.argv = [
+        "torrentfile", "create", str(dir1), "-o", outfile, "--stats=json"
+    ]
+    args = execute()
+    output = capsys.readouterr().out
+    report = json.loads(output[output.index("{"):])
+    assert report["files"] == args.torrent.stats.files
+    sys.argv = ["torrentfile", "recheck", outfile, str(dir1), "--stats"]
+    execute()
+    assert "bytes_read" in capsys.readouterr().out
+    rmpath(outfile)
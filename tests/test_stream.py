@@ -0,0 +1,148 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for creating torrents from streams.
+"""
+
+import io
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from tests import rmpath, tempfile
+from torrentfile.cli import execute
+from torrentfile.hasher import hash_stream
+from torrentfile.torrent import (TorrentAssembler, TorrentFile,
+                                 TorrentStream)
+from torrentfile.utils import ArgumentError
+
+
+class PipeStream(io.RawIOBase):
+    """
+    Unseekable stream returning at most 1000 bytes from each read.
+    """
+
+    def __init__(self, data: bytes):
+        """
+        Hold the data of the stream.
+        """
+        super().__init__()
+        self.data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        """
+        Return True, the stream is readable.
+        """
+        return True
+
+    def readinto(self, buffer) -> int:
+        """
+        Read up to 1000 bytes into buffer.
+        """
+        return self.data.readinto(memoryview(buffer)[:1000])
+
+
+@pytest.fixture(params=[0, 1, 2**14, 2**15, 2**17 + 5000])
+def content(request):
+    """
+    Yield the path and data of a file of several sizes.
+    """
+    path = Path(tempfile(exp=18))
+    with open(path, "r+b") as binfile:
+        binfile.truncate(request.param)
+    yield str(path), path.read_bytes()
+    rmpath(path)
+
+
+@pytest.mark.parametrize("meta_version", ["1", "2", "3"])
+def test_stream_matches_file(content, meta_version):
+    """
+    Test torrents created from streams match those created from files.
+    """
+    path, data = content
+    name = os.path.basename(path)
+    args = {"piece_length": 2**15, "meta_version": meta_version}
+    torrent = TorrentStream(stream=PipeStream(data), name=name, **args)
+    if meta_version == "1":
+        expected = TorrentFile(path=path, **args)
+    else:
+        expected = TorrentAssembler(path=path, **args)
+    assert torrent.meta["info"] == expected.meta["info"]
+    assert torrent.meta.get("piece layers") == expected.meta.get(
+        "piece layers")
+
+
+def test_hash_stream_tee(content):
+    """
+    Test the stream is copied to the tee and its length returned.
+    """
+    _, data = content
+    tee = io.BytesIO()
+    length = hash_stream(PipeStream(data), 2**14, v2=True, tee=tee)[0]
+    assert length == len(data)
+    assert tee.getvalue() == data
+
+
+def test_stream_length():
+    """
+    Test the piece length is chosen from the expected length.
+    """
+    data = bytes(2**20)
+    torrent = TorrentStream(stream=io.BytesIO(data),
+                            name="zeros",
+                            length=len(data),
+                            progress=0)
+    assert torrent.piece_length == 2**14
+    assert torrent.meta["info"]["length"] == 2**20
+    torrent = TorrentStream(stream=io.BytesIO(data), name="zeros")
+    assert torrent.piece_length == 2**20
+    with pytest.raises(ArgumentError):
+        TorrentStream(stream=io.BytesIO(data), name="zeros", length=10)
+
+
+def test_stream_name_required():
+    """
+    Test a name is required for streams.
+    """
+    with pytest.raises(ArgumentError):
+        TorrentStream(stream=io.BytesIO(b"1"))
+
+
+def test_cli_stream(monkeypatch):
+    """
+    Test creating torrents from stdin on the command line.
+    """
+    path = tempfile(exp=17)
+    data = Path(path).read_bytes()
+    outfile = str(path) + ".torrent"
+    teefile = str(path) + ".tee"
+    stdin = io.TextIOWrapper(io.BytesIO(data))
+    monkeypatch.setattr(sys, "stdin", stdin)
+    sys.argv = [
+        "torrentfile", "create", "-", "--name",
+        os.path.basename(path), "--length",
+        str(len(data)), "--tee", teefile, "-o", outfile
+    ]
+    args = execute()
+    assert Path(teefile).read_bytes() == data
+    expected = TorrentFile(path=path, piece_length=args.torrent.piece_length)
+    assert args.meta["info"] == expected.meta["info"]
+    rmpath(path, outfile, teefile)
@@ -20,12 +20,15 @@
 Testing functions for the torrent module.
 """
 import os
+import sys
+import time
 
 import pytest
 
 from tests import dir1, dir2, rmpath, tempfile, torrents
-from torrentfile.mixins import ProgMixin, waiting
-from torrentfile.torrent import MetaFile
+from torrentfile.mixins import (ProgMixin, ProgressAggregator, ProgressBar,
+                                clock, waiting)
+from torrentfile.torrent import MetaFile, TorrentAssembler
 from torrentfile.utils import MissingPathError
 
 
@@ -241,3 +244,119 @@ def test_progress_bar(params):
     while progbar.state < total:
         progbar.update(1 << increment)
     assert progbar.state >= total
+
+
+@pytest.mark.parametrize("tty", [True, False])
+def test_progress_bar_rate_limited(monkeypatch, capsys, tty):
+    """
+    Test the progress bar is only drawn when enough time has passed.
+    """
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: tty, raising=False)
+    progbar = ProgressBar.new(2**29, "some/fake/path")
+    for _ in range(100):
+        progbar.update(2**20)
+    now[0] += progbar.interval
+    progbar.update(2**20)
+    progbar.close_out()
+    output = capsys.readouterr().out
+    lines = output.split("\r" if tty else "\n")
+    assert len([line for line in lines if "MiB" in line]) == 2
+    assert "101.00/512.00 MiB" in output
+    assert "/s ETA " in output
+
+
+def test_progress_bar_complete_drawn(monkeypatch, capsys):
+    """
+    Test a complete progress bar is drawn straight away.
+    """
+    monkeypatch.setattr(time, "monotonic", lambda: 100.0)
+    progbar = ProgressBar.new(2**20, "some/fake/path")
+    progbar.update(2**19)
+    progbar.update(2**19)
+    progbar.close_out()
+    output = capsys.readouterr().out
+    assert "100% 1.00/1.00 MiB" in output
+    assert output.count("\n") == 2
+
+
+@pytest.mark.parametrize("seconds, text",
+                         [(5, "0:05"), (125.5, "2:05"), (3725, "1:02:05")])
+def test_progress_clock(seconds, text):
+    """
+    Test the time remaining format.
+    """
+    assert clock(seconds) == text
+
+
+def test_progress_aggregator_snapshot():
+    """
+    Test the aggregator adds file progress into the job's progress.
+    """
+    tracker = ProgressAggregator(300, "some/fake/path", display=False)
+    tracker.start("a", 100, "a.bin")
+    tracker.start("b", 100, "b.bin")
+    tracker.reporter("a").update(40)
+    tracker.update(10, "b")
+    snapshot = tracker.snapshot()
+    assert snapshot.done == 50 and snapshot.total == 300
+    assert [tuple(i) for i in snapshot.active] == [("a.bin", 40, 100),
+                                                   ("b.bin", 10, 100)]
+    tracker.finish("a", 100)
+    tracker.finish("c", 100)
+    snapshot = tracker.snapshot()
+    assert snapshot.done == 210
+    assert [i.name for i in snapshot.active] == ["b.bin"]
+
+
+def test_progress_aggregator_draw(monkeypatch, capsys):
+    """
+    Test the aggregator draws a bounded number of active file lines.
+    """
+    monkeypatch.setattr(time, "monotonic", lambda: 100.0)
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: True, raising=False)
+    tracker = ProgressAggregator(2**20, "some/fake/path", max_lines=2)
+    for num in range(4):
+        tracker.start(num, 2**18, f"file{num}")
+    tracker.update(2**17, 0)
+    tracker.close_out()
+    output = capsys.readouterr().out
+    assert "file1" in output and "file2" not in output
+    assert "... 2 more" in output
+    assert "0.12/1.00 MiB" in output
+
+
+@pytest.mark.parametrize("pool", ["process", "thread"])
+def test_assembler_tracker(dir1, pool):
+    """
+    Test the progress of a worker pool is reported to a tracker.
+    """
+    tracker = ProgressAggregator(display=False)
+    torrent = TorrentAssembler(path=dir1,
+                               workers=3,
+                               pool=pool,
+                               tracker=tracker)
+    snapshot = tracker.snapshot()
+    assert torrent.tracker is tracker
+    assert snapshot.total == snapshot.done > 0
+    assert not snapshot.active
+
+
+@pytest.mark.parametrize("pool", ["process", "thread"])
+@pytest.mark.parametrize("meta_version", ["2", "3"])
+@pytest.mark.parametrize("piece_length", [2**14, 2**16, 2**18])
+def test_assembler_workers(dir1, pool, meta_version, piece_length):
+    """
+    Test TorrentAssembler with a worker pool matches the serial result.
+    """
+    args = {
+        "path": dir1,
+        "piece_length": piece_length,
+        "meta_version": meta_version,
+        "progress": 0,
+    }
+    serial = TorrentAssembler(**args)
+    parallel = TorrentAssembler(workers=3, pool=pool, **args)
+    assert serial.meta["info"] == parallel.meta["info"]
+    assert serial.meta["piece layers"] == parallel.meta["piece layers"]
@@ -0,0 +1,263 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Testing functions for the update module.
+"""
+
+import os
+import sys
+import time
+
+import pyben
+import pytest
+
+from tests import dir1, rmpath, tempfile
+from torrentfile.cli import execute
+from torrentfile.torrent import TorrentAssembler, TorrentFile
+from torrentfile.update import PreviousTorrent
+from torrentfile.utils import filelist_total, get_file_list
+
+
+def _age(path):
+    """
+    Set the modification time of a file or every file in a directory to
+    an hour ago.
+    """
+    stamp = time.time() - 3600
+    paths = [path] if os.path.isfile(path) else get_file_list(path)
+    for filepath in paths:
+        os.utime(filepath, (stamp, stamp))
+
+
+def _previous(torrent_class, **kwargs):
+    """
+    Create and write a torrent for aged content, returning its path.
+    """
+    _age(kwargs["path"])
+    outfile = str(kwargs["path"]) + ".old.torrent"
+    torrent_class(**kwargs).write(outfile)
+    return outfile
+
+
+def test_fixtures():
+    """
+    Test pytest fixtures.
+    """
+    assert dir1
+
+
+@pytest.mark.parametrize("align", [False, True])
+@pytest.mark.parametrize("change", [0, 1, 2**16 + 3])
+def test_torrentfile_update(dir1, align, change):
+    """
+    Test updated v1 torrents match a new torrent and reuse pieces.
+    """
+    args = {"path": dir1, "piece_length": 2**15, "align": align}
+    old = _previous(TorrentFile, **args)
+    with open(get_file_list(dir1)[1], "ab") as binfile:
+        binfile.write(bytes(change))
+    if not change:
+        os.utime(get_file_list(dir1)[1])
+    torrent = TorrentFile(update=old, **args)
+    expected = TorrentFile(**args)
+    assert torrent.meta["info"] == expected.meta["info"]
+    assert torrent.previous.reused > 0
+    assert torrent.previous.hashed < len(torrent.meta["info"]["pieces"]) // 20
+    rmpath(old)
+
+
+def test_torrentfile_update_unchanged(dir1):
+    """
+    Test nothing is hashed when no files changed.
+    """
+    old = _previous(TorrentFile, path=dir1, piece_length=2**14)
+    torrent = TorrentFile(path=dir1, update=old)
+    assert torrent.piece_length == 2**14
+    assert torrent.previous.hashed == 0
+    assert torrent.meta["info"]["pieces"] == pyben.load(old)["info"]["pieces"]
+    rmpath(old)
+
+
+def test_torrentfile_update_removed_file(dir1):
+    """
+    Test removing a file shifts the pieces after it.
+    """
+    args = {"path": dir1, "piece_length": 2**14}
+    old = _previous(TorrentFile, **args)
+    rmpath(get_file_list(dir1)[0])
+    filelist_total.cache.clear()
+    torrent = TorrentFile(update=old, **args)
+    assert torrent.meta["info"] == TorrentFile(**args).meta["info"]
+    filelist_total.cache.clear()
+    rmpath(old)
+
+
+def _content(root, sizes):
+    """
+    Write files of the given sizes to a directory, returning its path.
+    """
+    for num, size in enumerate(sizes):
+        (root / chr(ord("a") + num)).write_bytes(os.urandom(size))
+    return str(root)
+
+
+def test_torrentfile_update_aligned_offsets(tmp_path):
+    """
+    Test aligned updates find files that do not end on half pieces.
+    """
+    piece_length = 2**16
+    sizes = [
+        piece_length * 5 // 4, piece_length * 5 // 4, piece_length * 3,
+        piece_length * 2 + 5
+    ]
+    args = {
+        "path": _content(tmp_path, sizes),
+        "piece_length": piece_length,
+        "align": True,
+    }
+    old = _previous(TorrentFile, **args)
+    with open(tmp_path / "d", "ab") as binfile:
+        binfile.write(b"1")
+    torrent = TorrentFile(update=old, **args)
+    assert torrent.meta["info"] == TorrentFile(**args).meta["info"]
+    assert torrent.previous.hashed == 3
+    rmpath(old)
+
+
+def test_update_misaligned_padding(tmp_path):
+    """
+    Test nothing is reused when padding files do not align the files.
+    """
+    piece_length = 2**16
+    path = _content(tmp_path, [piece_length * 5 // 4] * 3)
+    old = _previous(TorrentFile, path=path, piece_length=piece_length)
+    meta = pyben.load(old)
+    meta["info"]["files"].insert(1, {
+        "attr": "p",
+        "length": 7,
+        "path": [".pad", "7"]
+    })
+    pyben.dump(meta, old)
+    previous = PreviousTorrent(old, path)
+    assert not previous.align
+    assert previous.files == {}
+    assert not previous.piece_index({("a", ), ("b", ), ("c", )})
+    rmpath(old)
+
+
+def test_update_unchanged_same_second(dir1):
+    """
+    Test files modified in the second the torrent was created are changed.
+    """
+    old = _previous(TorrentFile, path=dir1, piece_length=2**15)
+    previous = PreviousTorrent(old, dir1)
+    path = get_file_list(dir1)[0]
+    parts = [os.path.basename(path)]
+    length = os.path.getsize(path)
+    stamp = previous.stamp * 10**9
+    assert previous.unchanged(path, parts, length, stamp - 1)
+    assert not previous.unchanged(path, parts, length, stamp)
+    assert not previous.unchanged(path, parts, length, stamp + 10**8)
+    rmpath(old)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("meta_version", ["2", "3"])
+def test_assembler_update(dir1, meta_version, workers):
+    """
+    Test updated v2 and hybrid torrents only hash changed files.
+    """
+    args = {
+        "path": dir1,
+        "meta_version": meta_version,
+        "piece_length": 2**15,
+        "workers": workers,
+        "pool": "thread",
+    }
+    old = _previous(TorrentAssembler, **args)
+    paths = get_file_list(dir1)
+    with open(paths[0], "ab") as binfile:
+        binfile.write(bytes(100))
+    torrent = TorrentAssembler(update=old, **args)
+    expected = TorrentAssembler(**args)
+    assert torrent.meta["info"] == expected.meta["info"]
+    assert torrent.meta["piece layers"] == expected.meta["piece layers"]
+    assert torrent.previous.reused == len(paths) - 1
+    rmpath(old)
+
+
+def test_assembler_update_hybrid_from_v2(dir1):
+    """
+    Test hybrid torrents hash files a v2 torrent has no pieces for.
+    """
+    args = {"path": dir1, "piece_length": 2**15}
+    old = _previous(TorrentAssembler, meta_version="2", **args)
+    torrent = TorrentAssembler(meta_version="3", update=old, **args)
+    expected = TorrentAssembler(meta_version="3", **args)
+    assert torrent.previous.reused == 0
+    assert torrent.meta["info"] == expected.meta["info"]
+    rmpath(old)
+
+
+def test_update_piece_length_changed(dir1):
+    """
+    Test nothing is reused at another piece length.
+    """
+    old = _previous(TorrentAssembler,
+                    path=dir1,
+                    meta_version="2",
+                    piece_length=2**15)
+    torrent = TorrentAssembler(path=dir1, meta_version="2",
+                               piece_length=2**16, update=old)
+    assert torrent.previous is None
+    rmpath(old)
+
+
+def test_update_single_file():
+    """
+    Test updating single file torrents.
+    """
+    tfile = tempfile(exp=20)
+    old = _previous(TorrentAssembler, path=tfile, meta_version="3")
+    previous = PreviousTorrent(old, tfile)
+    assert previous.unchanged(tfile, [os.path.basename(tfile)], 2**20)
+    assert not previous.unchanged(tfile, ["other"], 2**20)
+    torrent = TorrentAssembler(path=tfile, meta_version="3", update=old)
+    assert torrent.previous.reused == 1
+    expected = TorrentAssembler(path=tfile, meta_version="3")
+    assert torrent.meta["info"] == expected.meta["info"]
+    rmpath(tfile, old)
+
+
+def test_cli_update(dir1):
+    """
+    Test the update cli option.
+    """
+    outfile = str(dir1) + ".torrent"
+    old = _previous(TorrentFile, path=dir1, piece_length=2**16)
+    with open(get_file_list(dir1)[-1], "ab") as binfile:
+        binfile.write(b"1")
+    sys.argv = [
+        "torrentfile", "create", str(dir1), "--update", old, "-o", outfile
+    ]
+    args = execute()
+    assert args.torrent.piece_length == 2**16
+    assert args.meta["info"] == TorrentFile(path=dir1,
+                                            piece_length=2**16).meta["info"]
+    rmpath(old, outfile)
@@ -19,6 +19,7 @@
 """
 Unittest functions for testing torrentfile utils module.
 """
+import os
 import math
 
 import pytest
@@ -257,3 +258,160 @@ def test_argument_error():
         raise utils.ArgumentError("This message raised by argument error")
     except utils.ArgumentError:
         assert True
+
+
+def test_manifest_matches_walk(dir1):
+    """
+    Test the manifest lists the files of a walk with their status.
+    """
+    manifest = utils.FileManifest(dir1)
+    paths = []
+    for root, dirs, files in os.walk(dir1):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in files)
+    assert sorted(manifest.path(i) for i in range(len(manifest))) == sorted(
+        paths)
+    assert [manifest.path(i) for i in manifest.sorted()] == sorted(paths)
+    assert manifest.size == sum(os.path.getsize(path) for path in paths)
+    for index in range(len(manifest)):
+        stat = os.stat(manifest.path(index))
+        assert manifest.stat(index) == (stat.st_dev, stat.st_ino,
+                                        stat.st_size, stat.st_mtime_ns)
+
+
+def test_manifest_single_file(dir1):
+    """
+    Test the manifest of a single file.
+    """
+    path = os.path.join(dir1, os.listdir(dir1)[0])
+    while os.path.isdir(path):
+        path = os.path.join(path, os.listdir(path)[0])
+    manifest = utils.FileManifest(path)
+    assert manifest.single
+    assert manifest.path(0) == path
+    assert manifest.parts(0) == [os.path.basename(path)]
+    assert manifest.file_tree([{"length": 1}]) == {
+        os.path.basename(path): {
+            "": {
+                "length": 1
+            }
+        }
+    }
+
+
+def test_manifest_file_tree_order(tmp_path):
+    """
+    Test the file tree keeps empty directories in walk order.
+    """
+    for relpath in ["a.txt", os.path.join("a", "b.txt"), "c.txt"]:
+        (tmp_path / relpath).parent.mkdir(exist_ok=True)
+        (tmp_path / relpath).write_bytes(b"x")
+    (tmp_path / "b").mkdir()
+    manifest = utils.FileManifest(str(tmp_path))
+    assert manifest.relpaths == [os.path.join("a", "b.txt"), "a.txt", "c.txt"]
+    assert manifest.empty == [(2, "b")]
+    tree = manifest.file_tree([{"length": 1}] * 3)
+    assert list(tree) == ["a", "a.txt", "b", "c.txt"]
+    assert tree["b"] == {}
+    assert [manifest.relpaths[i] for i in manifest.sorted()
+            ] == ["a.txt", os.path.join("a", "b.txt"), "c.txt"]
+
+
+def test_manifest_missing_path(tmp_path):
+    """
+    Test missing paths and dangling links raise MissingPathError.
+    """
+    with pytest.raises(utils.MissingPathError):
+        utils.FileManifest(str(tmp_path / "missing"))
+    os.symlink(tmp_path / "missing", tmp_path / "link")
+    with pytest.raises(utils.MissingPathError):
+        utils.FileManifest(str(tmp_path))
+
+
+def test_memo_invalidated_by_mtime(tmp_path):
+    """
+    Test cached results are stale once the directory changes.
+    """
+    memo = utils.Memo(utils.path_size)
+    (tmp_path / "a").write_bytes(b"1")
+    assert memo(tmp_path) == 1
+    assert memo(str(tmp_path)) == 1
+    assert (memo.hits, memo.misses) == (1, 1)
+    (tmp_path / "b").write_bytes(b"22")
+    os.utime(tmp_path, ns=(0, os.stat(tmp_path).st_mtime_ns + 10**9))
+    assert memo(tmp_path) == 3
+    assert memo.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "size": 1
+    }
+
+
+def test_memo_bounded(tmp_path):
+    """
+    Test the least recently used result is evicted beyond maxsize.
+    """
+    memo = utils.Memo(os.path.basename, maxsize=2)
+    paths = []
+    for name in "abc":
+        (tmp_path / name).write_bytes(b"")
+        paths.append(str(tmp_path / name))
+    memo(paths[0])
+    memo(paths[1])
+    memo(paths[0])
+    memo(paths[2])
+    assert [key[0] for key in memo.cache] == [paths[0], paths[2]]
+    assert memo.evictions == 1
+    memo.clear()
+    assert not memo.cache and memo.hits == 1
+
+
+def test_memo_disabled(tmp_path):
+    """
+    Test maxsize 0 keeps nothing.
+    """
+    memo = utils.Memo(os.path.basename, maxsize=0)
+    assert memo(str(tmp_path)) == tmp_path.name
+    assert not memo.cache and memo.misses == 1
+
+
+@pytest.mark.parametrize("walkers", [2, 8])
+def test_manifest_walkers_match_serial(tmp_path, walkers):
+    """
+    Test a walk on several threads finds the same files in the same order.
+    """
+    for relpath in ["a.txt", "a/b.txt", "a/c/d", "b/e", "b-f", "z/y/x"]:
+        path = tmp_path.joinpath(*relpath.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * len(relpath))
+    for relpath in ["empty/inner", "a/c/empty", "c"]:
+        tmp_path.joinpath(*relpath.split("/")).mkdir(parents=True)
+    serial = utils.FileManifest(str(tmp_path), 1)
+    manifest = utils.FileManifest(str(tmp_path), walkers)
+    assert manifest.relpaths == serial.relpaths
+    assert manifest.sizes == serial.sizes
+    assert manifest.inodes == serial.inodes
+    assert manifest.empty == serial.empty
+    leaves = [{"length": size} for size in serial.sizes]
+    assert manifest.file_tree(leaves) == serial.file_tree(leaves)
+    os.symlink(tmp_path / "missing", tmp_path / "a" / "link")
+    with pytest.raises(utils.MissingPathError):
+        utils.FileManifest(str(tmp_path), walkers)
+
+
+def test_walk_workers(monkeypatch):
+    """
+    Test the number of walkers is read from the environment and bounded.
+    """
+    monkeypatch.delenv(utils.WALKERS_ENV, raising=False)
+    assert utils.walk_workers() == 1
+    assert utils.walk_workers(1000) == utils.MAX_WALKERS
+    assert utils.walk_workers(-3) == 1
+    monkeypatch.setenv(utils.WALKERS_ENV, "6")
+    assert utils.walk_workers() == 6
+    assert utils.walk_workers(2) == 2
+    monkeypatch.setenv(utils.WALKERS_ENV, "many")
+    assert utils.walk_workers(2) == 2
+    with pytest.raises(utils.ArgumentError, match=utils.WALKERS_ENV):
+        utils.walk_workers()
@@ -0,0 +1,378 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Hash the members of tar and zip archives without extracting them.
+
+The names and sizes of the files come from the archive's index, and the
+contents of each member are streamed into the hashers in the order they
+are stored, so an uncompressed tar is read from start to end once.  The
+hashes are the same as those of the extracted files.
+
+v2, hybrid and piece aligned v1 pieces only depend on a single file, so
+each member is hashed on its own.  Other v1 pieces can span several files,
+which are ordered by path in the torrent and not by their position in the
+archive, so the parts of pieces that cross file boundaries are held until
+every file they cover has been read.
+
+Classes
+-------
+- `ArchiveMember`
+    name and size of a file in an archive.
+- `Archive`
+    the regular files of a tar or zip archive.
+
+Functions
+---------
+- `hash_members`
+    hash every member on its own.
+- `hash_pieces`
+    hash the v1 pieces of the members joined in torrent order.
+- `split_name`
+    split the name of a member into path components.
+"""
+
+import os
+import math
+import logging
+import tarfile
+import zipfile
+from typing import NamedTuple
+
+from torrentfile.hasher import get_backend, hash_stream
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".tbz2", ".txz", ".tar",
+            ".zip")
+
+
+class ArchiveMember(NamedTuple):
+    """
+    A regular file inside an archive.
+
+    Parameters
+    ----------
+    parts : tuple
+        path of the file inside the torrent, split into components.
+    size : int
+        size of the file.
+    """
+
+    parts: tuple
+    size: int
+
+
+class Archive:
+    """
+    The regular files of a tar or zip archive.
+
+    When every file is inside the same top level directory, that directory
+    is the content of the torrent, as it would be after extracting the
+    archive.  Otherwise the content is named after the archive.
+
+    The directories stored in the archive are kept in `directories`, so
+    empty ones are listed in v2 file trees like those of the extracted
+    content.  Directories that are only implied by the names of files are
+    not stored.
+
+    Parameters
+    ----------
+    path : str
+        path to a tar archive, which may be compressed, or a zip archive.
+
+    Raises
+    ------
+    ValueError
+        the file is not a tar or zip archive.
+    """
+
+    def __init__(self, path: str):
+        """
+        Read the index of the archive.
+        """
+        self.path = str(path)
+        self.infos = {}
+        directories = set()
+        if zipfile.is_zipfile(self.path):
+            self.handle = zipfile.ZipFile(self.path)  # pylint: disable=R1732
+            for info in self.handle.infolist():
+                if info.is_dir():
+                    directories.add(split_name(info.filename))
+                else:
+                    self._add(info.filename, info.file_size, info)
+        elif tarfile.is_tarfile(self.path):
+            self.handle = tarfile.open(self.path)  # pylint: disable=R1732
+            for info in self.handle.getmembers():
+                if info.isreg():
+                    self._add(info.name, info.size, info)
+                elif info.isdir():
+                    directories.add(split_name(info.name))
+                else:
+                    logger.debug("Skipping %s, not a regular file", info.name)
+        else:
+            raise ValueError(f"{self.path} is not a tar or zip archive")
+        self.name = os.path.basename(self.path)
+        for suffix in SUFFIXES:
+            if self.name.lower().endswith(suffix):
+                self.name = self.name[:-len(suffix)]
+                break
+        directories.discard(())
+        tops = {parts[0] for parts in list(self.infos) + list(directories)}
+        if len(tops) == 1 and all(len(parts) > 1 for parts in self.infos):
+            self.name = tops.pop()
+            self.infos = {
+                parts[1:]: value
+                for parts, value in self.infos.items()
+            }
+            directories = {parts[1:] for parts in directories}
+            directories.discard(())
+        self.directories = sorted(directories)
+        self.single = (len(self.infos) == 1 and not self.directories
+                       and len(next(iter(self.infos))) == 1)
+        if self.single:
+            self.name = next(iter(self.infos))[0]
+        self.members = [
+            ArchiveMember(parts, size)
+            for parts, (size, _) in self.infos.items()
+        ]
+        self.size = sum(member.size for member in self.members)
+
+    def _add(self, name: str, size: int, info):
+        """
+        Add a member to the index, replacing an earlier one of that name.
+
+        Parameters
+        ----------
+        name : str
+            name of the member in the archive.
+        size : int
+            size of the member.
+        info : TarInfo | ZipInfo
+            the archive's record of the member.
+        """
+        parts = split_name(name)
+        if parts:
+            self.infos.pop(parts, None)
+            self.infos[parts] = (size, info)
+
+    def stream(self):
+        """
+        Yield the members with their contents in the order they are stored.
+
+        Yields
+        ------
+        tuple
+            the `ArchiveMember` and a readable binary stream of its data.
+        """
+        for member in sorted(self.members, key=self._position):
+            info = self.infos[member.parts][1]
+            if isinstance(self.handle, zipfile.ZipFile):
+                data = self.handle.open(info)
+            else:
+                data = self.handle.extractfile(info)
+            with data:
+                yield member, data
+
+    def _position(self, member: ArchiveMember) -> int:
+        """
+        Return the offset of a member's data inside the archive.
+
+        Parameters
+        ----------
+        member : ArchiveMember
+            the member.
+
+        Returns
+        -------
+        int
+            offset of the member.
+        """
+        info = self.infos[member.parts][1]
+        if isinstance(info, zipfile.ZipInfo):
+            return info.header_offset
+        return info.offset_data
+
+    def close(self):
+        """
+        Close the archive.
+        """
+        self.handle.close()
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager closing the archive.
+        """
+        self.close()
+
+
+def split_name(name: str) -> tuple:
+    """
+    Split the name of an archive member into path components.
+
+    Parameters
+    ----------
+    name : str
+        name of the member in the archive.
+
+    Returns
+    -------
+    tuple
+        the path components, without empty and "." components.
+    """
+    return tuple(part for part in name.split("/") if part not in ("", "."))
+
+
+def hash_members(archive: Archive,
+                 piece_length: int,
+                 v1: bool = True,
+                 v2: bool = False,
+                 backend: str = None,
+                 progress_bar=None) -> dict:
+    """
+    Hash every member of an archive on its own.
+
+    The last v1 piece of each member is padded with zeros, as in piece
+    aligned and hybrid torrents.
+
+    Parameters
+    ----------
+    archive : Archive
+        the archive.
+    piece_length : int
+        piece length for data chunks.
+    v1 : bool
+        calculate the v1 pieces of each member.
+    v2 : bool
+        calculate the v2 pieces root and piece layer of each member.
+    backend : str
+        name of the hash backend, see `get_backend`.
+    progress_bar : ProgressBar
+        progress bar updated with the size of each piece.
+
+    Returns
+    -------
+    dict
+        the result of `hash_stream` for each member keyed by its parts.
+    """
+    hashes = {}
+    for member, data in archive.stream():
+        hashes[member.parts] = hash_stream(data,
+                                           piece_length,
+                                           v1=v1,
+                                           v2=v2,
+                                           backend=backend,
+                                           progress_bar=progress_bar,
+                                           pad=True)
+    return hashes
+
+
+def hash_pieces(archive: Archive,
+                order: list,
+                piece_length: int,
+                backend: str = None,
+                progress_bar=None) -> bytes:
+    """
+    Hash the v1 pieces of the members of an archive joined in torrent order.
+
+    Parameters
+    ----------
+    archive : Archive
+        the archive.
+    order : list
+        the members in the order they are listed in the torrent.
+    piece_length : int
+        piece length for data chunks.
+    backend : str
+        name of the hash backend, see `get_backend`.
+    progress_bar : ProgressBar
+        progress bar updated with the size of each piece.
+
+    Returns
+    -------
+    bytes
+        the pieces.
+    """
+    engine = get_backend(backend)
+    offsets, total = {}, 0
+    for member in order:
+        offsets[member.parts] = total
+        total += member.size
+    pieces = [b""] * math.ceil(total / piece_length)
+    # parts of pieces that cross file boundaries, by piece index
+    fragments = {}
+    for member, data in archive.stream():
+        pos = offsets[member.parts]
+        end = pos + member.size
+        while pos < end:
+            index = pos // piece_length
+            start = index * piece_length
+            stop = min(start + piece_length, total)
+            chunk = _read_exact(data, min(stop, end) - pos)
+            if pos == start and min(stop, end) == stop:
+                pieces[index] = engine.piece_hash(chunk).digest()
+            else:
+                found = fragments.setdefault(index, [])
+                found.append((pos, chunk))
+                if sum(len(part) for _, part in found) == stop - start:
+                    piece = engine.piece_hash()
+                    for _, part in sorted(found):
+                        piece.update(part)
+                    pieces[index] = piece.digest()
+                    del fragments[index]
+            if progress_bar is not None:
+                progress_bar.update(len(chunk))
+            pos += len(chunk)
+    return b"".join(pieces)
+
+
+def _read_exact(data, amount: int) -> bytes:
+    """
+    Read an exact amount from a stream.
+
+    Parameters
+    ----------
+    data : BinaryIO
+        the stream.
+    amount : int
+        number of bytes to read.
+
+    Returns
+    -------
+    bytes
+        the data read.
+
+    Raises
+    ------
+    ValueError
+        the stream ended early.
+    """
+    parts, size = [], 0
+    while size < amount:
+        part = data.read(amount - size)
+        if not part:
+            raise ValueError("archive member is shorter than its size")
+        parts.append(part)
+        size += len(part)
+    return b"".join(parts)
@@ -0,0 +1,366 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Persistent cache of per file hashes.
+
+Recreating a torrent for the same content with different trackers or
+comments normally means rehashing all of it.  The cache stores the hashes
+of each file in an sqlite database so unchanged files are not read again.
+
+Entries are keyed by the device, inode, size and modification time of the
+file, along with the piece length.  Any change to the file gives it a new
+key, so stale hashes are never returned.  Each entry holds the v2 pieces
+root and piece layer and the piece aligned v1 pieces, whichever of them
+have been calculated.
+
+Classes
+-------
+- `CacheEntry`
+    the hashes stored for a single file.
+- `HashCache`
+    the sqlite database of cached hashes.
+
+Functions
+---------
+- `default_cache_path`
+    returns the location of the cache database.
+"""
+
+import os
+import time
+import logging
+import sqlite3
+from typing import NamedTuple
+
+from torrentfile import stats
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = "hashes.sqlite3"
+MAX_ENTRIES = 100000
+MAX_SIZE = 2**30  # 1GiB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    piece_length INTEGER NOT NULL,
+    root BLOB,
+    layer BLOB,
+    pieces BLOB,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (dev, ino, size, mtime, piece_length)
+);
+CREATE INDEX IF NOT EXISTS hashes_used ON hashes (used);
+"""
+
+
+def default_cache_path() -> str:
+    """
+    Return the default location of the cache database.
+
+    The database is kept in a torrentfile directory inside
+    `$XDG_CACHE_HOME`, or `~/.cache` when it is not set.
+
+    Returns
+    -------
+    str
+        path to the database file.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "torrentfile", CACHE_NAME)
+
+
+class CacheEntry(NamedTuple):
+    """
+    Hashes stored for one file at one piece length.
+
+    Parameters
+    ----------
+    root : bytes
+        the v2 pieces root, or None.
+    layer : bytes
+        the v2 piece layer, or None.
+    pieces : bytes
+        the v1 pieces with the file piece aligned, or None.
+    """
+
+    root: bytes
+    layer: bytes
+    pieces: bytes
+
+
+class HashCache:
+    """
+    Sqlite database of the hashes of files that have already been hashed.
+
+    Least recently used entries are removed when `prune` finds more than
+    `max_entries` entries, or more than `max_size` bytes of hashes.
+
+    Parameters
+    ----------
+    path : str
+        path to the database file, see `default_cache_path`.
+    max_entries : int
+        most entries kept in the cache.
+    max_size : int
+        most bytes of hashes kept in the cache.
+    """
+
+    def __init__(self,
+                 path: str = None,
+                 max_entries: int = MAX_ENTRIES,
+                 max_size: int = MAX_SIZE):
+        """
+        Open or create the cache database.
+        """
+        self.path = str(path or default_cache_path())
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+        logger.debug("Using hash cache %s", self.path)
+
+    @staticmethod
+    def key(path: str, piece_length: int, stat=None) -> tuple:
+        """
+        Return the cache key of a file as it is now.
+
+        The key should be taken before the file is hashed, so a file
+        modified while it is hashed is stored under its old key.
+
+        Parameters
+        ----------
+        path : str
+            path to file.
+        piece_length : int
+            piece length for data chunks.
+        stat : os.stat_result | FileStat
+            status of the file if it is already known.
+
+        Returns
+        -------
+        tuple
+            device, inode, size, modification time and piece length.
+        """
+        if stat is None:
+            stat = os.stat(path)
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns,
+                piece_length)
+
+    def get(self, key: tuple, v1: bool = False, v2: bool = True) -> CacheEntry:
+        """
+        Return the hashes cached for a key.
+
+        Parameters
+        ----------
+        key : tuple
+            key returned by `key`.
+        v1 : bool
+            the entry has to include v1 pieces.
+        v2 : bool
+            the entry has to include the v2 root and piece layer.
+
+        Returns
+        -------
+        CacheEntry
+            the cached hashes, None if they are not all cached.
+        """
+        row = self.db.execute(
+            "SELECT root, layer, pieces FROM hashes WHERE dev = ? AND "
+            "ino = ? AND size = ? AND mtime = ? AND piece_length = ?",
+            key).fetchone()
+        entry = CacheEntry(*row) if row else None
+        if entry is None or (v2 and entry.root is None) or (
+                v1 and entry.pieces is None):
+            self.misses += 1
+            stats.add("cache_misses")
+            return None
+        self.hits += 1
+        stats.add("cache_hits")
+        self.db.execute(
+            "UPDATE hashes SET used = ? WHERE dev = ? AND ino = ? AND "
+            "size = ? AND mtime = ? AND piece_length = ?",
+            (time.time_ns(), *key))
+        return entry
+
+    def put(self,
+            key: tuple,
+            root: bytes = None,
+            layer: bytes = None,
+            pieces: bytes = None):
+        """
+        Store the hashes of a file, keeping any it already has.
+
+        Parameters
+        ----------
+        key : tuple
+            key returned by `key` before the file was hashed.
+        root : bytes
+            the v2 pieces root.
+        layer : bytes
+            the v2 piece layer.
+        pieces : bytes
+            the v1 pieces with the file piece aligned.
+        """
+        root, layer, pieces = [
+            None if value is None else bytes(value)
+            for value in (root, layer, pieces)
+        ]
+        size = sum(len(value) for value in (root, layer, pieces) if value)
+        self.db.execute(
+            "INSERT INTO hashes (dev, ino, size, mtime, piece_length, root, "
+            "layer, pieces, bytes, used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, "
+            "?) ON CONFLICT (dev, ino, size, mtime, piece_length) DO UPDATE "
+            "SET root = COALESCE(excluded.root, root), "
+            "layer = COALESCE(excluded.layer, layer), "
+            "pieces = COALESCE(excluded.pieces, pieces), "
+            "bytes = LENGTH(COALESCE(excluded.root, root, '')) + "
+            "LENGTH(COALESCE(excluded.layer, layer, '')) + "
+            "LENGTH(COALESCE(excluded.pieces, pieces, '')), "
+            "used = excluded.used",
+            (*key, root, layer, pieces, size, time.time_ns()))
+
+    def invalidate(self, path: str = None) -> int:
+        """
+        Remove the cached hashes of a file, every file in a directory, or
+        the whole cache.
+
+        Parameters
+        ----------
+        path : str
+            file or directory to remove, None removes every entry.
+
+        Returns
+        -------
+        int
+            number of entries removed.
+        """
+        if path is None:
+            removed = self.db.execute("DELETE FROM hashes").rowcount
+        else:
+            removed = 0
+            for filepath in _walk_files(path):
+                stat = os.stat(filepath)
+                removed += self.db.execute(
+                    "DELETE FROM hashes WHERE dev = ? AND ino = ?",
+                    (stat.st_dev, stat.st_ino)).rowcount
+        self.db.commit()
+        return removed
+
+    def prune(self) -> int:
+        """
+        Remove the least recently used entries beyond the size limits.
+
+        Returns
+        -------
+        int
+            number of entries removed.
+        """
+        removed = 0
+        count, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM hashes").fetchone()
+        if count <= self.max_entries and size <= self.max_size:
+            return removed
+        rows = self.db.execute(
+            "SELECT rowid, bytes FROM hashes ORDER BY used").fetchall()
+        for rowid, amount in rows:
+            if count <= self.max_entries and size <= self.max_size:
+                break
+            self.db.execute("DELETE FROM hashes WHERE rowid = ?", (rowid, ))
+            count -= 1
+            size -= amount
+            removed += 1
+        logger.debug("Removed %d entries from the hash cache", removed)
+        return removed
+
+    def stats(self) -> dict:
+        """
+        Return the size of the cache and the hits and misses so far.
+
+        Returns
+        -------
+        dict
+            entries, bytes, hits and misses.
+        """
+        count, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM hashes").fetchone()
+        return {
+            "entries": count,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def commit(self):
+        """
+        Enforce the size limits and write pending changes to disk.
+        """
+        self.prune()
+        self.db.commit()
+
+    def close(self):
+        """
+        Commit pending changes and close the database.
+        """
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager closing the database.
+        """
+        self.close()
+
+
+def _walk_files(path: str):
+    """
+    Yield path if it is a file, or every file below it if it is a directory.
+
+    Parameters
+    ----------
+    path : str
+        file or directory.
+
+    Yields
+    ------
+    str
+        path to each file.
+    """
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in files:
+                yield os.path.join(root, name)
+    elif os.path.exists(path):
+        yield path
@@ -45,6 +45,8 @@ from argparse import ArgumentParser, HelpFormatter
 from typing import List
 
 from torrentfile import commands
+from torrentfile.hasher import BACKENDS
+from torrentfile.reader import IO_MODES
 from torrentfile.utils import toggle_debug_mode
 from torrentfile.version import __version__ as version
 
@@ -260,7 +262,8 @@ def execute(args: List[str] = None) -> List[str]:
     subparsers = parser.add_subparsers(
         title="Commands",
         dest="command",
-        metavar="create, edit, info, magnet, recheck, rebuild, rename\n",
+        metavar=("create, edit, info, magnet, recheck, rebuild, rename, "
+                 "cache\n"),
     )
 
     create_parser = subparsers.add_parser(
@@ -413,12 +416,228 @@ def execute(args: List[str] = None) -> List[str]:
               "This option is ignored when not used with V1 torrents."),
     )
 
+    create_parser.add_argument(
+        "--workers",
+        action="store",
+        dest="workers",
+        default=1,
+        type=int,
+        metavar="<int>",
+        help="number of threads used for hashing content (Default: 1)",
+    )
+
+    create_parser.add_argument(
+        "--pool",
+        action="store",
+        dest="pool",
+        default="process",
+        choices=["process", "thread"],
+        metavar="<pool>",
+        help="""
+        worker pool used for hashing v2 and hybrid files with --workers
+        options = process, thread
+        """,
+    )
+
+    create_parser.add_argument(
+        "--io-mode",
+        action="store",
+        dest="io_mode",
+        default="buffered",
+        choices=IO_MODES,
+        metavar="<mode>",
+        help="""
+        how file contents are read while hashing
+        options = buffered, mmap, dontneed, direct
+        (buffered) = read into a reusable buffer (default)
+        (mmap) = hash memory mapped file contents without copying
+        (dontneed) = drop contents from the page cache once read
+        (direct) = read with O_DIRECT, bypassing the page cache
+        """,
+    )
+
+    create_parser.add_argument(
+        "--hash-backend",
+        action="store",
+        dest="hash_backend",
+        default=None,
+        choices=list(BACKENDS),
+        metavar="<backend>",
+        help="""
+        hash backend used for hashing content, overrides the
+        TORRENTFILE_HASH_BACKEND environment variable
+        options = hashlib, batched, compiled
+        (hashlib) = hash one 16KiB block at a time
+        (batched) = hash every block of a piece in one call
+        (compiled) = use the compiled extension when it is built
+        """,
+    )
+
+    create_parser.add_argument(
+        "--read-ahead",
+        action="store",
+        dest="read_ahead",
+        default=0,
+        type=int,
+        metavar="<int>",
+        help="""
+        number of pieces to read ahead on a background thread while
+        hashing, 0 reads and hashes on the same thread (default)
+        """,
+    )
+
+    create_parser.add_argument(
+        "--read-size",
+        action="store",
+        dest="read_size",
+        type=int,
+        metavar="<int>",
+        help="""
+        size of each read while hashing v2 and hybrid content
+        acceptable values include numbers 14-26 or a size in bytes
+        20 = 1MiB (default), 22 = 4MiB, 23 = 8MiB
+        """,
+    )
+
+    create_parser.add_argument(
+        "--walkers",
+        action="store",
+        dest="walkers",
+        type=int,
+        metavar="<int>",
+        help="""
+        number of threads listing directories while walking the content,
+        speeds up network filesystems, up to 64, overrides the
+        TORRENTFILE_WALKERS environment variable (default: 1)
+        """,
+    )
+
+    create_parser.add_argument(
+        "--cache",
+        action="store_true",
+        dest="cache",
+        help="""
+        reuse the hashes of files that have not changed since they were
+        last hashed, and save the hashes of new files
+        """,
+    )
+
+    create_parser.add_argument(
+        "--cache-path",
+        action="store",
+        dest="cache_path",
+        metavar="<path>",
+        help="hash cache database, implies --cache",
+    )
+
+    create_parser.add_argument(
+        "--save-leaves",
+        action="store",
+        dest="save_leaves",
+        metavar="<path>",
+        help="""
+        save the 16KiB leaf hashes of v2 and hybrid content to a sidecar
+        file, used by --from-leaves
+        """,
+    )
+
+    create_parser.add_argument(
+        "--from-leaves",
+        action="store",
+        dest="from_leaves",
+        metavar="<path>",
+        help="""
+        create a v2 torrent from the leaf hashes saved by --save-leaves
+        instead of reading the content, works with any piece length
+        """,
+    )
+
+    create_parser.add_argument(
+        "--update",
+        action="store",
+        dest="update",
+        metavar="<torrent>",
+        help="""
+        reuse the hashes of a torrent previously created for the same
+        content, only files modified since it was created are hashed
+        """,
+    )
+
+    create_parser.add_argument(
+        "--resume",
+        action="store_true",
+        dest="resume",
+        help="""
+        continue an interrupted job from the journal it left next to the
+        output file, files modified since then are hashed again
+        """,
+    )
+
+    create_parser.add_argument(
+        "--no-checkpoint",
+        action="store_false",
+        dest="checkpoint",
+        help="""
+        do not keep a journal of finished work next to the output file
+        while hashing, interrupted jobs can not be resumed
+        """,
+    )
+
+    create_parser.add_argument(
+        "--name",
+        action="store",
+        dest="name",
+        metavar="<name>",
+        help="file name of content read from stdin, required with -",
+    )
+
+    create_parser.add_argument(
+        "--length",
+        action="store",
+        dest="length",
+        metavar="<bytes>",
+        type=int,
+        help="""
+        expected size of content read from stdin, used to choose the piece
+        length and show progress
+        """,
+    )
+
+    create_parser.add_argument(
+        "--tee",
+        action="store",
+        dest="tee",
+        metavar="<path>",
+        help="write a copy of content read from stdin to a file",
+    )
+
+    create_parser.add_argument(
+        "--archive",
+        action="store_true",
+        dest="archive",
+        help="content is a tar or zip archive, hash its members as if it "
+        "was extracted",
+    )
+
     create_parser.add_argument(
         "content",
         action="store",
         metavar="<content>",
         nargs="?",
-        help="path to content file or directory",
+        help="path to content file or directory, - reads from stdin",
+    )
+
+    create_parser.add_argument(
+        "--stats",
+        action="store",
+        dest="stats",
+        nargs="?",
+        const="text",
+        default=None,
+        choices=["text", "json"],
+        metavar="<format>",
+        help="print the time spent in each stage and resources used, as "
+        "text or json, use --stats=json before positional arguments",
     )
 
     create_parser.set_defaults(func=commands.create)
@@ -561,6 +780,49 @@ def execute(args: List[str] = None) -> List[str]:
         help="path to content file or directory",
     )
 
+    check_parser.add_argument(
+        "--hash-backend",
+        action="store",
+        dest="hash_backend",
+        default=None,
+        choices=list(BACKENDS),
+        metavar="<backend>",
+        help="hash backend used for hashing content",
+    )
+
+    check_parser.add_argument(
+        "--read-ahead",
+        action="store",
+        dest="read_ahead",
+        default=0,
+        type=int,
+        metavar="<int>",
+        help="number of pieces to read ahead on a background thread",
+    )
+
+    check_parser.add_argument(
+        "--io-mode",
+        action="store",
+        dest="io_mode",
+        default="buffered",
+        choices=IO_MODES,
+        metavar="<mode>",
+        help="how file contents are read, see the create subcommand",
+    )
+
+    check_parser.add_argument(
+        "--stats",
+        action="store",
+        dest="stats",
+        nargs="?",
+        const="text",
+        default=None,
+        choices=["text", "json"],
+        metavar="<format>",
+        help="print the time spent in each stage and resources used, as "
+        "text or json, use --stats=json before positional arguments",
+    )
+
     check_parser.set_defaults(func=commands.recheck)
 
     rebuild_parser = subparsers.add_parser(
@@ -605,6 +867,19 @@ def execute(args: List[str] = None) -> List[str]:
         help="path to where torrents will be re-assembled",
     )
 
+    rebuild_parser.add_argument(
+        "--stats",
+        action="store",
+        dest="stats",
+        nargs="?",
+        const="text",
+        default=None,
+        choices=["text", "json"],
+        metavar="<format>",
+        help="print the time spent in each stage and resources used, as "
+        "text or json, use --stats=json before positional arguments",
+    )
+
     rebuild_parser.set_defaults(func=commands.rebuild)
 
     rename_parser = subparsers.add_parser(
@@ -623,6 +898,39 @@ def execute(args: List[str] = None) -> List[str]:
 
     rename_parser.set_defaults(func=commands.rename)
 
+    cache_parser = subparsers.add_parser(
+        "cache",
+        help="""Show or invalidate the cache of hashes used by
+                create --cache.""",
+        formatter_class=TorrentFileHelpFormatter,
+    )
+
+    cache_parser.add_argument(
+        "--invalidate",
+        action="store",
+        dest="invalidate",
+        metavar="<path>",
+        nargs="+",
+        help="remove cached hashes of files or directories",
+    )
+
+    cache_parser.add_argument(
+        "--clear",
+        action="store_true",
+        dest="clear",
+        help="remove every cached hash",
+    )
+
+    cache_parser.add_argument(
+        "--cache-path",
+        action="store",
+        dest="cache_path",
+        metavar="<path>",
+        help="hash cache database",
+    )
+
+    cache_parser.set_defaults(func=commands.cache)
+
     all_commands = [
         "m",
         "-h",
@@ -636,6 +944,7 @@ def execute(args: List[str] = None) -> List[str]:
         "rename",
         "rebuild",
         "recheck",
+        "cache",
     ]
     if not any(i for i in all_commands if i in args):
         start = 0
@@ -30,6 +30,7 @@ Functions
 - recheck
 - magnet
 - rebuild
+- cache
 - find_config_file
 - parse_config_file
 - get_magnet
@@ -47,12 +48,15 @@ from urllib.parse import quote_plus
 
 import pyben
 
+from torrentfile.cache import HashCache
 from torrentfile.edit import edit_torrent
 from torrentfile.interactive import select_action
 from torrentfile.rebuild import Assembler
 from torrentfile.recheck import Checker
-from torrentfile.torrent import TorrentAssembler, TorrentFile
-from torrentfile.utils import ArgumentError, check_path_writable
+from torrentfile.torrent import (TorrentArchive, TorrentAssembler,
+                                 TorrentFile, TorrentStream)
+from torrentfile.utils import (ArgumentError, check_path_writable,
+                               humanize_bytes)
 
 logger = logging.getLogger(__name__)
 
@@ -169,8 +173,18 @@ def create(args: Namespace) -> Namespace:
         samplepath = os.path.join(os.getcwd(), ".torrent")
         check_path_writable(samplepath)
 
+    if getattr(args, "from_leaves", None) and args.meta_version != "2":
+        raise ArgumentError("--from-leaves only creates meta version 2 "
+                            "torrents, use --meta-version 2")
+
     logger.debug("Creating torrent from %s", args.content)
-    if args.meta_version == "1":
+    if args.content == "-":
+        torrent = TorrentStream(stream=sys.stdin.buffer, **kwargs)
+
+    elif getattr(args, "archive", False):
+        torrent = TorrentArchive(**kwargs)
+
+    elif args.meta_version == "1":
         torrent = TorrentFile(**kwargs)
 
     else:
@@ -187,6 +201,10 @@ def create(args: Namespace) -> Namespace:
 
     print("\nTorrent Save Path: ", os.path.abspath(str(outfile)))
     logger.debug("Output path: %s", str(outfile))
+    if torrent.cache is not None:
+        logger.debug("Hash cache stats: %s", torrent.cache.stats())
+    if getattr(args, "stats", None):
+        print(torrent.stats.format(args.stats))
     return args
 
 
@@ -308,7 +326,13 @@ def recheck(args: Namespace) -> str:
     padding = int(halfterm - (len(msg) / 2)) * " "
     sys.stdout.write(padding + msg)
 
-    checker = Checker(metafile, content)
+    checker = Checker(
+        metafile,
+        content,
+        hash_backend=getattr(args, "hash_backend", None),
+        read_ahead=getattr(args, "read_ahead", 0),
+        io_mode=getattr(args, "io_mode", "buffered"),
+    )
     logger.debug("Completed initialization of the Checker class")
     result = checker.results()
 
@@ -316,6 +340,8 @@ def recheck(args: Namespace) -> str:
     padding = int(halfterm - (len(message) / 2)) * " "
     sys.stdout.write(padding + message + "\n")
     sys.stdout.flush()
+    if getattr(args, "stats", None):
+        print(checker.stats.format(args.stats))
     return result
 
 
@@ -460,7 +486,40 @@ def rebuild(args: Namespace) -> int:
         if not os.path.exists(path):
             raise FileNotFoundError(path)
     assembler = Assembler(metafiles, contents, dest)
-    return assembler.assemble_torrents()
+    copied = assembler.assemble_torrents()
+    if getattr(args, "stats", None):
+        print(assembler.stats.format(args.stats))
+    return copied
 
 
 interactive = select_action  # for clean import system
+
+
+def cache(args: Namespace) -> dict:
+    """
+    Show the hash cache used by create, removing entries first if asked.
+
+    Parameters
+    ----------
+    args : Namespace
+        command line arguments.
+
+    Returns
+    -------
+    dict
+        cache statistics after any entries were removed.
+    """
+    with HashCache(args.cache_path) as hash_cache:
+        removed = 0
+        if args.clear:
+            removed += hash_cache.invalidate()
+        for path in args.invalidate or []:
+            removed += hash_cache.invalidate(path)
+        stats = hash_cache.stats()
+    stats["removed"] = removed
+    print(f"Cache: {hash_cache.path}")
+    print(f"Entries: {stats['entries']} "
+          f"({humanize_bytes(stats['bytes'])})")
+    if args.clear or args.invalidate:
+        print(f"Removed: {removed}")
+    return stats
@@ -21,17 +21,102 @@ Piece/File Hashers for Bittorrent meta file contents.
 """
 
 import os
+import math
+import time
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import sha1, sha256  # nosec
 
+from torrentfile import stats
 from torrentfile.mixins import CbMixin, ProgMixin
+from torrentfile.reader import ReadAhead, open_ranges, open_reader
 from torrentfile.utils import next_power_2
 
+try:
+    from torrentfile import _hasher
+except ImportError:  # pragma: nocover
+    _hasher = None
+
 BLOCK_SIZE = 2**14  # 16KiB
 HASH_SIZE = 32
+SEGMENT_SIZE = 2**26  # 64MiB
+MIN_SEGMENT_SIZE = 2**22  # 4MiB
+READ_SIZE = 2**20  # 1MiB
+MERKLE_BATCH = 2**12
+HASH_BACKEND_ENV = "TORRENTFILE_HASH_BACKEND"
 
 logger = logging.getLogger(__name__)
 
+def piece_spans(paths: list, sizes: list, piece_length: int,
+                align: bool = False):
+    """
+    Map the contents of a file list onto v1 piece boundaries.
+
+    Files are treated as one continuous stream unless `align` is set, in
+    which case every file starts on a new piece and the last piece of each
+    file is padded with zeros.
+
+    Parameters
+    ----------
+    paths : list
+        sorted list of file paths.
+    sizes : list
+        size of each file in paths.
+    piece_length : int
+        size of each piece.
+    align : bool
+        piece align each file.
+
+    Yields
+    ------
+    tuple
+        a list of (path, offset, length) spans and the number of padding
+        bytes that complete the piece.
+    """
+    spans, filled = [], 0
+    for path, size in zip(paths, sizes):
+        offset = 0
+        while offset < size:
+            length = min(piece_length - filled, size - offset)
+            spans.append((path, offset, length))
+            offset += length
+            filled += length
+            if filled == piece_length:
+                yield spans, 0
+                spans, filled = [], 0
+        if align and spans:
+            yield spans, piece_length - filled
+            spans, filled = [], 0
+    if spans:
+        yield spans, 0
+
+
+def hash_piece(spans: list, pad: int = 0, backend=None) -> bytes:
+    """
+    Calculate the sha1 digest of a piece made from one or more file spans.
+
+    Parameters
+    ----------
+    spans : list
+        list of (range reader, offset, length) spans, see `open_ranges`.
+    pad : int
+        number of zero bytes appended to the piece.
+    backend : HashlibBackend
+        hash backend, defaults to the one returned by `get_backend`.
+
+    Returns
+    -------
+    bytes
+        SHA1 digest of the piece.
+    """
+    piece = (backend or get_backend()).piece_hash()
+    for reader, offset, length in spans:
+        piece.update(reader.pread(length, offset))
+    if pad:
+        piece.update(bytes(pad))
+    return piece.digest()
+
 
 class Hasher(CbMixin, ProgMixin):
     """
@@ -53,6 +138,19 @@ class Hasher(CbMixin, ProgMixin):
         the progress mode
     progress_bar: [Optional] ProgressBar
         a progress bar object if progress mode is 2
+    workers: int
+        number of threads hashing pieces concurrently, 1 hashes serially.
+    io_mode: str
+        how file contents are read, "buffered" or "mmap"
+    backend: str
+        name of the hash backend, see `get_backend`.
+    read_ahead: int
+        number of pieces read ahead on a background thread, 0 disables it.
+    start: int
+        number of pieces at the start of the content that are skipped
+        without reading them, used to resume an interrupted job.
+    sizes: list
+        size of each file if it is already known, see `FileManifest`.
     """
 
     def __init__(
@@ -62,20 +160,41 @@ class Hasher(CbMixin, ProgMixin):
         align: bool = False,
         progress: int = 1,
         progress_bar=None,
+        workers: int = 1,
+        io_mode: str = "buffered",
+        backend: str = None,
+        read_ahead: int = 0,
+        start: int = 0,
+        sizes: list = None,
     ):
         """Generate hashes of piece length data from filelist contents."""
+        self.backend = get_backend(backend)
         self.piece_length = piece_length
         self.paths = paths
         self.align = align
-        self.total = sum(os.path.getsize(i) for i in self.paths)
+        if sizes is None:
+            sizes = [os.path.getsize(i) for i in self.paths]
+        self.sizes = list(sizes)
+        self.total = sum(self.sizes)
         self.index = 0
-        self.current = open(self.paths[0], "rb")
+        self.workers = workers
+        self.io_mode = io_mode
         self.progress = progress
         self.progbar = progress_bar
         if self.progress == 1:
-            file_size = os.path.getsize(self.paths[0])
+            file_size = self.sizes[0]
             self.progbar = self.get_progress_tracker(file_size, self.paths[0])
         logger.debug("Hashing %s", str(self.paths[0]))
+        self.pipeline = None
+        if self.workers > 1 or start:
+            # positional reads can begin at any piece
+            self.current = None
+            self._pieces = self._iter_parallel(start)
+        else:
+            if read_ahead:
+                self.pipeline = ReadAhead(self.paths, piece_length, read_ahead,
+                                          io_mode)
+            self.current = self._open(self.paths[0])
 
     def __iter__(self):
         """
@@ -88,6 +207,24 @@ class Hasher(CbMixin, ProgMixin):
         """
         return self
 
+    def _open(self, path: str):
+        """
+        Open a reader for the next file in the file list.
+
+        Parameters
+        ----------
+        path : str
+            path to the file.
+
+        Returns
+        -------
+        BlockReader | MMapReader | ReadAheadReader
+            the reader object.
+        """
+        if self.pipeline is not None:
+            return self.pipeline.open(path)
+        return open_reader(path, self.piece_length, self.io_mode)
+
     def _handle_partial(self, arr: bytearray) -> bytearray:
         """
         Define the handling partial pieces that span 2 or more files.
@@ -102,21 +239,22 @@ class Hasher(CbMixin, ProgMixin):
         digest : bytearray
             SHA1 digest of the complete piece.
         """
+        piece = self.backend.piece_hash(arr)
+        length = len(arr)
         if self.align:
-            target = self.piece_length - len(arr)
-            temp = bytearray(target)
-            arr.extend(temp)
-            return sha1(arr).digest()  # nosec
-
-        while len(arr) < self.piece_length and self.next_file():
-            target = self.piece_length - len(arr)
-            temp = bytearray(target)
-            size = self.current.readinto(temp)
+            piece.update(bytes(self.piece_length - length))
+            return piece.digest()
+
+        while length < self.piece_length and self.next_file():
+            target = self.piece_length - length
+            data = self.current.read(target)
+            size = len(data)
             self.progbar.update(size)
-            arr.extend(temp[:size])
+            piece.update(data)
+            length += size
             if size == target:
                 break
-        return sha1(arr).digest()  # nosec
+        return piece.digest()
 
     def next_file(self) -> bool:
         """
@@ -133,11 +271,11 @@ class Hasher(CbMixin, ProgMixin):
         if self.index < len(self.paths):
             path = self.paths[self.index]
             if self.progress == 1:
-                total = os.path.getsize(path)
+                total = self.sizes[self.index]
                 self.progbar = self.get_progress_tracker(total, path)
             logger.debug("Hashing %s", str(path))
             self.current.close()
-            self.current = open(path, "rb")
+            self.current = self._open(path)
             return True
         return False
 
@@ -150,17 +288,373 @@ class Hasher(CbMixin, ProgMixin):
         bytes
             SHA1 hash of the piece extracted.
         """
-        while True:
-            piece = bytearray(self.piece_length)
-            size = self.current.readinto(piece)
-            self.progbar.update(size)
-            if size == 0:
-                if not self.next_file():
-                    raise StopIteration
-            elif size < self.piece_length:
-                return self._handle_partial(piece[:size])
+        if self.current is None:
+            return next(self._pieces)
+        try:
+            while True:
+                piece = self.current.read(self.piece_length)
+                size = len(piece)
+                self.progbar.update(size)
+                if size == 0:
+                    if not self.next_file():
+                        break
+                elif size < self.piece_length:
+                    return self._handle_partial(piece)
+                else:
+                    return self.backend.piece_hash(piece).digest()
+        except BaseException:
+            self.close()
+            raise
+        self.close()
+        raise StopIteration
+
+    def close(self):
+        """
+        Close the current reader and stop the read ahead pipeline.
+        """
+        if self.current is not None:
+            self.current.close()
+        if self.pipeline is not None:
+            self.pipeline.close()
+
+    def _iter_parallel(self, start: int = 0):
+        """
+        Hash pieces on a pool of worker threads and yield them in order.
+
+        Piece boundaries are computed up front and each piece is read with
+        positional reads in the hasher's io mode, so workers can share the
+        range readers of `open_ranges`.  At most a few pieces per worker
+        are in flight at any time.
+
+        Parameters
+        ----------
+        start : int
+            number of pieces skipped before hashing begins.
+
+        Yields
+        ------
+        bytes
+            SHA1 hash of each piece, in piece order.
+        """
+        readers, pending = {}, deque()
+        sizes = dict(zip(self.paths, self.sizes))
+        pool = ThreadPoolExecutor(max_workers=self.workers,
+                                  initializer=stats.attach,
+                                  initargs=(stats.current(), ))
+        try:
+            for num, (spans, pad) in enumerate(
+                    piece_spans(self.paths, self.sizes, self.piece_length,
+                                self.align)):
+                if num < start:
+                    continue
+                for path, _, _ in spans:
+                    if path not in readers:
+                        readers[path] = open_ranges(path, self.io_mode)
+                job = [(readers[path], off, size)
+                       for path, off, size in spans]
+                future = pool.submit(hash_piece, job, pad, self.backend)
+                pending.append((future, spans))
+                if len(pending) >= self.workers * 4:
+                    future, spans = pending.popleft()
+                    yield self._collect(future, spans)
+                    for path, offset, length in spans:
+                        if offset + length == sizes[path]:
+                            readers.pop(path).close()
+            while pending:
+                yield self._collect(*pending.popleft())
+        finally:
+            for future, _ in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+            for reader in readers.values():
+                reader.close()
+        if self.progress == 1:
+            self.progbar.close_out()
+
+    def _collect(self, future, spans: list) -> bytes:
+        """
+        Wait for a hashed piece and update progress for the files it covers.
+
+        Parameters
+        ----------
+        future : Future
+            the pending piece digest.
+        spans : list
+            (path, offset, length) spans of the piece.
+
+        Returns
+        -------
+        bytes
+            SHA1 hash of the piece.
+        """
+        digest = future.result()
+        for path, _, length in spans:
+            if self.progress == 1 and path != self.paths[self.index]:
+                self.progbar.close_out()
+                self.index = self.paths.index(path, self.index)
+                total = self.sizes[self.index]
+                self.progbar = self.get_progress_tracker(total, path)
+                logger.debug("Hashing %s", str(path))
+            self.progbar.update(length)
+        return digest
+
+
+ZERO_ROOTS = [bytes(HASH_SIZE)]
+for _ in range(63):
+    ZERO_ROOTS.append(sha256(ZERO_ROOTS[-1] * 2).digest())
+ZERO_ROOTS = tuple(ZERO_ROOTS)
+
+
+def zero_root(level: int) -> bytes:
+    """
+    Return the merkle root of a subtree of zero filled leaf hashes.
+
+    The roots are computed once for every level when the module is
+    imported, so padding a tree never hashes zero nodes again.
+
+    Parameters
+    ----------
+    level : int
+        height of the subtree, it covers 2**level leaf hashes.
+
+    Returns
+    -------
+    bytes
+        the root hash of the zero filled subtree.
+    """
+    return ZERO_ROOTS[level]
+
+
+class MerkleTree:
+    """
+    Merkle tree reduction over one contiguous buffer of sha256 nodes.
+
+    Each pass hashes pairs of 32 byte nodes and writes the parents back into
+    the front of the same buffer, halving the level until only the root is
+    left.  Parents are written back in small fixed size batches, so apart
+    from the leaf buffer memory use stays constant.
+
+    Parameters
+    ----------
+    root : bytes
+        the root hash of the tree.
+    count : int
+        number of leaf hashes the tree was built from.
+    width : int
+        power of 2 number of leaves the tree was padded to.
+    """
+
+    def __init__(self, root: bytes, count: int, width: int):
+        """
+        Store the results of a reduction.
+        """
+        self.root = root
+        self.count = count
+        self.width = width
+
+    @classmethod
+    def from_leaves(cls,
+                    leaves,
+                    width: int = None,
+                    level: int = 0) -> "MerkleTree":
+        """
+        Build a merkle tree from a buffer or sequence of leaf hashes.
+
+        A `bytearray` or writable `memoryview` is reduced in place and its
+        contents are overwritten, anything else is copied into a new
+        `bytearray` first.
+
+        Parameters
+        ----------
+        leaves : bytearray | memoryview | bytes | list
+            concatenated 32 byte hashes, or a sequence of them.
+        width : int
+            power of 2 number of leaves the tree is padded to with zero
+            subtrees, defaults to the next power of 2 of the leaf count.
+        level : int
+            height of the subtrees the leaves are roots of.
+
+        Returns
+        -------
+        MerkleTree
+            the reduced tree.
+        """
+        if isinstance(leaves, (list, tuple)):
+            leaves = bytearray(b"".join(leaves))
+        elif not isinstance(leaves, (bytearray, memoryview)):
+            leaves = bytearray(leaves)
+        elif isinstance(leaves, memoryview) and leaves.readonly:
+            leaves = bytearray(leaves)
+        count = len(leaves) // HASH_SIZE
+        if width is None:
+            width = next_power_2(count)
+        root = cls.reduce(leaves, count, width, level)
+        return cls(root, count, width)
+
+    @staticmethod
+    def reduce(buffer, count: int, width: int, level: int = 0) -> bytes:
+        """
+        Reduce a buffer of nodes to the merkle root in place.
+
+        Parameters
+        ----------
+        buffer : bytearray | memoryview
+            writable buffer holding `count` concatenated 32 byte nodes.
+        count : int
+            number of nodes in the buffer.
+        width : int
+            power of 2 number of nodes the layer is padded to.
+        level : int
+            height of the subtrees the nodes are roots of.
+
+        Returns
+        -------
+        bytes
+            the merkle root.
+        """
+        if not count:
+            return zero_root(level + width.bit_length() - 1)
+        view = memoryview(buffer)
+        try:
+            while width > 1:
+                half = count // 2
+                for start in range(0, half, MERKLE_BATCH):
+                    stop = min(start + MERKLE_BATCH, half)
+                    # parents never overwrite pairs that are not hashed yet
+                    view[start * HASH_SIZE:stop * HASH_SIZE] = b"".join([
+                        sha256(view[j:j + 64]).digest()
+                        for j in range(start * 64, stop * 64, 64)
+                    ])
+                if count % 2:
+                    # pair the odd node with a zero filled subtree
+                    j = (count - 1) * HASH_SIZE
+                    node = sha256(view[j:j + HASH_SIZE])
+                    node.update(ZERO_ROOTS[level])
+                    i = half * HASH_SIZE
+                    view[i:i + HASH_SIZE] = node.digest()
+                    half += 1
+                count = half
+                width >>= 1
+                level += 1
+            return bytes(view[:HASH_SIZE])
+        finally:
+            view.release()
+
+
+def padded_root(hashes: list, width: int, level: int = 0) -> bytes:
+    """
+    Calculate the merkle root of hashes padded to width nodes.
+
+    Instead of extending the layer with zero filled nodes, the missing
+    right hand subtrees at each level are taken from `ZERO_ROOTS`, so
+    padding costs one lookup per level.
+
+    Parameters
+    ----------
+    hashes : list
+        sequence of sha256 hashes at the bottom of the tree.
+    width : int
+        power of 2 number of nodes the bottom layer is padded to.
+    level : int
+        height of the subtrees the hashes are roots of.
+
+    Returns
+    -------
+    bytes
+        the root hash of the padded tree.
+    """
+    return MerkleTree.from_leaves(hashes, width, level).root
+
+
+class MerkleAccumulator:
+    """
+    Incremental merkle tree that is fed one leaf hash at a time.
+
+    Whenever two subtrees of the same height are complete they are merged,
+    so only one pending node per level is ever held and memory use grows
+    with the log of the leaf count.  Zero padding is only applied when the
+    root is requested.
+
+    Parameters
+    ----------
+    level : int
+        height of the subtrees the leaves are roots of.
+    """
+
+    def __init__(self, level: int = 0):
+        """
+        Create an empty accumulator.
+        """
+        self.level = level
+        self.pending = []
+        self.count = 0
+
+    def reset(self):
+        """
+        Discard every leaf so the accumulator can be reused.
+        """
+        self.pending.clear()
+        self.count = 0
+
+    def add(self, leaf: bytes):
+        """
+        Add the next leaf hash, merging every subtree it completes.
+
+        Parameters
+        ----------
+        leaf : bytes
+            32 byte sha256 hash.
+        """
+        pending = self.pending
+        node = leaf
+        height = 0
+        while height < len(pending) and pending[height] is not None:
+            node = sha256(pending[height] + node).digest()
+            pending[height] = None
+            height += 1
+        if height == len(pending):
+            pending.append(node)
+        else:
+            pending[height] = node
+        self.count += 1
+
+    def root(self, width: int = None) -> bytes:
+        """
+        Return the root of the leaves added so far padded to width.
+
+        Parameters
+        ----------
+        width : int
+            power of 2 number of leaves the tree is padded to with zero
+            subtrees, defaults to the next power of 2 of the leaf count.
+
+        Returns
+        -------
+        bytes
+            the root hash of the padded tree.
+        """
+        if width is None:
+            width = next_power_2(self.count)
+        top = width.bit_length() - 1
+        if len(self.pending) > top:
+            # the tree is already complete
+            return self.pending[top]
+        node = None
+        for height in range(top):
+            pend = None
+            if height < len(self.pending):
+                pend = self.pending[height]
+            if node is None and pend is None:
+                continue
+            if node is None:
+                node = sha256(pend + ZERO_ROOTS[self.level + height]).digest()
+            elif pend is None:
+                node = sha256(node + ZERO_ROOTS[self.level + height]).digest()
             else:
-                return sha1(piece).digest()  # nosec
+                node = sha256(pend + node).digest()
+        if node is None:
+            return zero_root(self.level + top)
+        return node
 
 
 def merkle_root(blocks: list) -> bytes:
@@ -178,14 +672,450 @@ def merkle_root(blocks: list) -> bytes:
         the sha256 root hash of the merkle tree.
     """
     if blocks:
-        while len(blocks) > 1:
-            blocks = [
-                sha256(x + y).digest() for x, y in zip(*[iter(blocks)] * 2)
-            ]
-        return blocks[0]
+        if len(blocks) == 1:
+            return blocks[0]
+        return MerkleTree.from_leaves(blocks).root
     return blocks
 
 
+class HashlibBackend:
+    """
+    Hash backend built on `hashlib`, hashing one leaf at a time.
+
+    Every backend provides the same interface: incremental sha1 objects
+    for v1 pieces, sha256 leaf hashes, and merkle roots of v2 pieces and
+    piece layers.
+    """
+
+    name = "hashlib"
+
+    def available(self) -> bool:
+        """
+        Return True if the backend can be used on this system.
+        """
+        return True
+
+    @staticmethod
+    def piece_hash(data=b""):
+        """
+        Return an incremental sha1 object for a v1 piece.
+
+        Parameters
+        ----------
+        data : bytes
+            initial piece contents.
+
+        Returns
+        -------
+        hashlib.sha1
+            the hash object.
+        """
+        return sha1(data)  # nosec
+
+    @staticmethod
+    def leaf_hash(data) -> bytes:
+        """
+        Return the sha256 digest of a 16KiB block.
+
+        Parameters
+        ----------
+        data : bytes
+            contents of the block.
+
+        Returns
+        -------
+        bytes
+            the leaf hash.
+        """
+        return sha256(data).digest()
+
+    @staticmethod
+    def leaf_layer(data) -> bytes:
+        """
+        Return the leaf hashes of every 16KiB block of a piece.
+
+        Parameters
+        ----------
+        data : bytes | memoryview
+            contents of the piece.
+
+        Returns
+        -------
+        bytes
+            concatenated sha256 hashes of each block.
+        """
+        with memoryview(data) as view:
+            return b"".join([
+                sha256(view[i:i + BLOCK_SIZE]).digest()
+                for i in range(0, len(view), BLOCK_SIZE)
+            ])
+
+    def piece_root(self, data, width: int) -> bytes:
+        """
+        Calculate the merkle root of one piece of file contents.
+
+        The sha256 hashes of each 16KiB block of the piece are the leaves
+        of the tree, which is padded to `width` leaves.
+
+        Parameters
+        ----------
+        data : bytes | memoryview
+            contents of the piece.
+        width : int
+            power of 2 number of leaves the tree is padded to.
+
+        Returns
+        -------
+        bytes
+            the root hash of the piece.
+        """
+        blocks = MerkleAccumulator()
+        with memoryview(data) as view:
+            for i in range(0, len(view), BLOCK_SIZE):
+                blocks.add(sha256(view[i:i + BLOCK_SIZE]).digest())
+        return blocks.root(width)
+
+    def layer_root(self, layer, width: int, level: int = 0) -> bytes:
+        """
+        Calculate the merkle root of a buffer of concatenated hashes.
+
+        Parameters
+        ----------
+        layer : bytes | bytearray
+            concatenated 32 byte hashes.
+        width : int
+            power of 2 number of hashes the layer is padded to.
+        level : int
+            height of the subtrees the hashes are roots of.
+
+        Returns
+        -------
+        bytes
+            the root hash of the layer.
+        """
+        layers = MerkleAccumulator(level)
+        with memoryview(layer) as view:
+            for i in range(0, len(view), HASH_SIZE):
+                layers.add(view[i:i + HASH_SIZE].tobytes())
+        return layers.root(width)
+
+
+class BatchedBackend(HashlibBackend):
+    """
+    Hash backend that hashes all leaves of a piece in one call.
+
+    The leaves are collected into a single buffer which is then reduced
+    in place by `MerkleTree`.
+    """
+
+    name = "batched"
+
+    def piece_root(self, data, width: int) -> bytes:
+        """
+        Calculate the merkle root of one piece of file contents.
+
+        Parameters
+        ----------
+        data : bytes | memoryview
+            contents of the piece.
+        width : int
+            power of 2 number of leaves the tree is padded to.
+
+        Returns
+        -------
+        bytes
+            the root hash of the piece.
+        """
+        with memoryview(data) as view:
+            leaves = bytearray(b"".join([
+                sha256(view[i:i + BLOCK_SIZE]).digest()
+                for i in range(0, len(view), BLOCK_SIZE)
+            ]))
+        return MerkleTree.reduce(leaves, len(leaves) // HASH_SIZE, width)
+
+    def layer_root(self, layer, width: int, level: int = 0) -> bytes:
+        """
+        Calculate the merkle root of a buffer of concatenated hashes.
+
+        Parameters
+        ----------
+        layer : bytes | bytearray
+            concatenated 32 byte hashes.
+        width : int
+            power of 2 number of hashes the layer is padded to.
+        level : int
+            height of the subtrees the hashes are roots of.
+
+        Returns
+        -------
+        bytes
+            the root hash of the layer.
+        """
+        return MerkleTree.from_leaves(bytearray(layer), width, level).root
+
+
+class CompiledBackend(HashlibBackend):
+    """
+    Hash backend that uses the optional `torrentfile._hasher` extension.
+
+    The extension hashes the blocks of a piece and reduces the tree without
+    returning to the interpreter.  v1 pieces still use `hashlib`.
+    """
+
+    name = "compiled"
+
+    def available(self) -> bool:
+        """
+        Return True if the extension was built.
+        """
+        return _hasher is not None
+
+    def piece_root(self, data, width: int) -> bytes:
+        """
+        Calculate the merkle root of one piece of file contents.
+
+        Parameters
+        ----------
+        data : bytes | memoryview
+            contents of the piece.
+        width : int
+            power of 2 number of leaves the tree is padded to.
+
+        Returns
+        -------
+        bytes
+            the root hash of the piece.
+        """
+        return _hasher.piece_root(data, width)
+
+    def layer_root(self, layer, width: int, level: int = 0) -> bytes:
+        """
+        Calculate the merkle root of a buffer of concatenated hashes.
+
+        Parameters
+        ----------
+        layer : bytes | bytearray
+            concatenated 32 byte hashes.
+        width : int
+            power of 2 number of hashes the layer is padded to.
+        level : int
+            height of the subtrees the hashes are roots of.
+
+        Returns
+        -------
+        bytes
+            the root hash of the layer.
+        """
+        return _hasher.merkle_root(layer, width, level)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (HashlibBackend(), BatchedBackend(), CompiledBackend())
+}
+
+
+def default_backend() -> str:
+    """
+    Return the name of the backend used when none is requested.
+
+    The compiled backend is preferred when it was linked against libcrypto,
+    the portable sha256 in `c/sha.c` is slower than `hashlib`.
+
+    Returns
+    -------
+    str
+        name of the backend.
+    """
+    if _hasher is not None and _hasher.SHA256 == "openssl":
+        return "compiled"
+    return "hashlib"
+
+
+def get_backend(name: str = None) -> HashlibBackend:
+    """
+    Return the hash backend registered under name.
+
+    When name is not given the `TORRENTFILE_HASH_BACKEND` environment
+    variable is used, then `default_backend`.  A backend that is not
+    available on this system is replaced by the `hashlib` backend.
+
+    Parameters
+    ----------
+    name : str
+        one of the keys of `BACKENDS`.
+
+    Returns
+    -------
+    HashlibBackend
+        the backend instance.
+
+    Raises
+    ------
+    ValueError
+        no backend is registered under name.
+    """
+    name = name or os.environ.get(HASH_BACKEND_ENV) or default_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown hash backend {name}, "
+                         f"choose from {', '.join(BACKENDS)}")
+    backend = BACKENDS[name]
+    if not backend.available():
+        logger.warning("Hash backend %s is not available, using hashlib",
+                       name)
+        backend = BACKENDS["hashlib"]
+    logger.debug("Using %s hash backend", backend.name)
+    if stats.collecting():
+        return TimedBackend(backend)
+    return backend
+
+
+class TimedBackend:
+    """
+    Hash backend wrapper adding the time spent hashing to `stats`.
+
+    Leaf and piece hashing counts as hash time, merkle roots of piece
+    layers as merkle time.
+
+    Parameters
+    ----------
+    backend : HashlibBackend
+        the wrapped backend.
+    """
+
+    def __init__(self, backend: HashlibBackend):
+        """
+        Wrap backend.
+        """
+        self.backend = backend
+        self.name = backend.name
+
+    def available(self) -> bool:
+        """
+        Return True if the wrapped backend can be used.
+        """
+        return self.backend.available()
+
+    def piece_hash(self, data=b""):
+        """
+        Return a timed incremental sha1 object for a v1 piece.
+        """
+        start = time.perf_counter()
+        piece = TimedHash(self.backend.piece_hash(data))
+        stats.add("hash", time.perf_counter() - start)
+        return piece
+
+    def leaf_hash(self, data) -> bytes:
+        """
+        Return the sha256 digest of a 16KiB block.
+        """
+        start = time.perf_counter()
+        digest = self.backend.leaf_hash(data)
+        stats.add("hash", time.perf_counter() - start)
+        return digest
+
+    def leaf_layer(self, data) -> bytes:
+        """
+        Return the leaf hashes of every 16KiB block of a piece.
+        """
+        start = time.perf_counter()
+        leaves = self.backend.leaf_layer(data)
+        stats.add("hash", time.perf_counter() - start)
+        return leaves
+
+    def piece_root(self, data, width: int) -> bytes:
+        """
+        Calculate the merkle root of one piece of file contents.
+        """
+        start = time.perf_counter()
+        root = self.backend.piece_root(data, width)
+        stats.add("hash", time.perf_counter() - start)
+        return root
+
+    def layer_root(self, layer, width: int, level: int = 0) -> bytes:
+        """
+        Calculate the merkle root of a buffer of concatenated hashes.
+        """
+        start = time.perf_counter()
+        root = self.backend.layer_root(layer, width, level)
+        stats.add("merkle", time.perf_counter() - start)
+        return root
+
+
+class TimedHash:
+    """
+    Incremental hash object adding the time spent updating it to `stats`.
+
+    Parameters
+    ----------
+    piece : hashlib.sha1
+        the wrapped hash object.
+    """
+
+    def __init__(self, piece):
+        """
+        Wrap piece.
+        """
+        self.piece = piece
+
+    def update(self, data):
+        """
+        Add data to the hash.
+        """
+        start = time.perf_counter()
+        self.piece.update(data)
+        stats.add("hash", time.perf_counter() - start)
+
+    def digest(self) -> bytes:
+        """
+        Return the digest of the data added so far.
+        """
+        return self.piece.digest()
+
+
+def read_chunk_size(piece_length: int, read_size: int = None) -> int:
+    """
+    Return the number of bytes read at once when hashing v2 content.
+
+    The read size is rounded down to a whole number of pieces, and is at
+    least one piece, so each read can be sliced into complete pieces.
+
+    Parameters
+    ----------
+    piece_length : int
+        piece length for data chunks.
+    read_size : int
+        requested read size, defaults to `READ_SIZE`.
+
+    Returns
+    -------
+    int
+        the read size.
+    """
+    read_size = read_size or READ_SIZE
+    return max(read_size // piece_length, 1) * piece_length
+
+
+def slice_pieces(chunk: memoryview, piece_length: int):
+    """
+    Split the contents of one large read into piece sized views.
+
+    Parameters
+    ----------
+    chunk : memoryview
+        data returned by a single read.
+    piece_length : int
+        piece length for data chunks.
+
+    Yields
+    ------
+    memoryview
+        view of each piece, only the last one can be shorter.
+    """
+    for start in range(0, len(chunk), piece_length):
+        yield chunk[start:start + piece_length]
+
+
 class HasherV2(CbMixin, ProgMixin):
     """
     Calculate the root hash and piece layers for file contents.
@@ -205,6 +1135,16 @@ class HasherV2(CbMixin, ProgMixin):
         the progress mode
     progress_bar: [Optional] ProgressBar
         a progress bar object if progress mode is 2
+    io_mode: str
+        how file contents are read, "buffered" or "mmap"
+    backend: str
+        name of the hash backend, see `get_backend`.
+    read_ahead: int
+        number of reads done ahead on a background thread, 0 disables it.
+    read_size: int
+        bytes read from the file at once, see `read_chunk_size`.
+    size: int
+        size of the file if it is already known.
     """
 
     def __init__(
@@ -213,65 +1153,60 @@ class HasherV2(CbMixin, ProgMixin):
         piece_length: int,
         progress: int = 1,
         progress_bar=None,
+        io_mode: str = "buffered",
+        backend: str = None,
+        read_ahead: int = 0,
+        read_size: int = None,
+        size: int = None,
     ):
         """
         Calculate and store hash information for specific file.
         """
+        self.backend = get_backend(backend)
         self.path = path
         self.root = None
-        self.piece_layer = None
-        self.layer_hashes = []
+        self.piece_layer = bytearray()
         self.piece_length = piece_length
+        self.read_size = read_chunk_size(piece_length, read_size)
         self.num_blocks = piece_length // BLOCK_SIZE
+        self.layers = MerkleAccumulator(self.num_blocks.bit_length() - 1)
         self.progress = progress
         self.progbar = progress_bar
         if self.progress == 1:
-            size = os.path.getsize(self.path)
+            if size is None:
+                size = os.path.getsize(self.path)
             self.progbar = self.get_progress_tracker(size, self.path)
-        with open(self.path, "rb") as fd:
-            self.process_file(fd)
+        with open_reader(self.path, self.read_size, io_mode,
+                         read_ahead) as reader:
+            self.process_file(reader)
 
-    def process_file(self, fd: str):
+    def process_file(self, fd):
         """
         Calculate hashes over 16KiB chuncks of file content.
 
         Parameters
         ----------
-        fd : BytesIO
-            Opened file in read mode.
+        fd : BlockReader
+            Opened file reader.
         """
         while True:
-            blocks = []
-            leaf = bytearray(BLOCK_SIZE)
-            # generate leaves of merkle tree
-
-            for _ in range(self.num_blocks):
-                size = fd.readinto(leaf)
-                if not size:
-                    break
-                self.progbar.update(size)
-                blocks.append(sha256(leaf[:size]).digest())
-
-            # blocks is empty mean eof
-            if not blocks:
+            chunk = fd.read(self.read_size)
+            # empty read means eof
+            if not chunk:
                 break
-            if len(blocks) != self.num_blocks:
-                # when size of file doesn't fill the last block
-                # when the file contains multiple pieces
-                remaining = self.num_blocks - len(blocks)
-                if not self.layer_hashes:
+            self.progbar.update(len(chunk))
+            for data in slice_pieces(chunk, self.piece_length):
+                size = len(data)
+                width = self.num_blocks
+                if size != self.piece_length and not self.layers.count:
                     # when the there is only one block for file
-                    power2 = next_power_2(len(blocks))
-                    remaining = power2 - len(blocks)
-
-                # pad the the rest with zeroes to fill remaining space.
-                padding = [bytes(32) for _ in range(remaining)]
-                blocks.extend(padding)
-            # calculate the root hash for the merkle tree up to piece-length
-
-            layer_hash = merkle_root(blocks)
-            self.cb(layer_hash)
-            self.layer_hashes.append(layer_hash)
+                    width = next_power_2(math.ceil(size / BLOCK_SIZE))
+                # calculate the root hash for the merkle tree up to
+                # piece-length padding the rest with zero subtrees.
+                layer_hash = self.backend.piece_root(data, width)
+                self.cb(layer_hash)
+                self.piece_layer.extend(layer_hash)
+                self.layers.add(layer_hash)
         if self.progress == 1:
             self.progbar.close_out()
         self._calculate_root()
@@ -280,15 +1215,8 @@ class HasherV2(CbMixin, ProgMixin):
         """
         Calculate root hash for the target file.
         """
-        self.piece_layer = b"".join(self.layer_hashes)
-        hashes = len(self.layer_hashes)
-        if hashes > 1:
-            pow2 = next_power_2(hashes)
-            remainder = pow2 - hashes
-            pad_piece = [bytes(HASH_SIZE) for _ in range(self.num_blocks)]
-            for _ in range(remainder):
-                self.layer_hashes.append(merkle_root(pad_piece))
-        self.root = merkle_root(self.layer_hashes)
+        with stats.Timer("merkle"):
+            self.root = self.layers.root()
 
 
 class HasherHybrid(CbMixin, ProgMixin):
@@ -309,6 +1237,16 @@ class HasherHybrid(CbMixin, ProgMixin):
         the progress mode
     progress_bar: [Optional] ProgressBar
         a progress bar object if progress mode is 2
+    io_mode: str
+        how file contents are read, "buffered" or "mmap"
+    backend: str
+        name of the hash backend, see `get_backend`.
+    read_ahead: int
+        number of reads done ahead on a background thread, 0 disables it.
+    read_size: int
+        bytes read from the file at once, see `read_chunk_size`.
+    size: int
+        size of the file if it is already known.
     """
 
     def __init__(
@@ -317,30 +1255,38 @@ class HasherHybrid(CbMixin, ProgMixin):
         piece_length: int,
         progress: int = 1,
         progress_bar=None,
+        io_mode: str = "buffered",
+        backend: str = None,
+        read_ahead: int = 0,
+        read_size: int = None,
+        size: int = None,
     ):
         """
         Construct Hasher class instances for each file in torrent.
         """
+        self.backend = get_backend(backend)
         self.path = path
         self.piece_length = piece_length
+        self.read_size = read_chunk_size(piece_length, read_size)
         self.pieces = []
-        self.layer_hashes = []
-        self.piece_layer = None
+        self.piece_layer = bytearray()
         self.root = None
         self.padding_piece = None
         self.padding_file = None
         self.amount = piece_length // BLOCK_SIZE
+        self.layers = MerkleAccumulator(self.amount.bit_length() - 1)
         self.progress = progress
         self.progbar = progress_bar
         if self.progress == 1:
-            size = os.path.getsize(self.path)
+            if size is None:
+                size = os.path.getsize(self.path)
             self.progbar = self.get_progress_tracker(size, self.path)
-        with open(path, "rb") as data:
+        with open_reader(path, self.read_size, io_mode, read_ahead) as data:
             self.process_file(data)
 
-    def _pad_remaining(self, block_count: int):
+    def _piece_width(self, block_count: int) -> int:
         """
-        Generate Hash sized, 0 filled bytes for padding.
+        Return the number of leaves the piece tree is padded to.
 
         Parameters
         ----------
@@ -349,56 +1295,45 @@ class HasherHybrid(CbMixin, ProgMixin):
 
         Returns
         -------
-        padding : bytes
-            Padding to fill remaining portion of tree.
+        int
+            width of the piece's merkle tree.
         """
         # when the there is only one block for file
-        remaining = self.amount - block_count
-        if not self.layer_hashes:
-            power2 = next_power_2(block_count)
-            remaining = power2 - block_count
-        return [bytes(HASH_SIZE) for _ in range(remaining)]
+        if not self.layers.count:
+            return next_power_2(block_count)
+        return self.amount
 
-    def process_file(self, data: bytearray):
+    def process_file(self, data):
         """
         Calculate layer hashes for contents of file.
 
         Parameters
         ----------
-        data : BytesIO
-            File opened in read mode.
+        data : BlockReader
+            Opened file reader.
         """
         while True:
-            plength = self.piece_length
-            blocks = []
-            piece = sha1()  # nosec
-            total = 0
-            block = bytearray(BLOCK_SIZE)
-            for _ in range(self.amount):
-                size = data.readinto(block)
-                self.progbar.update(size)
-                if not size:
-                    break
-                total += size
-                plength -= size
-                blocks.append(sha256(block[:size]).digest())
-                piece.update(block[:size])
-            if not blocks:
+            chunk = data.read(self.read_size)
+            if not chunk:
                 break
-            if len(blocks) != self.amount:
-                padding = self._pad_remaining(len(blocks))
-                blocks.extend(padding)
-            layer_hash = merkle_root(blocks)
-            self.cb(layer_hash)
-            self.layer_hashes.append(layer_hash)
-            if plength > 0:
-                self.padding_file = {
-                    "attr": "p",
-                    "length": plength,
-                    "path": [".pad", str(plength)],
-                }
-                piece.update(bytes(plength))
-            self.pieces.append(piece.digest())  # nosec
+            self.progbar.update(len(chunk))
+            for block in slice_pieces(chunk, self.piece_length):
+                size = len(block)
+                plength = self.piece_length - size
+                piece = self.backend.piece_hash(block)
+                width = self._piece_width(math.ceil(size / BLOCK_SIZE))
+                layer_hash = self.backend.piece_root(block, width)
+                self.cb(layer_hash)
+                self.piece_layer.extend(layer_hash)
+                self.layers.add(layer_hash)
+                if plength > 0:
+                    self.padding_file = {
+                        "attr": "p",
+                        "length": plength,
+                        "path": [".pad", str(plength)],
+                    }
+                    piece.update(bytes(plength))
+                self.pieces.append(piece.digest())  # nosec
         if self.progress == 1:
             self.progbar.close_out()
         self._calculate_root()
@@ -409,16 +1344,8 @@ class HasherHybrid(CbMixin, ProgMixin):
 
         **DEPRECATED**
         """
-        self.piece_layer = b"".join(self.layer_hashes)
-
-        if len(self.layer_hashes) > 1:
-            pad_piece = merkle_root([bytes(32) for _ in range(self.amount)])
-
-            pow2 = next_power_2(len(self.layer_hashes))
-            remainder = pow2 - len(self.layer_hashes)
-
-            self.layer_hashes += [pad_piece for _ in range(remainder)]
-        self.root = merkle_root(self.layer_hashes)
+        with stats.Timer("merkle"):
+            self.root = self.layers.root()
 
 
 class FileHasher(CbMixin, ProgMixin):
@@ -441,6 +1368,18 @@ class FileHasher(CbMixin, ProgMixin):
         the progress mode
     progress_bar: [Optional] ProgressBar
         a progress bar object if progress mode is 2
+    io_mode: str
+        how file contents are read, "buffered" or "mmap"
+    backend: str
+        name of the hash backend, see `get_backend`.
+    read_ahead: int
+        number of reads done ahead on a background thread, 0 disables it.
+    read_size: int
+        bytes read from the file at once, see `read_chunk_size`.
+    keep_leaves: bool
+        collect the 16KiB leaf hashes of the whole file in `leaves`.
+    size: int
+        size of the file if it is already known.
     """
 
     def __init__(
@@ -450,35 +1389,47 @@ class FileHasher(CbMixin, ProgMixin):
         progress: int = 1,
         hybrid: bool = False,
         progress_bar=None,
+        io_mode: str = "buffered",
+        backend: str = None,
+        read_ahead: int = 0,
+        read_size: int = None,
+        keep_leaves: bool = False,
+        size: int = None,
     ):
         """
         Construct Hasher class instances for each file in torrent.
         """
+        self.backend = get_backend(backend)
         self.path = path
         self.piece_length = piece_length
+        self.read_size = read_chunk_size(piece_length, read_size)
         self.pieces = []
-        self.layer_hashes = []
-        self.piece_layer = None
+        self.piece_layer = bytearray()
+        self.leaves = bytearray() if keep_leaves else None
         self.root = None
         self.padding_piece = None
         self.padding_file = None
         self.amount = piece_length // BLOCK_SIZE
+        self.layers = MerkleAccumulator(self.amount.bit_length() - 1)
         self.end = False
         self.progress = progress
         self.progbar = progress_bar
         if self.progress == 1:
-            size = os.path.getsize(self.path)
+            if size is None:
+                size = os.path.getsize(self.path)
             self.progbar = self.get_progress_tracker(size, self.path)
-        self.current = open(path, "rb")
+        self.current = open_reader(path, self.read_size, io_mode, read_ahead)
+        self.chunk = memoryview(b"")
+        self.offset = 0
         self.hybrid = hybrid
 
     def __iter__(self):
         """Return `self`: needed to implement iterator implementation."""
         return self
 
-    def _pad_remaining(self, block_count: int):
+    def _piece_width(self, block_count: int) -> int:
         """
-        Generate Hash sized, 0 filled bytes for padding.
+        Return the number of leaves the piece tree is padded to.
 
         Parameters
         ----------
@@ -487,15 +1438,13 @@ class FileHasher(CbMixin, ProgMixin):
 
         Returns
         -------
-        padding : bytes
-            Padding to fill remaining portion of tree.
+        int
+            width of the piece's merkle tree.
         """
         # when the there is only one block for file
-        remaining = self.amount - block_count
-        if not self.layer_hashes:
-            power2 = next_power_2(block_count)
-            remaining = power2 - block_count
-        return [bytes(HASH_SIZE) for _ in range(remaining)]
+        if not self.layers.count:
+            return next_power_2(block_count)
+        return self.amount
 
     def __next__(self) -> bytes:
         """
@@ -514,30 +1463,32 @@ class FileHasher(CbMixin, ProgMixin):
         if self.end:
             self.end = False
             raise StopIteration
-        plength = self.piece_length
-        blocks = []
-        piece = sha1()  # nosec
-        total = 0
-        block = bytearray(BLOCK_SIZE)
-        for _ in range(self.amount):
-            size = self.current.readinto(block)
-            self.progbar.update(size)
-            if not size:
-                self.end = True
-                break
-            total += size
-            plength -= size
-            blocks.append(sha256(block[:size]).digest())
-            if self.hybrid:
-                piece.update(block[:size])
-        if not blocks:
-            self._calculate_root()
-            raise StopIteration
-        if len(blocks) != self.amount:
-            padding = self._pad_remaining(len(blocks))
-            blocks.extend(padding)
-        layer_hash = merkle_root(blocks)
-        self.layer_hashes.append(layer_hash)
+        if self.offset == len(self.chunk):
+            self.chunk = self.current.read(self.read_size)
+            self.offset = 0
+            if not self.chunk:
+                self._calculate_root()
+                raise StopIteration
+            self.progbar.update(len(self.chunk))
+        start = self.offset
+        self.offset = min(start + self.piece_length, len(self.chunk))
+        block = self.chunk[start:self.offset]
+        size = len(block)
+        plength = self.piece_length - size
+        if plength:
+            self.end = True
+        width = self._piece_width(math.ceil(size / BLOCK_SIZE))
+        if self.leaves is not None:
+            leaves = self.backend.leaf_layer(block)
+            self.leaves.extend(leaves)
+            layer_hash = self.backend.layer_root(leaves, width)
+        else:
+            layer_hash = self.backend.piece_root(block, width)
+        if self.hybrid:
+            piece = self.backend.piece_hash(block)
+        block.release()
+        self.piece_layer.extend(layer_hash)
+        self.layers.add(layer_hash)
         self.cb(layer_hash)
         if self.end:
             if self.progress == 1:
@@ -560,14 +1511,347 @@ class FileHasher(CbMixin, ProgMixin):
         """
         Calculate the root hash for opened file.
         """
-        self.piece_layer = b"".join(self.layer_hashes)
+        with stats.Timer("merkle"):
+            self.root = self.layers.root()
+        self.chunk.release()
+        self.current.close()
 
-        if len(self.layer_hashes) > 1:
-            pad_piece = merkle_root([bytes(32) for _ in range(self.amount)])
 
-            pow2 = next_power_2(len(self.layer_hashes))
-            remainder = pow2 - len(self.layer_hashes)
+def hash_file(path: str,
+              piece_length: int,
+              hybrid: bool = False,
+              io_mode: str = "buffered",
+              backend: str = None,
+              read_size: int = None,
+              keep_leaves: bool = False,
+              progress_bar=None) -> tuple:
+    """
+    Hash the contents of a single file for a v2 or hybrid torrent.
 
-            self.layer_hashes += [pad_piece for _ in range(remainder)]
-        self.root = merkle_root(self.layer_hashes)
-        self.current.close()
+    Module level so it can be sent to thread or process pool workers.
+
+    Parameters
+    ----------
+    path : str
+        path to target file.
+    piece_length : int
+        piece length for data chunks.
+    hybrid : bool
+        flag to indicate if it's a hybrid torrent
+    io_mode : str
+        how file contents are read, "buffered" or "mmap"
+    backend : str
+        name of the hash backend, see `get_backend`.
+    read_size : int
+        bytes read from the file at once, see `read_chunk_size`.
+    keep_leaves : bool
+        also return the 16KiB leaf hashes of the file.
+    progress_bar : ProgressBar
+        object the bytes hashed are reported to, thread pools only.
+
+    Returns
+    -------
+    tuple
+        pieces root, piece layer, v1 pieces and padding file details,
+        followed by the leaf hashes when keep_leaves is set.
+    """
+    hasher = FileHasher(
+        path,
+        piece_length,
+        progress=2,
+        hybrid=hybrid,
+        progress_bar=progress_bar or ProgMixin.NoProg(),
+        io_mode=io_mode,
+        backend=backend,
+        read_size=read_size,
+        keep_leaves=keep_leaves,
+    )
+    pieces = bytearray()
+    for result in hasher:
+        if hybrid:
+            pieces.extend(result[1])
+    result = (hasher.root, bytes(hasher.piece_layer), bytes(pieces),
+              hasher.padding_file)
+    if keep_leaves:
+        return result + (bytes(hasher.leaves), )
+    return result
+
+
+def segment_ranges(size: int, piece_length: int, workers: int) -> list:
+    """
+    Split a file into piece aligned byte ranges for concurrent hashing.
+
+    Segments are at most `SEGMENT_SIZE` bytes, and small enough that every
+    worker has at least one, but never smaller than `MIN_SEGMENT_SIZE`.
+
+    Parameters
+    ----------
+    size : int
+        size of the file.
+    piece_length : int
+        piece length for data chunks.
+    workers : int
+        number of workers available.
+
+    Returns
+    -------
+    list
+        (start, stop) byte ranges covering the whole file.
+    """
+    pieces = math.ceil(size / piece_length)
+    per_segment = min(math.ceil(SEGMENT_SIZE / piece_length),
+                      math.ceil(pieces / max(workers, 1)))
+    per_segment = max(per_segment, math.ceil(MIN_SEGMENT_SIZE / piece_length))
+    step = per_segment * piece_length
+    return [(start, min(start + step, size))
+            for start in range(0, size, step)]
+
+
+def hash_segment(path: str,
+                 piece_length: int,
+                 start: int,
+                 stop: int,
+                 hybrid: bool = False,
+                 io_mode: str = "buffered",
+                 backend: str = None,
+                 keep_leaves: bool = False,
+                 progress_bar=None) -> tuple:
+    """
+    Calculate the piece layer hashes for a piece aligned range of a file.
+
+    Produces the same layer hashes, and v1 pieces for hybrid torrents, that
+    `FileHasher` would produce for the pieces inside the range, so a large
+    file can be hashed by several workers at once.
+
+    Parameters
+    ----------
+    path : str
+        path to target file.
+    piece_length : int
+        piece length for data chunks.
+    start : int
+        offset of the first byte of the range, a multiple of piece_length.
+    stop : int
+        offset one past the last byte of the range.
+    hybrid : bool
+        flag to indicate if it's a hybrid torrent
+    io_mode : str
+        how file contents are read, one of `reader.IO_MODES`.
+    backend : str
+        name of the hash backend, see `get_backend`.
+    keep_leaves : bool
+        also return the 16KiB leaf hashes of the range.
+    progress_bar : ProgressBar
+        object the bytes hashed are reported to, thread pools only.
+
+    Returns
+    -------
+    tuple
+        the piece layer hashes and v1 pieces of the range, followed by the
+        leaf hashes when keep_leaves is set.
+    """
+    engine = get_backend(backend)
+    num_blocks = piece_length // BLOCK_SIZE
+    layers, pieces, leaves = bytearray(), bytearray(), bytearray()
+    with open_ranges(path, io_mode) as reader:
+        for offset in range(start, stop, piece_length):
+            data = reader.pread(min(piece_length, stop - offset), offset)
+            if not data:
+                break
+            view = memoryview(data)
+            width = num_blocks
+            if len(view) != piece_length and not offset:
+                # the first piece of a file pads to the next power of 2
+                width = next_power_2(math.ceil(len(view) / BLOCK_SIZE))
+            if keep_leaves:
+                hashes = engine.leaf_layer(view)
+                leaves.extend(hashes)
+                layers.extend(engine.layer_root(hashes, width))
+            else:
+                layers.extend(engine.piece_root(view, width))
+            if hybrid:
+                piece = engine.piece_hash(view)
+                if len(view) < piece_length:
+                    piece.update(bytes(piece_length - len(view)))
+                pieces.extend(piece.digest())
+            if progress_bar is not None:
+                progress_bar.update(len(view))
+    if keep_leaves:
+        return bytes(layers), bytes(pieces), bytes(leaves)
+    return bytes(layers), bytes(pieces)
+
+
+def pieces_root(piece_layer: bytes,
+                piece_length: int,
+                backend: str = None) -> bytes:
+    """
+    Calculate the pieces root of a file from its complete piece layer.
+
+    Parameters
+    ----------
+    piece_layer : bytes
+        concatenated piece layer hashes of the file.
+    piece_length : int
+        piece length for data chunks.
+    backend : str
+        name of the hash backend, see `get_backend`.
+
+    Returns
+    -------
+    bytes
+        the pieces root hash of the file.
+    """
+    if len(piece_layer) <= HASH_SIZE:
+        return merkle_root([bytes(piece_layer)] if piece_layer else [])
+    level = (piece_length // BLOCK_SIZE).bit_length() - 1
+    width = next_power_2(len(piece_layer) // HASH_SIZE)
+    return get_backend(backend).layer_root(piece_layer, width, level)
+
+
+def hash_stream(stream,
+                piece_length: int,
+                v1: bool = True,
+                v2: bool = False,
+                backend: str = None,
+                tee=None,
+                progress_bar=None,
+                pad: bool = False) -> tuple:
+    """
+    Calculate the hashes of content read once from a stream.
+
+    The stream is read piece by piece from start to end, so it can be a
+    pipe or any other source that can not seek.  Reads that return less
+    than was asked for are repeated until the piece is full or the stream
+    ends.
+
+    Parameters
+    ----------
+    stream : BinaryIO
+        readable binary stream with a `readinto` method.
+    piece_length : int
+        piece length for data chunks.
+    v1 : bool
+        calculate the v1 pieces.
+    v2 : bool
+        calculate the v2 piece layer and pieces root, with v1 the last
+        piece is padded like the pieces of a hybrid torrent.
+    backend : str
+        name of the hash backend, see `get_backend`.
+    tee : BinaryIO
+        writable binary stream a copy of the content is written to.
+    progress_bar : ProgressBar
+        progress bar updated with the size of each piece.
+    pad : bool
+        pad the last v1 piece with zeros, for piece aligned torrents.
+
+    Returns
+    -------
+    tuple
+        the length of the content, the v1 pieces, and the v2 pieces root
+        and piece layer, the root is None without v2 or content.
+    """
+    engine = get_backend(backend)
+    num_blocks = piece_length // BLOCK_SIZE
+    buffer = memoryview(bytearray(piece_length))
+    pieces, layer = bytearray(), bytearray()
+    length = 0
+    while True:
+        size = 0
+        while size < piece_length:
+            amount = stream.readinto(buffer[size:])
+            if not amount:
+                break
+            size += amount
+        if not size:
+            break
+        view = buffer[:size]
+        if tee is not None:
+            tee.write(view)
+        if v1:
+            piece = engine.piece_hash(view)
+            if (v2 or pad) and size < piece_length:
+                piece.update(bytes(piece_length - size))
+            pieces.extend(piece.digest())
+        if v2:
+            width = num_blocks
+            if size < piece_length and not length:
+                # the first piece of a file pads to the next power of 2
+                width = next_power_2(math.ceil(size / BLOCK_SIZE))
+            layer.extend(engine.piece_root(view, width))
+        view.release()
+        length += size
+        if progress_bar is not None:
+            progress_bar.update(size)
+        if size < piece_length:
+            break
+    root = None
+    if v2 and length:
+        root = pieces_root(layer, piece_length, backend)
+    return length, bytes(pieces), root, bytes(layer)
+
+
+def leaves_to_layer(leaves: bytes,
+                    piece_length: int,
+                    backend: str = None) -> tuple:
+    """
+    Calculate the pieces root and piece layer of a file from its leaves.
+
+    The leaf hashes of a file do not depend on the piece length, so they
+    can be reduced to the piece layer for any piece length without reading
+    the file again.
+
+    Parameters
+    ----------
+    leaves : bytes
+        concatenated sha256 hashes of every 16KiB block of the file.
+    piece_length : int
+        piece length for data chunks.
+    backend : str
+        name of the hash backend, see `get_backend`.
+
+    Returns
+    -------
+    tuple
+        the pieces root and the piece layer.
+    """
+    engine = get_backend(backend)
+    num_blocks = piece_length // BLOCK_SIZE
+    count = len(leaves) // HASH_SIZE
+    if count <= num_blocks:
+        # the first and only piece pads to the next power of 2
+        layer = engine.layer_root(leaves, next_power_2(count))
+        return layer, layer
+    step = num_blocks * HASH_SIZE
+    layer = bytearray()
+    with memoryview(leaves) as view:
+        for start in range(0, len(view), step):
+            layer.extend(engine.layer_root(view[start:start + step],
+                                           num_blocks))
+    return pieces_root(layer, piece_length, engine.name), bytes(layer)
+
+
+def padding_file(size: int, piece_length: int) -> dict:
+    """
+    Return the hybrid torrent padding file entry that follows a file.
+
+    Parameters
+    ----------
+    size : int
+        size of the file.
+    piece_length : int
+        piece length for data chunks.
+
+    Returns
+    -------
+    dict
+        the padding file details, or None when the file ends on a piece
+        boundary.
+    """
+    remainder = -size % piece_length
+    if not remainder:
+        return None
+    return {
+        "attr": "p",
+        "length": remainder,
+        "path": [".pad", str(remainder)],
+    }
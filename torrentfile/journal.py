@@ -0,0 +1,193 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Checkpoint journal for resuming interrupted torrent creation.
+
+While content is hashed the finished work is appended to a journal file
+next to the output: the pieces root, piece layer and pieces of each v2 or
+hybrid file, and batches of v1 pieces.  The journal is flushed to disk
+every `CHECKPOINT_SIZE` bytes of hashed content, so a job that is killed
+loses at most that much work.  When the torrent is written the journal is
+removed.
+
+The journal starts with `MAGIC` followed by bencoded records, each
+preceded by its four byte big endian length.  The first record is a
+header holding the torrent settings, so a journal is never resumed with
+different settings.  A record cut short by a crash ends the journal.
+
+Classes
+-------
+- `Journal`
+    reads the journal of an interrupted job and records new work.
+"""
+
+import os
+import struct
+import logging
+
+import pyben
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"torrentfile journal 1\n"
+HEADER = struct.Struct(">I")
+CHECKPOINT_SIZE = 2**30  # 1GiB
+
+
+class Journal:
+    """
+    Checkpoint journal of a torrent creation job.
+
+    Parameters
+    ----------
+    path : str
+        path of the journal file.
+    resume : bool
+        read the records of an earlier job from the journal.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        """
+        Read the journal of an earlier job when resuming.
+        """
+        self.path = str(path)
+        self.header, self.records = {}, []
+        self.fd = None
+        self.pending = 0
+        if resume:
+            self.header, self.records = read_journal(self.path)
+            logger.debug("Read %d records from journal %s",
+                         len(self.records), self.path)
+
+    def start(self, header: dict, records: list = ()):
+        """
+        Begin a new journal holding the records kept from the earlier job.
+
+        The journal is written to a temporary file that replaces the old
+        journal once it is on disk.
+
+        Parameters
+        ----------
+        header : dict
+            torrent settings the records belong to.
+        records : list
+            records of the earlier job that are still valid.
+        """
+        temp = self.path + ".tmp"
+        with open(temp, "wb") as binfile:
+            binfile.write(MAGIC)
+            for record in [header, *records]:
+                _write_record(binfile, record)
+            binfile.flush()
+            os.fsync(binfile.fileno())
+        os.replace(temp, self.path)
+        self.fd = open(self.path, "ab")  # pylint: disable=R1732
+
+    def add(self, record: dict, size: int = 0):
+        """
+        Append a record of finished work.
+
+        Parameters
+        ----------
+        record : dict
+            the record.
+        size : int
+            bytes of content the record covers.
+        """
+        _write_record(self.fd, record)
+        self.pending += size
+        if self.pending >= CHECKPOINT_SIZE:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Flush the records written so far to disk.
+        """
+        if self.fd is not None and not self.fd.closed:
+            self.fd.flush()
+            os.fsync(self.fd.fileno())
+            self.pending = 0
+
+    def close(self):
+        """
+        Flush and close the journal file.
+        """
+        if self.fd is not None and not self.fd.closed:
+            self.checkpoint()
+            self.fd.close()
+
+    def discard(self):
+        """
+        Close and remove the journal once the torrent is written.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def read_journal(path: str) -> tuple:
+    """
+    Read the header and records of a journal.
+
+    Parameters
+    ----------
+    path : str
+        path of the journal file.
+
+    Returns
+    -------
+    tuple
+        the header and the list of complete records, an empty header and
+        no records if there is no readable journal.
+    """
+    if not os.path.exists(path):
+        return {}, []
+    records = []
+    with open(path, "rb") as binfile:
+        if binfile.read(len(MAGIC)) != MAGIC:
+            logger.debug("%s is not a journal, starting over", path)
+            return {}, []
+        while True:
+            prefix = binfile.read(HEADER.size)
+            if len(prefix) < HEADER.size:
+                break
+            (size, ) = HEADER.unpack(prefix)
+            data = binfile.read(size)
+            if len(data) < size:
+                break
+            records.append(pyben.loads(data))
+    if not records:
+        return {}, []
+    return records[0], records[1:]
+
+
+def _write_record(binfile, record: dict):
+    """
+    Write one length prefixed record.
+
+    Parameters
+    ----------
+    binfile : BufferedWriter
+        the open journal.
+    record : dict
+        the record.
+    """
+    data = pyben.dumps(record)
+    binfile.write(HEADER.pack(len(data)))
+    binfile.write(data)
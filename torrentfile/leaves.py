@@ -0,0 +1,197 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Sidecar files holding the 16KiB leaf hashes of torrent content.
+
+The leaves of a file's merkle tree are the same for every piece length, so
+a torrent can be created again at another piece length from the leaves
+alone, without reading any of the content.
+
+The file starts with `MAGIC`, followed by one record for each file: a four
+byte big endian header length, a bencoded header with the file's path and
+length, and then the file's leaf hashes.  Records are written as each file
+is hashed, and read back lazily, so the leaves never have to fit in memory.
+
+Classes
+-------
+- `LeafWriter`
+    writes the leaves of each file as it is hashed.
+- `LeafReader`
+    reads the leaves of a file from a sidecar.
+"""
+
+import os
+import math
+import struct
+import logging
+
+import pyben
+
+from torrentfile.hasher import BLOCK_SIZE, HASH_SIZE
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"torrentfile leaves 1\n"
+HEADER = struct.Struct(">I")
+
+
+class LeafWriter:
+    """
+    Write the leaf hashes of each file to a sidecar file.
+
+    Parameters
+    ----------
+    path : str
+        path of the sidecar file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Create the sidecar file.
+        """
+        self.path = str(path)
+        self.fd = open(self.path, "wb")  # pylint: disable=R1732
+        self.fd.write(MAGIC)
+        self.count = 0
+
+    def add(self, parts: list, length: int, leaves: bytes):
+        """
+        Append the leaves of one file.
+
+        Parameters
+        ----------
+        parts : list
+            path of the file inside the torrent, split into components.
+        length : int
+            size of the file.
+        leaves : bytes
+            concatenated leaf hashes of the file.
+
+        Raises
+        ------
+        ValueError
+            the number of leaves does not match the length.
+        """
+        if len(leaves) != math.ceil(length / BLOCK_SIZE) * HASH_SIZE:
+            raise ValueError(f"wrong number of leaves for {parts}")
+        header = pyben.dumps({"length": length, "path": list(parts)})
+        self.fd.write(HEADER.pack(len(header)))
+        self.fd.write(header)
+        self.fd.write(leaves)
+        self.count += 1
+
+    def close(self):
+        """
+        Close the sidecar file.
+        """
+        self.fd.close()
+        logger.debug("Saved leaves of %d files to %s", self.count, self.path)
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager closing the file.
+        """
+        self.close()
+
+
+class LeafReader:
+    """
+    Read the leaf hashes of files from a sidecar file.
+
+    Only the record headers are read when the sidecar is opened, the
+    leaves of a file are read when they are requested.
+
+    Parameters
+    ----------
+    path : str
+        path of the sidecar file.
+
+    Raises
+    ------
+    ValueError
+        the file is not a leaves sidecar.
+    """
+
+    def __init__(self, path: str):
+        """
+        Index the records of the sidecar file.
+        """
+        self.path = str(path)
+        self.index = {}
+        self.fd = open(self.path, "rb")  # pylint: disable=R1732
+        if self.fd.read(len(MAGIC)) != MAGIC:
+            self.fd.close()
+            raise ValueError(f"{self.path} is not a leaves file")
+        end = os.fstat(self.fd.fileno()).st_size
+        offset = len(MAGIC)
+        while offset < end:
+            (size, ) = HEADER.unpack(self.fd.read(HEADER.size))
+            header = pyben.loads(self.fd.read(size))
+            offset += HEADER.size + size
+            length = header["length"]
+            self.index[tuple(header["path"])] = (length, offset)
+            offset += math.ceil(length / BLOCK_SIZE) * HASH_SIZE
+            self.fd.seek(offset)
+
+    def get(self, parts: list, length: int) -> bytes:
+        """
+        Return the leaves of a file.
+
+        Parameters
+        ----------
+        parts : list
+            path of the file inside the torrent, split into components.
+        length : int
+            current size of the file.
+
+        Returns
+        -------
+        bytes
+            the leaf hashes, or None if the sidecar has no leaves for a
+            file of that length.
+        """
+        record = self.index.get(tuple(parts))
+        if record is None or record[0] != length:
+            return None
+        self.fd.seek(record[1])
+        return self.fd.read(math.ceil(length / BLOCK_SIZE) * HASH_SIZE)
+
+    def close(self):
+        """
+        Close the sidecar file.
+        """
+        self.fd.close()
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager closing the file.
+        """
+        self.close()
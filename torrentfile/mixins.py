@@ -21,16 +21,22 @@ Collection of classes that can be used as Mixins with other base classes.
 
 Classes such as TorrentFile, TorrentFilev2, and all Hasher classes can use the
 progress bar mixin.  And any class is eligible to use the callback mixin.
+When several workers hash at once, they report into a shared
+`ProgressAggregator` instead of drawing bars of their own.
 """
 import os
 import sys
 import math
 import time
 import shutil
+import threading
 from pathlib import Path
+from typing import NamedTuple
 
 from torrentfile.utils import debug_is_on, green
 
+RATE_WIDTH = 26
+
 
 class CbMixin:
     """
@@ -58,6 +64,11 @@ class ProgressBar:
     """
     Holds the state and details of the terminal progress bars.
 
+    Updates only add to the state, the bar is drawn at most
+    `refresh_rate` times per second, along with the throughput and the
+    time remaining.  When stdout is not a terminal, a line of text is
+    written every `line_interval` seconds instead of redrawing the bar.
+
     Parameters
     ----------
     total : int
@@ -72,6 +83,9 @@ class ProgressBar:
         column where the progress bar should be drawn
     """
 
+    refresh_rate = 10
+    line_interval = 5.0
+
     def __init__(self, total: int, title: str, length: int, unit: str,
                  start: int):
         """
@@ -85,25 +99,36 @@ class ProgressBar:
         self.empty = chr(9617)
         self.state = 0
         self.unit = unit
-        self.show_total = total
+        self.scale = 1
         if not unit:
             self.unit = ""  # pragma: nocover
         elif unit == "bytes":
             if self.total > 1_000_000_000:
-                self.show_total = self.total / (2**30)
+                self.scale = 2**30
                 self.unit = "GiB"
             elif self.total > 1_000_000:
-                self.show_total = self.total / 1048576
+                self.scale = 1048576
                 self.unit = "MiB"
             elif self.total > 10000:
-                self.show_total = self.total / 1024
+                self.scale = 1024
                 self.unit = "KiB"
+        self.show_total = total / self.scale
         self.suffix = f"/{self.show_total:.02f} {self.unit}"
-        title = str(title)
+        self.title = str(title)
+        title = self.title
         if len(title) > start:
             title = title[:start - 1]  # pragma: nocover
         padding = (start - len(title)) * " "
         self.prefix = "".join([title, padding])
+        isatty = getattr(sys.stdout, "isatty", None)
+        self.tty = bool(isatty and isatty())
+        if self.tty:
+            self.interval = 1 / self.refresh_rate
+        else:
+            self.interval = self.line_interval
+        self.started = time.monotonic()
+        self.next_draw = self.started
+        self.drawn = None
 
     def get_progress(self) -> str:
         """
@@ -121,33 +146,49 @@ class ProgressBar:
         empty = self.length - fill
         contents = (self.fill * fill) + (self.empty * empty)
         pbar = ["|", green(contents), "| "]
-        if self.unit == "GiB":
-            state = self.state / (2**30)
-        elif self.unit == "MiB":
-            state = self.state / 1048576
-        elif self.unit == "KiB":
-            state = self.state / 1024
-        else:
-            state = self.state
-        pbar.append(f"{state:.02f}")
+        pbar.append(f"{self.state / self.scale:.02f}")
         return "".join(pbar)
 
-    @staticmethod
-    def close_out():
+    def get_rate(self, now: float) -> str:
+        """
+        Return the throughput and the time remaining.
+
+        Parameters
+        ----------
+        now : float
+            the current `time.monotonic` time.
+
+        Returns
+        -------
+        str :
+            units per second and the estimated time left.
+        """
+        elapsed = now - self.started
+        speed = self.state / elapsed if elapsed > 0 else 0
+        left = max(self.total - self.state, 0)
+        eta = clock(left / speed) if speed else "-:--"
+        return f"{speed / self.scale:.02f} {self.unit}/s ETA {eta}"
+
+    def close_out(self):
         """
         Finalize the last bits of progress bar.
 
-        Increment the terminal by one line leaving the progress bar in place,
-        and deleting the progress bar object to clear a space for the next one.
+        Draw the final state, then increment the terminal by one line
+        leaving the progress bar in place, to clear a space for the next one.
         """
+        if self.drawn != self.state:
+            self.draw(time.monotonic())
+        if self.tty:
+            sys.stdout.write("\n")
         sys.stdout.flush()
-        sys.stdout.write("\n")
 
     def update(self, val: int):
         """
         Update progress bar.
 
         Using the value provided, increment the progress bar by that value.
+        The bar is drawn when it was last drawn long enough ago, or when it
+        is complete.
 
         Parameters
         ----------
@@ -155,8 +196,30 @@ class ProgressBar:
             the number of bytes count the progress bar should increase.
         """
         self.state += val
-        pbar = self.get_progress()
-        output = f"{self.prefix}{pbar}{self.suffix}\r"
+        now = time.monotonic()
+        if now >= self.next_draw or (self.state >= self.total
+                                     and self.drawn != self.state):
+            self.draw(now)
+
+    def draw(self, now: float):
+        """
+        Write the progress to stdout.
+
+        Parameters
+        ----------
+        now : float
+            the current `time.monotonic` time.
+        """
+        self.drawn = self.state
+        self.next_draw = now + self.interval
+        rate = self.get_rate(now)
+        if self.tty:
+            pbar = self.get_progress()
+            output = f"{self.prefix}{pbar}{self.suffix} {rate}\r"
+        else:
+            percent = self.state / self.total * 100 if self.total else 100
+            output = (f"{self.title} {percent:.0f}% "
+                      f"{self.state / self.scale:.02f}{self.suffix} {rate}\n")
         sys.stdout.write(output)
         sys.stdout.flush()
 
@@ -186,11 +249,338 @@ class ProgressBar:
                 title = os.path.join(*parts)
             else:
                 title = os.path.basename(path)  # pragma: nocover
-        length = min(length, width // 2)
-        start = width - int(length * 1.5)
+        # room for the throughput and time remaining after the bar
+        width -= RATE_WIDTH
+        length = max(min(length, width // 2), 10)
+        start = max(width - int(length * 1.5), 1)
         return cls(total, title, length, unit, start)
 
 
+def clock(seconds: float) -> str:
+    """
+    Format a number of seconds as hours, minutes and seconds.
+
+    Parameters
+    ----------
+    seconds : float
+        the duration.
+
+    Returns
+    -------
+    str :
+        the duration as h:mm:ss, or m:ss when under an hour.
+    """
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02}:{seconds:02}"
+    return f"{minutes}:{seconds:02}"
+
+
+class FileProgress(NamedTuple):
+    """
+    Progress of a single file that is being hashed.
+    """
+
+    name: str
+    done: int
+    total: int
+
+
+class ProgressSnapshot(NamedTuple):
+    """
+    Progress of a job at a point in time, see `ProgressAggregator.snapshot`.
+
+    `rate` is in units per second and `eta` in seconds, it is None until
+    the rate is known.
+    """
+
+    done: int
+    total: int
+    elapsed: float
+    rate: float
+    eta: float
+    active: tuple
+
+
+class _Reporter:
+    """
+    Progress bar stand-in that reports the progress of one file.
+
+    Parameters
+    ----------
+    aggregator : ProgressAggregator
+        the aggregator updates are added to.
+    key : Hashable
+        the key the file was started with.
+    """
+
+    __slots__ = ("aggregator", "key")
+
+    def __init__(self, aggregator, key):
+        """
+        Store the aggregator and the file key.
+        """
+        self.aggregator = aggregator
+        self.key = key
+
+    def update(self, val: int):
+        """
+        Add to the progress of the file and of the job.
+
+        Parameters
+        ----------
+        val : int
+            the number of units done.
+        """
+        self.aggregator.update(val, self.key)
+
+
+class ProgressAggregator:
+    """
+    Thread safe progress of a job hashed by several workers.
+
+    Workers add the units they finish with `update`, which only adds to a
+    few counters under a lock, so it takes the same time however many
+    files are being hashed.  The display is drawn at most
+    `ProgressBar.refresh_rate` times per second, as one bar for the whole
+    job followed by a line for each of the first `max_lines` files that
+    are being hashed.  When stdout is not a terminal, a summary line is
+    written every `ProgressBar.line_interval` seconds instead.
+
+    Library callers can poll `snapshot` from another thread, with or
+    without the display.
+
+    Parameters
+    ----------
+    total : int
+        the total amount to be accumulated.
+    title : str
+        the subject of the progress tracker.
+    max_lines : int
+        the most files shown below the overall bar.
+    display : bool
+        draw the progress to stdout.
+    unit : str
+        the text representation incremented.
+    """
+
+    def __init__(self,
+                 total: int = 0,
+                 title: str = "",
+                 max_lines: int = 4,
+                 display: bool = True,
+                 unit: str = "bytes"):
+        """
+        Construct the aggregator with nothing done.
+        """
+        self.lock = threading.Lock()
+        self.max_lines = max_lines
+        self.display = display
+        self.unit = unit
+        self.active = {}
+        self.lines = 0
+        self.bar = None
+        self.begin(total, title)
+
+    def begin(self, total: int, title: str):
+        """
+        Start tracking a job, once its total is known.
+
+        Parameters
+        ----------
+        total : int
+            the total amount to be accumulated.
+        title : str
+            the subject of the progress tracker.
+        """
+        with self.lock:
+            self.total = total
+            self.title = str(title)
+            self.state = 0
+            self.active.clear()
+            self.bar = ProgressBar.new(total, title, unit=self.unit)
+            self.started = self.bar.started
+
+    def start(self, key, total: int, name: str):
+        """
+        Show a file as being hashed.
+
+        Parameters
+        ----------
+        key : Hashable
+            identifies the file in `update` and `finish`.
+        total : int
+            size of the file.
+        name : str
+            name the file is shown as.
+        """
+        with self.lock:
+            self.active[key] = [str(name), 0, total]
+
+    def reporter(self, key) -> _Reporter:
+        """
+        Return a progress bar stand-in for a file started with `start`.
+
+        Parameters
+        ----------
+        key : Hashable
+            the key the file was started with.
+
+        Returns
+        -------
+        _Reporter
+            object whose `update` adds to the file and the job.
+        """
+        return _Reporter(self, key)
+
+    def update(self, val: int, key=None):
+        """
+        Add units done to the job, and to a file when a key is given.
+
+        Parameters
+        ----------
+        val : int
+            the number of units done.
+        key : Hashable
+            the key of the file the units belong to.
+        """
+        with self.lock:
+            self.state += val
+            if key is not None:
+                record = self.active.get(key)
+                if record is not None:
+                    record[1] += val
+            self._tick()
+
+    def finish(self, key, total: int):
+        """
+        Stop showing a file, adding the part of it not reported yet.
+
+        Files that were never started are added whole.
+
+        Parameters
+        ----------
+        key : Hashable
+            the key the file was started with.
+        total : int
+            size of the file.
+        """
+        with self.lock:
+            record = self.active.pop(key, None)
+            done = record[1] if record is not None else 0
+            self.state += max(total - done, 0)
+            self._tick()
+
+    def snapshot(self) -> ProgressSnapshot:
+        """
+        Return the progress of the job at this moment.
+
+        Returns
+        -------
+        ProgressSnapshot
+            the units done, the total, elapsed seconds, rate, estimated
+            seconds left and the progress of every active file.
+        """
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            rate = self.state / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if rate:
+                eta = max(self.total - self.state, 0) / rate
+            active = tuple(
+                FileProgress(*record) for record in self.active.values())
+            return ProgressSnapshot(self.state, self.total, elapsed, rate,
+                                    eta, active)
+
+    def close_out(self):
+        """
+        Draw the final state and leave the cursor below the display.
+        """
+        with self.lock:
+            bar = self.bar
+            if self.display and (bar.tty or bar.drawn != self.state):
+                self._draw(time.monotonic(), final=True)
+                sys.stdout.flush()
+
+    def _tick(self):
+        """
+        Draw the display if it is due, the caller holds the lock.
+        """
+        bar = self.bar
+        if not self.display:
+            return
+        now = time.monotonic()
+        if now >= bar.next_draw or (self.state >= self.total
+                                    and bar.drawn != self.state):
+            self._draw(now)
+
+    def _draw(self, now: float, final: bool = False):
+        """
+        Write the progress to stdout, the caller holds the lock.
+
+        Parameters
+        ----------
+        now : float
+            the current `time.monotonic` time.
+        final : bool
+            leave the cursor below the display instead of moving it back.
+        """
+        bar = self.bar
+        bar.state = self.state
+        bar.drawn = self.state
+        bar.next_draw = now + bar.interval
+        rate = bar.get_rate(now)
+        if not bar.tty:
+            percent = self.state / self.total * 100 if self.total else 100
+            sys.stdout.write(
+                f"{self.title} {percent:.0f}% "
+                f"{self.state / bar.scale:.02f}{bar.suffix} {rate} "
+                f"{len(self.active)} active\n")
+            return
+        lines = [f"{bar.prefix}{bar.get_progress()}{bar.suffix} {rate}"]
+        if not final:
+            lines.extend(self._file_lines())
+        # blank the lines left over from a longer display
+        count = max(len(lines), self.lines)
+        lines.extend([""] * (count - len(lines)))
+        output = "".join(line + "\x1b[K\n" for line in lines)
+        if final:
+            # back up to the line below the overall bar
+            if count > 1:
+                output += f"\x1b[{count - 1}A"
+            self.lines = 0
+        else:
+            output += f"\x1b[{count}A"
+            self.lines = count
+        sys.stdout.write(output)
+        sys.stdout.flush()
+
+    def _file_lines(self) -> list:
+        """
+        Return the lines of the files shown below the overall bar.
+
+        Returns
+        -------
+        list
+            a line for each of the first `max_lines` active files.
+        """
+        bar = self.bar
+        width = max(bar.start + bar.length, 20)
+        lines = []
+        for name, done, total in self.active.values():
+            if len(lines) == self.max_lines:
+                lines.append(f"  ... {len(self.active) - self.max_lines} "
+                             "more")
+                break
+            percent = done / total * 100 if total else 100
+            name = name if len(name) < width else "..." + name[3 - width:]
+            lines.append(f"  {name:<{width}} {percent:3.0f}% "
+                         f"{done / bar.scale:.02f}/{total / bar.scale:.02f} "
+                         f"{bar.unit}")
+        return lines
+
+
 class ProgMixin:
     """
     Progress bar mixin class.
@@ -219,6 +609,29 @@ class ProgMixin:
             """
             return value
 
+        @staticmethod
+        def start(*_):
+            """Do nothing, there are no active files to show."""
+
+        @staticmethod
+        def finish(*_):
+            """Do nothing, there is no progress to add."""
+
+        def reporter(self, _):
+            """
+            Return self, a stand-in for the progress of a single file.
+
+            Returns
+            -------
+            NoProg :
+                this object.
+            """
+            return self
+
+        @staticmethod
+        def close_out():
+            """Do nothing, nothing was drawn."""
+
     def get_progress_tracker(self, total: int, message: str):
         """Return the progress bar object for external management.
 
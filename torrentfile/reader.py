@@ -0,0 +1,1277 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+File readers that feed torrent content to the hashing classes.
+
+Readers hand out `memoryview` slices of their data so the hashers can pass
+them straight to `sha1`/`sha256` without copying them first.  The view
+returned by `read` is only valid until the next call to `read` or `close`.
+
+Classes
+-------
+- `BlockReader`
+    reads a file with `readinto` into a reusable buffer.
+- `DontNeedReader`
+    reads like `BlockReader` and drops what was read from the page cache.
+- `MMapReader`
+    reads a file through a read only memory map.
+- `ChunkReader`
+    base class for readers that hand out views of fixed size chunks.
+- `DirectReader`
+    reads a file with `O_DIRECT`, bypassing the page cache.
+- `ReadAhead`
+    reads a list of files on a background thread ahead of the hasher.
+- `ReadAheadReader`
+    reads one file of a `ReadAhead` pipeline.
+- `RangeReader`
+    reads ranges of a file at any offset, from several threads at once.
+- `DontNeedRangeReader`
+    reads ranges and drops them from the page cache.
+- `MMapRangeReader`
+    reads ranges through a read only memory map.
+- `DirectRangeReader`
+    reads ranges with `O_DIRECT`, bypassing the page cache.
+
+Functions
+---------
+- `open_reader`
+    returns the reader for an io mode, falling back to buffered reads.
+- `open_ranges`
+    returns the range reader for an io mode, used by worker pools.
+- `count_read`
+    adds the bytes read with an io mode to the job statistics.
+- `pread`
+    reads a range of a file descriptor without seeking.
+"""
+
+import os
+import mmap
+import time
+import queue
+import logging
+import threading
+
+from torrentfile import stats
+
+logger = logging.getLogger(__name__)
+
+IO_MODES = ["buffered", "mmap", "dontneed", "direct"]
+READ_AHEAD_DEPTH = 4
+DONTNEED_WINDOW = 2**23
+DIRECT_ALIGN = 4096
+
+
+def count_read(mode: str, amount: int):
+    """
+    Add amount to the bytes read by the job, in total and for an io mode.
+
+    Parameters
+    ----------
+    mode : str
+        the io mode of the reader.
+    amount : int
+        number of bytes read.
+    """
+    stats.add("bytes_read", amount)
+    stats.add("bytes_read_" + mode, amount)
+
+
+def allocate(size: int) -> bytearray:
+    """
+    Allocate a read buffer, counting it in the job statistics.
+
+    Parameters
+    ----------
+    size : int
+        size of the buffer.
+
+    Returns
+    -------
+    bytearray
+        the buffer.
+    """
+    stats.add("buffers")
+    stats.add("buffer_bytes", size)
+    return bytearray(size)
+
+
+if hasattr(os, "pread"):
+    _pread = os.pread
+else:  # pragma: nocover
+    _seek_lock = threading.Lock()
+
+    def _pread(fd: int, length: int, offset: int) -> bytes:
+        """
+        Emulate positional reads on platforms that lack `os.pread`.
+
+        Parameters
+        ----------
+        fd : int
+            open file descriptor
+        length : int
+            number of bytes to read
+        offset : int
+            position in file to begin reading from
+
+        Returns
+        -------
+        bytes
+            the data read from file
+        """
+        with _seek_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.read(fd, length)
+
+
+def pread(fd: int, length: int, offset: int) -> bytes:
+    """
+    Read `length` bytes from `fd` starting at `offset` without seeking.
+
+    Positional reads are safe to share a file descriptor between threads.
+
+    Parameters
+    ----------
+    fd : int
+        open file descriptor
+    length : int
+        number of bytes to read
+    offset : int
+        position in file to begin reading from
+
+    Returns
+    -------
+    bytes
+        the data read, shorter than length only at end of file.
+    """
+    start = time.perf_counter()
+    data = _pread(fd, length, offset)
+    if len(data) < length and data:
+        parts = [data]
+        read = len(data)
+        while read < length:
+            data = _pread(fd, length - read, offset + read)
+            if not data:
+                break
+            parts.append(data)
+            read += len(data)
+        data = b"".join(parts)
+    stats.add("read", time.perf_counter() - start)
+    return data
+
+
+def open_fd(path: str) -> int:
+    """
+    Open a read only file descriptor for path.
+
+    Parameters
+    ----------
+    path : str
+        path to file
+
+    Returns
+    -------
+    int
+        the file descriptor
+    """
+    return os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+
+
+def fadvise(fd: int, advice: str, offset: int = 0, length: int = 0):
+    """
+    Give the kernel a hint about how a file will be read.
+
+    Does nothing on platforms without `os.posix_fadvise`.
+
+    Parameters
+    ----------
+    fd : int
+        open file descriptor.
+    advice : str
+        name of the advice without prefix, e.g. "WILLNEED".
+    offset : int
+        start of the region the advice applies to.
+    length : int
+        size of the region, 0 means until the end of the file.
+    """
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, offset, length,
+                             getattr(os, "POSIX_FADV_" + advice))
+        except OSError:  # pragma: nocover
+            pass
+
+
+class BlockReader:
+    """
+    Read a file into a reusable buffer and return views of its contents.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    size : int
+        the largest amount that will be requested from `read`.
+    """
+
+    mode = "buffered"
+
+    def __init__(self, path: str, size: int):
+        """
+        Open the file and allocate the read buffer.
+        """
+        self.path = path
+        self.fd = open(path, "rb")
+        self.buffer = allocate(size)
+        self.view = memoryview(self.buffer)
+
+    def fileno(self) -> int:
+        """
+        Return the file descriptor being read.
+        """
+        return self.fd.fileno()
+
+    def readinto(self, buffer) -> int:
+        """
+        Read from the file into buffer.
+
+        Parameters
+        ----------
+        buffer : bytearray | memoryview
+            writable buffer to fill.
+
+        Returns
+        -------
+        int
+            number of bytes read, 0 at the end of the file.
+        """
+        start = time.perf_counter()
+        amount = self.fd.readinto(buffer)
+        stats.add("read", time.perf_counter() - start)
+        count_read(self.mode, amount)
+        return amount
+
+    def read(self, amount: int) -> memoryview:
+        """
+        Read up to `amount` bytes from the file.
+
+        Parameters
+        ----------
+        amount : int
+            maximum number of bytes to read.
+
+        Returns
+        -------
+        memoryview
+            view of the data read, empty at the end of the file.
+        """
+        if amount > len(self.buffer):
+            self.view.release()
+            self.buffer = allocate(amount)
+            self.view = memoryview(self.buffer)
+        size = self.readinto(self.view[:amount])
+        return self.view[:size]
+
+    def close(self):
+        """
+        Release the buffer and close the file.
+        """
+        self.view.release()
+        self.fd.close()
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager closing the reader.
+        """
+        self.close()
+
+
+class DontNeedReader(BlockReader):
+    """
+    Read a file into a reusable buffer and drop it from the page cache.
+
+    Every `DONTNEED_WINDOW` bytes the kernel is told the data behind the
+    read cursor will not be needed again, so hashing a large library does
+    not evict the page cache of other programs.  Pages that were already
+    cached before they were read are dropped as well.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    size : int
+        the largest amount that will be requested from `read`.
+    """
+
+    mode = "dontneed"
+
+    def __init__(self, path: str, size: int):
+        """
+        Open the file and allocate the read buffer.
+        """
+        super().__init__(path, size)
+        self.offset = 0
+        self.dropped = 0
+
+    def readinto(self, buffer) -> int:
+        """
+        Read from the file into buffer, dropping the pages behind it.
+
+        Parameters
+        ----------
+        buffer : bytearray | memoryview
+            writable buffer to fill.
+
+        Returns
+        -------
+        int
+            number of bytes read, 0 at the end of the file.
+        """
+        amount = super().readinto(buffer)
+        self.offset += amount
+        if not amount or self.offset - self.dropped >= DONTNEED_WINDOW:
+            self.drop()
+        return amount
+
+    def drop(self):
+        """
+        Drop the pages read since the last drop from the page cache.
+        """
+        if self.offset > self.dropped:
+            fadvise(self.fileno(), "DONTNEED", self.dropped,
+                    self.offset - self.dropped)
+            self.dropped = self.offset
+
+    def close(self):
+        """
+        Drop the remaining pages, release the buffer and close the file.
+        """
+        self.drop()
+        super().close()
+
+
+class MMapReader:
+    """
+    Read a file through a memory map without copying any of its data.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    size : int
+        unused, accepted for compatibility with `BlockReader`.
+    """
+
+    mode = "mmap"
+
+    def __init__(self, path: str, size: int = 0):
+        """
+        Open and memory map the file.
+
+        Raises
+        ------
+        ValueError
+            file is empty and cannot be mapped.
+        OSError
+            file cannot be mapped.
+        """
+        self.path = path
+        self.size = size
+        self.fd = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self.fd.close()
+            raise
+        self.view = memoryview(self.map)
+        self.position = 0
+        self.last = None
+
+    def fileno(self) -> int:
+        """
+        Return the file descriptor being read.
+        """
+        return self.fd.fileno()
+
+    def read(self, amount: int) -> memoryview:
+        """
+        Return a view of the next `amount` bytes of the file.
+
+        Parameters
+        ----------
+        amount : int
+            maximum number of bytes to read.
+
+        Returns
+        -------
+        memoryview
+            view of the data read, empty at the end of the file.
+        """
+        if self.last is not None:
+            self.last.release()
+        start = self.position
+        self.position = min(start + amount, len(self.view))
+        self.last = self.view[start:self.position]
+        count_read(self.mode, self.position - start)
+        return self.last
+
+    def readinto(self, buffer) -> int:
+        """
+        Copy the next part of the file into buffer.
+
+        Parameters
+        ----------
+        buffer : bytearray | memoryview
+            writable buffer to fill.
+
+        Returns
+        -------
+        int
+            number of bytes copied, 0 at the end of the file.
+        """
+        view = self.read(len(buffer))
+        amount = len(view)
+        buffer[:amount] = view
+        return amount
+
+    def close(self):
+        """
+        Release every view, unmap and close the file.
+        """
+        if self.last is not None:
+            self.last.release()
+        self.view.release()
+        self.map.close()
+        self.fd.close()
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager closing the reader.
+        """
+        self.close()
+
+
+class ChunkReader:
+    """
+    Base class for readers that hand out views of fixed size chunks.
+
+    Reads that fall inside a single chunk return a view of the chunk,
+    reads spanning chunks are copied into a separate buffer.  Subclasses
+    implement `next_chunk` and may override `release_chunk`.
+    """
+
+    mode = None
+
+    def __init__(self):
+        """
+        Prepare to read the first chunk.
+        """
+        self.buffer = None
+        self.amount = 0
+        self.position = 0
+        self.eof = False
+        self.staging = bytearray()
+        self.last = None
+
+    def next_chunk(self) -> tuple:
+        """
+        Return the next chunk of the file.
+
+        Returns
+        -------
+        tuple
+            the buffer and the number of bytes in it, (None, 0) at the end
+            of the file.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def release_chunk(self, buffer):
+        """
+        Called with each chunk once every read from it has been returned.
+
+        Parameters
+        ----------
+        buffer : bytearray | memoryview
+            the chunk that is no longer needed.
+        """
+
+    def _advance(self):
+        """
+        Release the current chunk and get the next one.
+        """
+        if self.buffer is not None:
+            self.release_chunk(self.buffer)
+        self.buffer, self.amount = self.next_chunk()
+        self.position = 0
+        self.eof = self.buffer is None
+
+    def read(self, amount: int) -> memoryview:
+        """
+        Read up to `amount` bytes from the file.
+
+        Parameters
+        ----------
+        amount : int
+            maximum number of bytes to read.
+
+        Returns
+        -------
+        memoryview
+            view of the data read, empty at the end of the file.
+        """
+        if self.last is not None:
+            self.last.release()
+        if not self.eof and self.position == self.amount:
+            self._advance()
+        if self.eof:
+            return memoryview(b"")
+        start = self.position
+        if self.amount - start >= amount:
+            self.position += amount
+            self.last = memoryview(self.buffer)[start:self.position]
+            return self.last
+        if len(self.staging) < amount:
+            self.staging = allocate(amount)
+        filled = 0
+        while filled < amount and not self.eof:
+            take = min(self.amount - self.position, amount - filled)
+            end = self.position + take
+            self.staging[filled:filled + take] = self.buffer[self.position:end]
+            filled += take
+            self.position = end
+            if filled < amount:
+                self._advance()
+        self.last = memoryview(self.staging)[:filled]
+        return self.last
+
+    def readinto(self, buffer) -> int:
+        """
+        Copy the next part of the file into buffer.
+
+        Parameters
+        ----------
+        buffer : bytearray | memoryview
+            writable buffer to fill.
+
+        Returns
+        -------
+        int
+            number of bytes copied, 0 at the end of the file.
+        """
+        view = self.read(len(buffer))
+        amount = len(view)
+        buffer[:amount] = view
+        return amount
+
+    def close(self):
+        """
+        Release the last view returned by `read`.
+        """
+        if self.last is not None:
+            self.last.release()
+            self.last = None
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager closing the reader.
+        """
+        self.close()
+
+
+class DirectReader(ChunkReader):
+    """
+    Read a file with `O_DIRECT` so its contents bypass the page cache.
+
+    Direct reads need a buffer, offset and length aligned to the block
+    size of the device, so the file is read in aligned chunks into a page
+    aligned anonymous memory map.  The final chunk is usually shorter than
+    the buffer; filesystems that refuse the unaligned tail have it read
+    through a regular file object instead.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    size : int
+        size of each chunk, rounded up to a multiple of `DIRECT_ALIGN`.
+
+    Raises
+    ------
+    OSError
+        the platform or filesystem does not support `O_DIRECT`.
+    """
+
+    mode = "direct"
+
+    def __init__(self, path: str, size: int):
+        """
+        Open the file for direct reads and allocate the aligned buffer.
+        """
+        super().__init__()
+        if not hasattr(os, "O_DIRECT"):  # pragma: nocover
+            raise OSError("O_DIRECT is not supported on this platform")
+        self.path = path
+        size = max(-(-size // DIRECT_ALIGN) * DIRECT_ALIGN, DIRECT_ALIGN)
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+        self.fd = open(fd, "rb", buffering=0)  # pylint: disable=R1732
+        self.map = mmap.mmap(-1, size)
+        stats.add("buffers")
+        stats.add("buffer_bytes", size)
+        self.chunk = memoryview(self.map)
+        self.offset = 0
+
+    def fileno(self) -> int:
+        """
+        Return the file descriptor being read.
+        """
+        return self.fd.fileno()
+
+    def _read_tail(self) -> int:
+        """
+        Read the rest of the file without `O_DIRECT`.
+
+        Returns
+        -------
+        int
+            number of bytes read.
+        """
+        with open(self.path, "rb") as tail:
+            tail.seek(self.offset)
+            return tail.readinto(self.chunk)
+
+    def next_chunk(self) -> tuple:
+        """
+        Read the next aligned chunk of the file.
+
+        Returns
+        -------
+        tuple
+            the buffer and the number of bytes in it, (None, 0) at the end
+            of the file.
+        """
+        start = time.perf_counter()
+        try:
+            amount = self.fd.readinto(self.chunk)
+        except OSError:
+            amount = self._read_tail()
+        stats.add("read", time.perf_counter() - start)
+        if not amount:
+            return None, 0
+        self.offset += amount
+        count_read(self.mode, amount)
+        return self.chunk, amount
+
+    def close(self):
+        """
+        Release every view, free the buffer and close the file.
+        """
+        super().close()
+        self.chunk.release()
+        self.map.close()
+        self.fd.close()
+
+
+class ReadAhead:
+    """
+    Read a list of files on a background thread ahead of the hasher.
+
+    Chunks are read into a bounded pool of reusable buffers and queued for
+    the consumer, so the disk keeps reading while the previous chunks are
+    hashed.  The file after the one being read is opened early and, when
+    reading through the page cache, the kernel is asked to start caching
+    it.  Files have to be opened with `open` in the order they appear in
+    paths, any files skipped over are discarded.
+
+    Parameters
+    ----------
+    paths : list
+        paths of the files that will be read, in order.
+    size : int
+        size of each buffer.
+    depth : int
+        number of buffers, the most chunks that are read ahead.
+    io_mode : str
+        one of `IO_MODES`, used to read the files on the background thread.
+    """
+
+    def __init__(self,
+                 paths: list,
+                 size: int,
+                 depth: int = READ_AHEAD_DEPTH,
+                 io_mode: str = "buffered"):
+        """
+        Allocate the buffers and start the reading thread.
+        """
+        self.paths = list(paths)
+        self.size = size
+        self.io_mode = io_mode
+        self.free = queue.Queue()
+        for _ in range(max(depth, 1)):
+            self.free.put(allocate(size))
+        self.ready = queue.Queue()
+        self.index = -1
+        self.cancelled = -1
+        self.closed = False
+        self.thread = threading.Thread(target=stats.bind(self._produce),
+                                       daemon=True)
+        self.thread.start()
+
+    def _open(self, path: str):
+        """
+        Open a reader for path and hint that it will be read sequentially.
+
+        Returns
+        -------
+        BlockReader | DontNeedReader | MMapReader | DirectReader | OSError
+            the opened reader, or the error raised opening it.
+        """
+        try:
+            reader = open_reader(path, self.size, self.io_mode)
+        except OSError as err:
+            return err
+        if reader.mode in ("buffered", "mmap"):
+            fadvise(reader.fileno(), "SEQUENTIAL")
+            fadvise(reader.fileno(), "WILLNEED")
+        return reader
+
+    def _produce(self):
+        """
+        Read every file into free buffers until closed.
+
+        Each file is followed by a `(index, None, 0)` marker, or by the
+        error raised opening it.
+        """
+        upcoming = {}
+        try:
+            for index, path in enumerate(self.paths):
+                if self.closed:
+                    break
+                reader = upcoming.pop(index, None) or self._open(path)
+                if index + 1 < len(self.paths) and not self.closed:
+                    upcoming[index + 1] = self._open(self.paths[index + 1])
+                if isinstance(reader, OSError):
+                    self.ready.put((index, reader, 0))
+                    continue
+                with reader:
+                    while not self.closed and self.cancelled < index:
+                        buffer = self.free.get()
+                        if buffer is None:
+                            return
+                        amount = reader.readinto(buffer)
+                        if not amount:
+                            self.free.put(buffer)
+                            break
+                        self.ready.put((index, buffer, amount))
+                self.ready.put((index, None, 0))
+        except OSError as err:  # pragma: nocover
+            self.ready.put((index, err, 0))
+        finally:
+            for reader in upcoming.values():
+                if not isinstance(reader, OSError):
+                    reader.close()
+
+    def next_chunk(self, index: int) -> tuple:
+        """
+        Return the next chunk read from the file at index.
+
+        Chunks left over from earlier files are returned to the pool.
+
+        Parameters
+        ----------
+        index : int
+            position of the file in paths.
+
+        Returns
+        -------
+        tuple
+            the buffer and the number of bytes in it, (None, 0) at the end
+            of the file.
+
+        Raises
+        ------
+        OSError
+            the file could not be read.
+        """
+        while True:
+            current, buffer, amount = self.ready.get()
+            if current < index:
+                if isinstance(buffer, bytearray):
+                    self.free.put(buffer)
+                continue
+            if isinstance(buffer, OSError):
+                raise buffer
+            return buffer, amount
+
+    def open(self, path: str) -> "ReadAheadReader":
+        """
+        Return a reader for the next file to read.
+
+        Parameters
+        ----------
+        path : str
+            a path in paths after the last one opened.
+
+        Returns
+        -------
+        ReadAheadReader
+            reader for the file.
+        """
+        index = self.paths.index(path, self.index + 1)
+        # stop reading files that were skipped over
+        self.cancelled = max(self.cancelled, index - 1)
+        self.index = index
+        return ReadAheadReader(self, index)
+
+    def close(self):
+        """
+        Stop the reading thread.
+        """
+        self.closed = True
+        self.free.put(None)
+        self.thread.join()
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager stopping the reading thread.
+        """
+        self.close()
+
+
+class ReadAheadReader(ChunkReader):
+    """
+    Read one file of a `ReadAhead` pipeline.
+
+    Parameters
+    ----------
+    pipeline : ReadAhead
+        the pipeline reading the file.
+    index : int
+        position of the file in the pipeline's paths.
+    owner : bool
+        close the pipeline when the reader is closed.
+    """
+
+    mode = "readahead"
+
+    def __init__(self, pipeline: ReadAhead, index: int, owner: bool = False):
+        """
+        Prepare to read chunks from the pipeline.
+        """
+        super().__init__()
+        self.pipeline = pipeline
+        self.index = index
+        self.owner = owner
+        self.path = pipeline.paths[index]
+
+    def next_chunk(self) -> tuple:
+        """
+        Wait for the next chunk of the file from the pipeline.
+
+        Returns
+        -------
+        tuple
+            the buffer and the number of bytes in it, (None, 0) at the end
+            of the file.
+        """
+        return self.pipeline.next_chunk(self.index)
+
+    def release_chunk(self, buffer: bytearray):
+        """
+        Return a chunk to the pipeline's pool of free buffers.
+
+        Parameters
+        ----------
+        buffer : bytearray
+            the chunk that is no longer needed.
+        """
+        self.pipeline.free.put(buffer)
+
+    def close(self):
+        """
+        Return the current chunk and stop reading the rest of the file.
+        """
+        super().close()
+        if not self.eof:
+            self.pipeline.cancelled = max(self.pipeline.cancelled, self.index)
+            if self.buffer is not None:
+                self.release_chunk(self.buffer)
+            self.buffer, self.eof = None, True
+        if self.owner:
+            self.pipeline.close()
+
+
+class RangeReader:
+    """
+    Read ranges of a file at any offset, from several threads at once.
+
+    Worker pools hash pieces out of order, so they read each range with
+    positional reads from a reader shared between the workers.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    """
+
+    mode = "buffered"
+
+    def __init__(self, path: str):
+        """
+        Open the file.
+        """
+        self.path = path
+        self.fd = open_fd(path)
+
+    def pread(self, length: int, offset: int) -> bytes:
+        """
+        Read `length` bytes starting at `offset`.
+
+        Parameters
+        ----------
+        length : int
+            number of bytes to read.
+        offset : int
+            position in the file to begin reading from.
+
+        Returns
+        -------
+        bytes
+            the data read, shorter than length only at end of file.
+        """
+        data = pread(self.fd, length, offset)
+        count_read(self.mode, len(data))
+        return data
+
+    def close(self):
+        """
+        Close the file.
+        """
+        os.close(self.fd)
+
+    def __enter__(self):
+        """
+        Enter context manager.
+        """
+        return self
+
+    def __exit__(self, *_):
+        """
+        Exit context manager closing the reader.
+        """
+        self.close()
+
+
+class DontNeedRangeReader(RangeReader):
+    """
+    Read ranges of a file and drop them from the page cache.
+
+    The pages a range touches are dropped after it is read, the pages it
+    shares with the neighbouring ranges included, so none are left behind
+    when the ranges are read by different threads.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    """
+
+    mode = "dontneed"
+
+    def pread(self, length: int, offset: int) -> bytes:
+        """
+        Read `length` bytes starting at `offset` and drop them.
+
+        Parameters
+        ----------
+        length : int
+            number of bytes to read.
+        offset : int
+            position in the file to begin reading from.
+
+        Returns
+        -------
+        bytes
+            the data read, shorter than length only at end of file.
+        """
+        data = super().pread(length, offset)
+        start = offset - offset % mmap.PAGESIZE
+        stop = offset + len(data)
+        stop += -stop % mmap.PAGESIZE
+        fadvise(self.fd, "DONTNEED", start, stop - start)
+        return data
+
+
+class MMapRangeReader(RangeReader):
+    """
+    Read ranges of a file through a read only memory map.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+
+    Raises
+    ------
+    ValueError
+        file is empty and cannot be mapped.
+    OSError
+        file cannot be mapped.
+    """
+
+    mode = "mmap"
+
+    def __init__(self, path: str):
+        """
+        Open and memory map the file.
+        """
+        super().__init__(path)
+        try:
+            self.map = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            os.close(self.fd)
+            raise
+
+    def pread(self, length: int, offset: int) -> bytes:
+        """
+        Copy `length` bytes starting at `offset` out of the map.
+
+        Parameters
+        ----------
+        length : int
+            number of bytes to read.
+        offset : int
+            position in the file to begin reading from.
+
+        Returns
+        -------
+        bytes
+            the data read, shorter than length only at end of file.
+        """
+        start = time.perf_counter()
+        data = self.map[offset:offset + length]
+        stats.add("read", time.perf_counter() - start)
+        count_read(self.mode, len(data))
+        return data
+
+    def close(self):
+        """
+        Unmap and close the file.
+        """
+        self.map.close()
+        super().close()
+
+
+class DirectRangeReader(RangeReader):
+    """
+    Read ranges of a file with `O_DIRECT` so they bypass the page cache.
+
+    Each range is widened to `DIRECT_ALIGN` boundaries and read into a
+    page aligned memory map kept for each thread.  Filesystems that refuse
+    the unaligned tail of the file have it read through a regular file
+    descriptor, which is then dropped from the page cache.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+
+    Raises
+    ------
+    OSError
+        the platform or filesystem does not support `O_DIRECT`.
+    """
+
+    mode = "direct"
+
+    def __init__(self, path: str):
+        """
+        Open the file for direct and for regular reads.
+        """
+        if not hasattr(os, "O_DIRECT") or not hasattr(
+                os, "preadv"):  # pragma: nocover
+            raise OSError("O_DIRECT is not supported on this platform")
+        super().__init__(path)
+        try:
+            self.direct = os.open(path, os.O_RDONLY | os.O_DIRECT)
+        except OSError:
+            os.close(self.fd)
+            raise
+        self.local = threading.local()
+
+    def _buffer(self, size: int) -> mmap.mmap:
+        """
+        Return this thread's aligned buffer, at least size bytes long.
+        """
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None or len(buffer) < size:
+            if buffer is not None:
+                buffer.close()
+            buffer = mmap.mmap(-1, size)
+            stats.add("buffers")
+            stats.add("buffer_bytes", size)
+            self.local.buffer = buffer
+        return buffer
+
+    def pread(self, length: int, offset: int) -> bytes:
+        """
+        Read `length` bytes starting at `offset` without caching them.
+
+        Parameters
+        ----------
+        length : int
+            number of bytes to read.
+        offset : int
+            position in the file to begin reading from.
+
+        Returns
+        -------
+        bytes
+            the data read, shorter than length only at end of file.
+        """
+        start = offset - offset % DIRECT_ALIGN
+        stop = offset + length
+        stop += -stop % DIRECT_ALIGN
+        buffer = self._buffer(stop - start)
+        began = time.perf_counter()
+        try:
+            with memoryview(buffer) as view:
+                amount = os.preadv(self.direct, [view[:stop - start]], start)
+                skip = offset - start
+                data = bytes(view[skip:min(amount, skip + length)])
+            stats.add("read", time.perf_counter() - began)
+        except OSError:
+            data = pread(self.fd, length, offset)
+            fadvise(self.fd, "DONTNEED", start, stop - start)
+        count_read(self.mode, len(data))
+        return data
+
+    def close(self):
+        """
+        Close both file descriptors.
+        """
+        os.close(self.direct)
+        super().close()
+
+
+def open_reader(path: str,
+                size: int,
+                io_mode: str = "buffered",
+                read_ahead: int = 0):
+    """
+    Open a reader for path using the requested io mode.
+
+    Files that cannot be memory mapped, such as empty files and special
+    files, and files on filesystems without `O_DIRECT` support are read
+    with a `BlockReader` instead.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    size : int
+        the largest amount that will be requested from `read`.
+    io_mode : str
+        one of `IO_MODES`.
+    read_ahead : int
+        number of chunks to read ahead on a background thread, 0 reads
+        on the calling thread.
+
+    Returns
+    -------
+    BlockReader | DontNeedReader | MMapReader | DirectReader | ReadAheadReader
+        the reader object.
+    """
+    if read_ahead:
+        reader = ReadAhead([path], size, read_ahead, io_mode).open(path)
+        reader.owner = True
+        return reader
+    if io_mode == "dontneed":
+        return DontNeedReader(path, size)
+    if io_mode == "mmap":
+        try:
+            return MMapReader(path, size)
+        except (ValueError, OSError):
+            logger.debug("Unable to memory map %s, using buffered reads",
+                         str(path))
+    if io_mode == "direct":
+        try:
+            return DirectReader(path, size)
+        except OSError:
+            logger.debug("Unable to open %s for direct reads, using "
+                         "buffered reads", str(path))
+    return BlockReader(path, size)
+
+
+def open_ranges(path: str, io_mode: str = "buffered") -> RangeReader:
+    """
+    Open a range reader for path using the requested io mode.
+
+    Files that cannot be memory mapped and files on filesystems without
+    `O_DIRECT` support are read with a `RangeReader` instead.
+
+    Parameters
+    ----------
+    path : str
+        path to file.
+    io_mode : str
+        one of `IO_MODES`.
+
+    Returns
+    -------
+    RangeReader | DontNeedRangeReader | MMapRangeReader | DirectRangeReader
+        the reader object.
+    """
+    if io_mode == "dontneed":
+        return DontNeedRangeReader(path)
+    if io_mode == "mmap":
+        try:
+            return MMapRangeReader(path)
+        except (ValueError, OSError):
+            logger.debug("Unable to memory map %s, using buffered reads",
+                         str(path))
+    if io_mode == "direct":
+        try:
+            return DirectRangeReader(path)
+        except OSError:
+            logger.debug("Unable to open %s for direct reads, using "
+                         "buffered reads", str(path))
+    return RangeReader(path)
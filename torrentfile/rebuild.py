@@ -31,8 +31,10 @@ from pathlib import Path
 
 import pyben
 
+from torrentfile import stats
 from torrentfile.hasher import HasherV2
 from torrentfile.mixins import CbMixin, ProgMixin
+from torrentfile.reader import count_read
 from torrentfile.utils import copypath
 
 logger = logging.getLogger(__name__)
@@ -92,13 +94,14 @@ class PathNode:
         bytes
             part of the file's contents
         """
-        with open(path, "rb") as fd:
+        with stats.Timer("read"), open(path, "rb") as fd:
             if self.start:
                 fd.seek(self.start)
             if self.stop != -1:
                 partial = fd.read(self.stop - self.start)
             else:
                 partial = fd.read()
+        count_read("buffered", len(partial))
         return partial
 
     def __len__(self) -> int:
@@ -164,7 +167,8 @@ class PieceNode:
             success state
         """
         if not paths:
-            piece_hash = sha1(data).digest()  # nosec
+            with stats.Timer("hash"):
+                piece_hash = sha1(data).digest()  # nosec
             return piece_hash == self.piece
         pathnode = paths[0]
         filename = pathnode.filename
@@ -177,7 +181,8 @@ class PieceNode:
             val = self._find_matches(filemap, paths[1:], data + partial)
             if val:
                 dest_path = os.path.join(self.dest, pathnode.full)
-                copypath(loc, dest_path)
+                with stats.Timer("write"):
+                    copypath(loc, dest_path)
             return val
         return False
 
@@ -235,7 +240,8 @@ class Metadata(CbMixin, ProgMixin):
         """
         Decode and extract information for the .torrent file.
         """
-        meta = pyben.load(self.path)
+        with stats.Timer("encode"):
+            meta = pyben.load(self.path)
         info = meta["info"]
         self.piece_length = info["piece length"]
         self.name = info["name"]
@@ -383,7 +389,8 @@ class Metadata(CbMixin, ProgMixin):
                     hasher = HasherV2(path, self.piece_length, True)
                     if entry["root"] == hasher.root:
                         dest_path = os.path.join(dest, entry["full"])
-                        copypath(entry["path"], dest_path)
+                        with stats.Timer("write"):
+                            copypath(entry["path"], dest_path)
                         self._update()
                         self.cb(path, dest_path, self.num_pieces)
                         break
@@ -428,8 +435,14 @@ class Assembler(CbMixin):
     - torrent metafile or directory containing multiple meta files
     - directory containing the contents of meta file
     - directory where torrents will be re-assembled
+
+    Attributes
+    ----------
+    stats : Stats
+        time spent in each stage and resources used rebuilding.
     """
 
+    @stats.collect_stats
     def __init__(self, metafiles: list, contents: list, dest: str):
         """
         Reassemble given torrent file from given cli arguments.
@@ -460,7 +473,8 @@ class Assembler(CbMixin):
         filenames = set()
         for meta in self.metafiles:
             filenames |= meta.filenames
-        self.filemap = _index_contents(self.contents, filenames)
+        with stats.Timer("walk"):
+            self.filemap = _index_contents(self.contents, filenames)
 
     def _callback(self, filename: str, dest: str, num_pieces: int):
         """
@@ -481,6 +495,7 @@ class Assembler(CbMixin):
             self._lastlog = message
             logger.debug(message)
 
+    @stats.collect_stats
     def assemble_torrents(self):
         """
         Assemble collection of torrent files into original structure.
@@ -490,10 +505,13 @@ class Assembler(CbMixin):
         int
             number of files copied
         """
+        copied = self.counter
         for metafile in self.metafiles:
             logger.info("#%s Searching contents for %s", self.counter,
                         metafile.name)
             self.rebuild(metafile)
+            self.stats.count("pieces", metafile.num_pieces)
+        self.stats.count("files", self.counter - copied)
         return self.counter
 
     def rebuild(self, metafile: Metadata) -> None:
@@ -28,13 +28,14 @@ at the end for the torrentfile as a whole.
 
 import os
 import logging
-from hashlib import sha1, sha256  # nosec
 from pathlib import Path
 
 import pyben
 
-from torrentfile.hasher import FileHasher
+from torrentfile.hasher import FileHasher, get_backend
 from torrentfile.mixins import ProgMixin
+from torrentfile.reader import ReadAhead, open_reader
+from torrentfile.stats import Timer, collect_stats
 from torrentfile.utils import ArgumentError, MissingPathError
 
 SHA1 = 20
@@ -56,6 +57,17 @@ class Checker:
         Path to ".torrent" file.
     path : str
         Path where the content is located in filesystem.
+    hash_backend : str
+        name of the hash backend used for hashing content.
+    read_ahead : int
+        number of pieces read ahead on a background thread.
+    io_mode : str
+        how content is read from disk, one of `reader.IO_MODES`.
+
+    Attributes
+    ----------
+    stats : Stats
+        time spent in each stage and resources used checking the content.
 
     Example
     -------
@@ -68,7 +80,13 @@ class Checker:
 
     _hook = None
 
-    def __init__(self, metafile: str, path: str):
+    @collect_stats
+    def __init__(self,
+                 metafile: str,
+                 path: str,
+                 hash_backend: str = None,
+                 read_ahead: int = 0,
+                 io_mode: str = "buffered"):
         """
         Validate data against hashes contained in .torrent file.
 
@@ -78,6 +96,12 @@ class Checker:
             path to .torrent file
         path : str
             path to content or contents parent directory.
+        hash_backend : str
+            name of the hash backend used for hashing content.
+        read_ahead : int
+            number of pieces read ahead on a background thread.
+        io_mode : str
+            how content is read from disk, one of `reader.IO_MODES`.
         """
         if not os.path.exists(metafile):
             raise FileNotFoundError
@@ -87,11 +111,15 @@ class Checker:
         self.last_log = None
         self.log_msg("Checking: %s, %s", metafile, path)
         self.metafile = metafile
+        self.hash_backend = get_backend(hash_backend).name
+        self.read_ahead = read_ahead
+        self.io_mode = io_mode or "buffered"
         self.total = 0
         self.paths = []
         self.fileinfo = {}
         print("Extracting data from torrent file...")
-        self.meta = pyben.load(metafile)
+        with Timer("encode"):
+            self.meta = pyben.load(metafile)
         self.info = self.meta["info"]
         self.name = self.info["name"]
         self.piece_length = self.info["piece length"]
@@ -104,8 +132,10 @@ class Checker:
         else:
             self.meta_version = 1
 
-        self.root = self.find_root(path)
-        self.check_paths()
+        with Timer("walk"):
+            self.root = self.find_root(path)
+            self.check_paths()
+        self.stats.count("files", len(self.paths))
 
     @classmethod
     def register_callback(cls, hook):
@@ -132,6 +162,7 @@ class Checker:
             return FeedChecker
         return HashChecker
 
+    @collect_stats
     def results(self):
         """
         Generate result percentage and store for future calls.
@@ -295,6 +326,7 @@ class Checker:
         matched = consumed = 0
         checker = self.piece_checker()
         for chunk, piece, path, size in checker(self):
+            self.stats.count("pieces", 1)
             consumed += size
             matching = 0
             if chunk == piece:
@@ -329,9 +361,13 @@ class FeedChecker(ProgMixin):
         Generate hashes of piece length data from filelist contents.
         """
         self.piece_length = checker.piece_length
+        self.backend = get_backend(checker.hash_backend)
         self.paths = checker.paths
         self.pieces = checker.info["pieces"]
         self.fileinfo = checker.fileinfo
+        self.read_ahead = checker.read_ahead
+        self.io_mode = checker.io_mode
+        self.pipeline = None
         self.piece_map = {}
         self.index = 0
         self.piece_count = 0
@@ -350,10 +386,13 @@ class FeedChecker(ProgMixin):
         """
         try:
             partial = next(self.it)
+            chunck = self.backend.piece_hash(partial).digest()
         except StopIteration as itererror:
             raise StopIteration from itererror
+        except BaseException:
+            self.close()
+            raise
 
-        chunck = sha1(partial).digest()  # nosec
         start = self.piece_count * SHA1
         end = start + SHA1
         piece = self.pieces[start:end]
@@ -361,6 +400,15 @@ class FeedChecker(ProgMixin):
         path = self.paths[self.index]
         return chunck, piece, path, len(partial)
 
+    def close(self):
+        """
+        Stop iterating and close the read ahead pipeline.
+        """
+        if self.it is not None:
+            self.it.close()
+        if self.pipeline is not None:
+            self.pipeline.close()
+
     def iter_pieces(self):
         """
         Iterate through, and hash pieces of torrent contents.
@@ -371,26 +419,51 @@ class FeedChecker(ProgMixin):
             hash digest for block of torrent data.
         """
         partial = bytearray()
-        for i, path in enumerate(self.paths):
-            total = self.fileinfo[i]["length"]
-            self.progbar = self.get_progress_tracker(total, path)
-            self.index = i
-            if os.path.exists(path):
-                for piece in self.extract(path, partial):
-                    if (len(piece) == self.piece_length) or (i + 1 == len(
-                            self.paths)):
-                        yield piece
-                    else:
-                        partial = piece
+        if self.read_ahead:
+            self.pipeline = ReadAhead(self.paths, self.piece_length,
+                                      self.read_ahead, self.io_mode)
+        try:
+            for i, path in enumerate(self.paths):
+                total = self.fileinfo[i]["length"]
+                self.progbar = self.get_progress_tracker(total, path)
+                self.index = i
+                if os.path.exists(path):
+                    for piece in self.extract(path, partial):
+                        if (len(piece) == self.piece_length) or (i + 1 == len(
+                                self.paths)):
+                            yield piece
+                        else:
+                            partial = piece
+
+                else:
+                    length = self.fileinfo[i]["length"]
+                    for pad in self._gen_padding(partial, length):
+                        if len(pad) == self.piece_length:
+                            yield pad
+                        else:
+                            partial = pad
+                self.progbar.close_out()
+        finally:
+            if self.pipeline is not None:
+                self.pipeline.close()
+
+    def open(self, path: str):
+        """
+        Open a reader for the next file to check.
 
-            else:
-                length = self.fileinfo[i]["length"]
-                for pad in self._gen_padding(partial, length):
-                    if len(pad) == self.piece_length:
-                        yield pad
-                    else:
-                        partial = pad
-            self.progbar.close_out()
+        Parameters
+        ----------
+        path : str
+            path to content.
+
+        Returns
+        -------
+        BlockReader | DontNeedReader | MMapReader | DirectReader
+            the reader object, or a ReadAheadReader reading ahead.
+        """
+        if self.pipeline is not None:
+            return self.pipeline.open(path)
+        return open_reader(path, self.piece_length, self.io_mode)
 
     def extract(self, path: str, partial: bytearray) -> bytearray:
         """
@@ -413,13 +486,13 @@ class FeedChecker(ProgMixin):
         partial = bytearray() if len(partial) == self.piece_length else partial
         if path not in self.paths:  # pragma: no cover
             raise MissingPathError(path)
-        with open(path, "rb") as current:
+        with self.open(path) as current:
             while True:
                 bitlength = self.piece_length - len(partial)
-                part = bytearray(bitlength)
-                amount = current.readinto(part)
+                part = current.read(bitlength)
+                amount = len(part)
                 read += amount
-                partial.extend(part[:amount])
+                partial.extend(part)
                 if amount < bitlength:
                     if amount > 0 and read == length:
                         self.progbar.update(amount)
@@ -478,6 +551,7 @@ class HashChecker(ProgMixin):
         Construct a HybridChecker instance.
         """
         self.checker = checker
+        self.backend = get_backend(checker.hash_backend)
         self.paths = checker.paths
         self.piece_length = checker.piece_length
         self.fileinfo = checker.fileinfo
@@ -514,9 +588,11 @@ class HashChecker(ProgMixin):
             the total size of the mock file generating padding for.
         piece_length : int
             the block size that each hash represents.
+        backend : HashlibBackend
+            the hash backend, defaults to the one returned by `get_backend`.
         """
 
-        def __init__(self, length, piece_length):
+        def __init__(self, length, piece_length, backend=None):
             """
             Construct padding class to Mock missing or incomplete files.
 
@@ -526,10 +602,13 @@ class HashChecker(ProgMixin):
                 size of the file
             piece_length : int
                 the piece length for each iteration.
+            backend : HashlibBackend
+                the hash backend.
             """
             self.length = length
             self.piece_length = piece_length
-            self.pad = sha256(bytearray(piece_length)).digest()
+            self.backend = backend or get_backend()
+            self.pad = self.backend.leaf_hash(bytearray(piece_length))
 
         def __iter__(self):
             """
@@ -554,7 +633,7 @@ class HashChecker(ProgMixin):
                 self.length -= self.piece_length
                 return self.pad
             if self.length > 0:
-                pad = sha256(bytearray(self.length)).digest()
+                pad = self.backend.leaf_hash(bytearray(self.length))
                 self.length -= self.length
                 return pad
             raise StopIteration
@@ -586,9 +665,13 @@ class HashChecker(ProgMixin):
                     self.piece_length,
                     progress=2,
                     progress_bar=self.progbar,
+                    io_mode=self.checker.io_mode,
+                    read_ahead=self.checker.read_ahead,
+                    backend=self.backend.name,
                 )
             else:
-                self.hasher = self.Padder(self.length, self.piece_length)
+                self.hasher = self.Padder(self.length, self.piece_length,
+                                          self.backend)
             return True
         if self.index >= len(self.paths):
             del self.current
@@ -617,7 +700,8 @@ class HashChecker(ProgMixin):
             return layer, piece, self.current, size
         except StopIteration as err:
             if self.length > 0 and self.count * SHA256 < len(self.pieces):
-                self.hasher = self.Padder(self.length, self.piece_length)
+                self.hasher = self.Padder(self.length, self.piece_length,
+                                          self.backend)
                 piece, size = self.advance()
                 layer = next(self.hasher)
                 self.progbar.update(0)
@@ -0,0 +1,380 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Per stage timing and resource statistics of torrent jobs.
+
+The readers, hash backends and torrent classes add the time they spend in
+each stage and the amount of work they do to the `Stats` object that is
+collecting in the current thread, so jobs running at the same time in
+different threads each count only their own work.  Nothing is counted
+while no `Stats` object is collecting, so it costs nothing otherwise.
+Threads a job starts, like read ahead and worker threads, count towards
+it once they are attached with `attach` or `bind`.
+
+Stage times are summed over every thread, so with read ahead or worker
+threads they can add up to more than the elapsed time.  Work done in
+worker processes is not counted.
+
+Classes
+-------
+- `Stats`
+    statistics of a single job.
+- `Timer`
+    context manager adding the time spent in a block to a stage.
+
+Functions
+---------
+- `add`
+    add an amount to a counter.
+- `attach`
+    count the work of the calling thread towards a job.
+- `bind`
+    wrap a function to count its work towards the current job.
+- `collect_stats`
+    decorates methods whose work is collected by the object's `stats`.
+- `peak_rss`
+    returns the peak resident set size of the process.
+"""
+
+import sys
+import json
+import time
+import functools
+import threading
+import contextvars
+
+try:
+    import resource
+except ImportError:  # pragma: nocover
+    resource = None
+
+STAGES = ["walk", "read", "hash", "merkle", "encode", "write"]
+COUNTERS = [
+    "bytes_read",
+    "bytes_read_buffered",
+    "bytes_read_mmap",
+    "bytes_read_dontneed",
+    "bytes_read_direct",
+    "files",
+    "pieces",
+    "buffers",
+    "buffer_bytes",
+    "cache_hits",
+    "cache_misses",
+]
+
+_current = contextvars.ContextVar("torrentfile_stats", default=None)
+
+
+def collecting() -> bool:
+    """
+    Return True while a `Stats` object is collecting in this thread.
+    """
+    return _current.get() is not None
+
+
+def current() -> "Stats":
+    """
+    Return the `Stats` object collecting in this thread, or None.
+    """
+    return _current.get()
+
+
+def attach(job: "Stats"):
+    """
+    Count the work of the calling thread towards a job.
+
+    Used as the initializer of worker thread pools.
+
+    Parameters
+    ----------
+    job : Stats
+        the job returned by `current` in the thread starting the pool, or
+        None.
+    """
+    _current.set(job)
+
+
+def bind(func):
+    """
+    Wrap a function to count its work towards the current job.
+
+    Parameters
+    ----------
+    func : function
+        function run on another thread.
+
+    Returns
+    -------
+    function
+        func, running attached to the job collecting in this thread.
+    """
+    job = _current.get()
+    if job is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attach(job)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def add(name: str, amount=1):
+    """
+    Add amount to a counter while statistics are being collected.
+
+    Parameters
+    ----------
+    name : str
+        one of `STAGES` or `COUNTERS`.
+    amount : int | float
+        seconds for stages, otherwise a count.
+    """
+    job = _current.get()
+    if job is not None:
+        job.add(name, amount)
+
+
+def peak_rss() -> float:
+    """
+    Return the peak resident set size of this process in KiB.
+
+    Returns
+    -------
+    float
+        the peak memory, or None on platforms without `resource`.
+    """
+    if resource is None:  # pragma: nocover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # pragma: nocover
+        return peak / 1024
+    return float(peak)
+
+
+class Timer:
+    """
+    Context manager adding the time spent in its block to a stage.
+
+    Parameters
+    ----------
+    stage : str
+        one of `STAGES`.
+    """
+
+    def __init__(self, stage: str):
+        """
+        Store the stage.
+        """
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        """
+        Start the timer.
+        """
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        """
+        Add the elapsed time to the stage.
+        """
+        add(self.stage, time.perf_counter() - self.start)
+
+
+class Stats:
+    """
+    Timing and resource statistics of a torrent job.
+
+    Counts the work done in the thread collecting, and in the threads
+    attached to it, but not the work of other jobs running at the same
+    time.
+
+    Attributes
+    ----------
+    counters : dict
+        stage times in seconds and the counts of `COUNTERS`.
+    elapsed : float
+        seconds spent collecting.
+    peak_rss : float
+        peak resident set size of the process in KiB.
+    """
+
+    def __init__(self):
+        """
+        Start with every counter at zero.
+        """
+        self.counters = dict.fromkeys(STAGES + COUNTERS, 0)
+        self.elapsed = 0.0
+        self.peak_rss = None
+        self._lock = threading.Lock()
+        self._parent = None
+        self._token = None
+        self._start = 0.0
+        self._depth = 0
+
+    def collect(self) -> "Stats":
+        """
+        Return self, to collect the work done in a `with` block.
+
+        Blocks can be nested, only the outermost one is collected.
+
+        Returns
+        -------
+        Stats
+            self.
+        """
+        return self
+
+    def __enter__(self):
+        """
+        Start collecting the work done in this thread.
+
+        A job started while another one collects is counted by both.
+        """
+        self._depth += 1
+        if self._depth == 1:
+            self._parent = _current.get()
+            self._token = _current.set(self)
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        """
+        Stop collecting.
+        """
+        self._depth -= 1
+        if self._depth:
+            return
+        self.elapsed += time.perf_counter() - self._start
+        _current.reset(self._token)
+        self._parent = self._token = None
+        self.peak_rss = peak_rss()
+
+    def add(self, name: str, amount=1):
+        """
+        Add amount to a counter while collecting, from any thread.
+
+        Parameters
+        ----------
+        name : str
+            one of `STAGES` or `COUNTERS`.
+        amount : int | float
+            seconds for stages, otherwise a count.
+        """
+        parent = self._parent
+        if not self._depth:
+            return
+        with self._lock:
+            self.counters[name] += amount
+        if parent is not None:
+            parent.add(name, amount)
+
+    def count(self, name: str, amount: int):
+        """
+        Add a count known to the job, such as the number of files.
+
+        Parameters
+        ----------
+        name : str
+            one of `COUNTERS`.
+        amount : int
+            amount added.
+        """
+        self.counters[name] += amount
+
+    def __getattr__(self, name: str):
+        """
+        Return counters as attributes.
+        """
+        counters = self.__dict__.get("counters", {})
+        if name in counters:
+            return counters[name]
+        raise AttributeError(name)
+
+    def as_dict(self) -> dict:
+        """
+        Return the statistics as a dictionary.
+
+        Returns
+        -------
+        dict
+            stage times, counters, elapsed time and peak RSS.
+        """
+        stats = {f"{stage}_time": self.counters[stage] for stage in STAGES}
+        stats.update({name: self.counters[name] for name in COUNTERS})
+        stats["elapsed"] = self.elapsed
+        stats["peak_rss_kib"] = self.peak_rss
+        return stats
+
+    def format(self, style: str = "text") -> str:
+        """
+        Return the statistics formatted for the command line.
+
+        Parameters
+        ----------
+        style : str
+            "json" or "text".
+
+        Returns
+        -------
+        str
+            the formatted statistics.
+        """
+        if style == "json":
+            return json.dumps(self.as_dict(), indent=2)
+        lines = [f"{'elapsed':<20}{self.elapsed:>14.3f} s"]
+        for stage in STAGES:
+            lines.append(f"{stage:<20}{self.counters[stage]:>14.3f} s")
+        for name in COUNTERS:
+            lines.append(f"{name:<20}{self.counters[name]:>14}")
+        if self.peak_rss is not None:
+            lines.append(f"{'peak_rss':<20}{self.peak_rss:>14.0f} KiB")
+        return "\n".join(lines)
+
+
+def collect_stats(method):
+    """
+    Decorate a method so the work done in it is collected by `self.stats`.
+
+    The `Stats` object is created on first use, so it can decorate
+    `__init__` methods of classes and their subclasses.
+
+    Parameters
+    ----------
+    method : function
+        the decorated method.
+
+    Returns
+    -------
+    function
+        the wrapped method.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if "stats" not in vars(self):
+            self.stats = Stats()
+        with self.stats.collect():
+            return method(self, *args, **kwargs)
+
+    return wrapper
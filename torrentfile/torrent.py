@@ -187,19 +187,39 @@ Bittorrent V1
 """
 
 import os
+import sys
+import math
 import logging
+from collections import deque
 from collections.abc import Sequence
+from concurrent.futures import (Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
 from datetime import datetime
+from operator import itemgetter
 
 import pyben
 
-from torrentfile import utils
-from torrentfile.hasher import FileHasher, Hasher, HasherHybrid, HasherV2
-from torrentfile.mixins import ProgMixin
+from torrentfile import stats, utils
+from torrentfile.archive import Archive, hash_members, hash_pieces
+from torrentfile.cache import HashCache
+from torrentfile.hasher import (FileHasher, Hasher, HasherHybrid, HasherV2,
+                                get_backend, hash_file, hash_piece,
+                                hash_segment, hash_stream, leaves_to_layer,
+                                padding_file, piece_spans, pieces_root,
+                                segment_ranges)
+from torrentfile.journal import Journal
+from torrentfile.leaves import LeafReader, LeafWriter
+from torrentfile.mixins import ProgMixin, ProgressAggregator
+from torrentfile.reader import open_ranges
+from torrentfile.stats import Timer, collect_stats
+from torrentfile.update import (SHA1_SIZE, PreviousTorrent, piece_key,
+                                tree_files)
 from torrentfile.version import __version__ as version
 
 logger = logging.getLogger(__name__)
 
+STREAM_PIECE_LENGTH = 2**20  # 1MiB
+
 
 class MetaFile:
     """
@@ -233,6 +253,42 @@ class MetaFile:
         alias for 'path' arg.
     meta_version : int
         indicates which Bittorrent protocol to use for hashing content
+    workers : int
+        number of threads used for hashing content.  Default: 1
+    pool : str
+        "process" or "thread" pool used for per file hashing. Default: None
+    io_mode : str
+        how file contents are read, "buffered" or "mmap". Default: None
+    hash_backend : str
+        name of the hash backend used for hashing content. Default: None
+    read_ahead : int
+        number of pieces read ahead on a background thread. Default: 0
+    read_size : int
+        bytes read at once hashing v2 and hybrid content, values below 64
+        are powers of 2, 20 = 1MiB. Default: None
+    walkers : int
+        number of threads listing directories while walking the content,
+        see `utils.walk_workers`. Default: None
+    cache : bool | HashCache
+        reuse hashes of unchanged files from a `HashCache`. Default: False
+    cache_path : str
+        path to the hash cache database, implies cache. Default: None
+    update : str
+        path to a torrent previously created for the same content, the
+        hashes of unchanged files are reused from it. Default: None
+    checkpoint : bool
+        record finished work in a journal next to the output, so an
+        interrupted job can be resumed. Default: False
+    resume : bool
+        continue the job recorded in the journal, implies checkpoint.
+        Default: False
+
+    Attributes
+    ----------
+    stats : Stats
+        time spent in each stage and resources used creating the torrent.
+    manifest : FileManifest
+        the files of the content, None until `walk` is called.
     """
 
     hasher = None
@@ -250,6 +306,7 @@ class MetaFile:
         if "hasher" in vars(cls) and vars(cls)["hasher"]:
             cls.hasher.set_callback(func)
 
+    @collect_stats
     def __init__(
         self,
         path=None,
@@ -266,6 +323,18 @@ class MetaFile:
         url_list=None,
         content=None,
         meta_version=None,
+        workers=1,
+        pool=None,
+        io_mode=None,
+        hash_backend=None,
+        read_ahead=0,
+        read_size=None,
+        walkers=None,
+        cache=False,
+        cache_path=None,
+        update=None,
+        checkpoint=False,
+        resume=False,
         **_,
     ):
         """
@@ -275,6 +344,20 @@ class MetaFile:
         self.cwd = cwd
         self.outfile = outfile
         self.progress = int(progress)
+        self.workers = max(int(workers or 1), 1)
+        self.pool = pool or "process"
+        self.io_mode = io_mode or "buffered"
+        self.hash_backend = get_backend(hash_backend).name
+        self.read_ahead = max(int(read_ahead or 0), 0)
+        self.read_size = int(read_size or 0) or None
+        if self.read_size and self.read_size < 64:
+            self.read_size = 2**self.read_size
+        self.walkers = utils.walk_workers(walkers)
+        self.cache = None
+        if isinstance(cache, HashCache):
+            self.cache = cache
+        elif cache or cache_path:
+            self.cache = HashCache(cache_path)
         self.comment = comment
         self.source = source
         self.meta_version = meta_version
@@ -299,6 +382,14 @@ class MetaFile:
 
         logger.debug("path parameter found %s", path)
 
+        self.manifest = None
+        self.previous = None
+        if update:
+            self.previous = PreviousTorrent(update, self.path)
+            logger.debug("updating torrent %s", update)
+            if not piece_length:
+                piece_length = self.previous.piece_length
+
         self.meta = {
             "created by": f"torrentfile_v{version}",
             "creation date": int(datetime.timestamp(datetime.now())),
@@ -310,8 +401,12 @@ class MetaFile:
             self.piece_length = utils.normalize_piece_length(piece_length)
             logger.debug("piece length parameter found %s", piece_length)
         else:
-            self.piece_length = utils.path_piece_length(self.path)
+            self.piece_length = utils.get_piece_length(self.walk().size)
             logger.debug("piece length calculated %s", self.piece_length)
+        if self.previous and self.previous.piece_length != self.piece_length:
+            logger.debug("piece length changed, nothing is reused from %s",
+                         update)
+            self.previous = None
 
         # Assign announce URL to empty string if none provided.
         if not announce:
@@ -351,6 +446,100 @@ class MetaFile:
         if not self.name:
             self.name = os.path.basename(parent)
         self.meta["info"]["name"] = self.name
+        self.journal = None
+        if checkpoint or resume:
+            self.journal = Journal(self.output_path() + ".journal", resume)
+
+    def walk(self) -> utils.FileManifest:
+        """
+        Return the manifest of the content, walking it on first use.
+
+        Returns
+        -------
+        FileManifest
+            the files of the content with their sizes.
+        """
+        if self.manifest is None:
+            with Timer("walk"):
+                self.manifest = utils.FileManifest(self.path, self.walkers)
+        return self.manifest
+
+    def output_path(self, outfile=None) -> str:
+        """
+        Return the path the .torrent file is written to.
+
+        Parameters
+        ----------
+        outfile : str
+            Destination path for .torrent file. default=None
+
+        Returns
+        -------
+        str
+            the output path.
+        """
+        if outfile:
+            self.outfile = outfile
+        if not self.outfile:  # pragma: nocover
+            path = os.path.join(os.getcwd(), self.name) + ".torrent"
+            self.outfile = path
+        if str(self.outfile)[-1] in "\\/":
+            self.outfile = self.outfile + (self.name + ".torrent")
+        return str(self.outfile)
+
+    def journal_settings(self) -> dict:
+        """
+        Return the settings a checkpoint journal can only be resumed with.
+
+        Returns
+        -------
+        dict
+            settings that change the hashes of the torrent.
+        """
+        return {
+            "align": int(bool(self.align)),
+            "meta version": str(self.meta_version or 1),
+            "name": self.name,
+            "piece length": self.piece_length,
+        }
+
+    def resume_journal(self) -> bool:
+        """
+        Check the journal of an earlier job was made with the same settings.
+
+        The creation date of the earlier job is restored, so the resumed
+        torrent is identical to the one the earlier job would have created.
+
+        Returns
+        -------
+        bool
+            the records of the journal can be used.
+        """
+        header = self.journal.header
+        if header.get("settings") != self.journal_settings():
+            if header:
+                logger.debug("Journal settings changed, starting over")
+            return False
+        self.meta["creation date"] = header["creation date"]
+        return True
+
+    def start_journal(self, records: list = (), **extra):
+        """
+        Start recording work in the journal.
+
+        Parameters
+        ----------
+        records : list
+            records of the earlier job that are kept.
+        **extra : dict
+            more header fields.
+        """
+        header = {
+            "creation date": self.meta["creation date"],
+            "settings": self.journal_settings(),
+            **extra,
+        }
+        self.journal.start(header, records)
 
     def assemble(self):
         """
@@ -363,6 +552,15 @@ class MetaFile:
         """
         raise NotImplementedError
 
+    def commit_cache(self):
+        """
+        Save new hash cache entries and log the cache hits and misses.
+        """
+        if self.cache is not None:
+            self.cache.commit()
+            logger.debug("Hash cache: %d hits, %d misses", self.cache.hits,
+                         self.cache.misses)
+
     def sort_meta(self):
         """Sort the info and meta dictionaries."""
         logger.debug("sorting dictionary keys")
@@ -371,6 +569,31 @@ class MetaFile:
         meta = dict(sorted(list(meta.items())))
         return meta
 
+    def count_stats(self):
+        """
+        Count the files and pieces of the assembled torrent in `stats`.
+        """
+        info = self.meta["info"]
+        if "files" in info:
+            lengths = [
+                entry["length"] for entry in info["files"]
+                if entry.get("attr") != "p"
+            ]
+        elif "file tree" in info:
+            lengths = [
+                leaf["length"] for _, leaf in tree_files(info["file tree"])
+            ]
+        else:
+            lengths = [info.get("length", 0)]
+        self.stats.count("files", len(lengths))
+        if "pieces" in info:
+            pieces = len(info["pieces"]) // SHA1_SIZE
+        else:
+            pieces = sum(
+                math.ceil(length / self.piece_length) for length in lengths)
+        self.stats.count("pieces", pieces)
+
+    @collect_stats
     def write(self, outfile=None) -> tuple:
         """
         Write meta information to .torrent file.
@@ -391,20 +614,19 @@ class MetaFile:
         meta : dict
             .torrent meta information.
         """
-        if outfile:
-            self.outfile = outfile
-        if not self.outfile:  # pragma: nocover
-            path = os.path.join(os.getcwd(), self.name) + ".torrent"
-            self.outfile = path
-        if str(self.outfile)[-1] in "\\/":
-            self.outfile = self.outfile + (self.name + ".torrent")
-        self.meta = self.sort_meta()
+        self.output_path(outfile)
+        with Timer("encode"):
+            self.meta = self.sort_meta()
+            data = pyben.dumps(self.meta)
         try:
-            pyben.dump(self.meta, self.outfile)
+            with Timer("write"), open(self.outfile, "wb") as binfile:
+                binfile.write(data)
         except PermissionError as excp:
             logger.error("Permission Denied: Could not write to %s",
                          self.outfile)
             raise PermissionError from excp
+        if self.journal is not None:
+            self.journal.discard()
         return self.outfile, self.meta
 
 
@@ -422,6 +644,7 @@ class TorrentFile(MetaFile, ProgMixin):
 
     hasher = Hasher
 
+    @collect_stats
     def __init__(self, **kwargs):
         """
         Construct TorrentFile instance with given keyword args.
@@ -433,7 +656,13 @@ class TorrentFile(MetaFile, ProgMixin):
         """
         super().__init__(**kwargs)
         logger.debug("Assembling bittorrent v1 torrent file")
-        self.assemble()
+        try:
+            self.assemble()
+        finally:
+            if self.journal is not None:
+                self.journal.close()
+        self.count_stats()
+        self.commit_cache()
 
     def assemble(self):
         """
@@ -445,11 +674,17 @@ class TorrentFile(MetaFile, ProgMixin):
             metadata dictionary for torrent file
         """
         info = self.meta["info"]
-        size, filelist = utils.filelist_total(self.path)
+        manifest = self.walk()
+        order = manifest.sorted()
+        filelist = [manifest.path(index) for index in order]
+        size = manifest.size
         kws = {
             "progress": self.progress,
             "progress_bar": None,
             "align": self.align,
+            "io_mode": self.io_mode,
+            "backend": self.hash_backend,
+            "read_ahead": self.read_ahead,
         }
 
         if self.progress == 2:
@@ -460,24 +695,20 @@ class TorrentFile(MetaFile, ProgMixin):
             self.prog_bar = self.get_progress_tracker(-1, "")
             kws["progress_bar"] = self.prog_bar
 
-        if os.path.isfile(self.path):
+        if manifest.single:
             info["length"] = size
         elif not self.align:
             info["files"] = [{
-                "length":
-                os.path.getsize(path),
-                "path":
-                os.path.relpath(path, self.path).split(os.sep),
-            } for path in filelist]
+                "length": manifest.sizes[index],
+                "path": manifest.parts(index),
+            } for index in order]
         else:
             info["files"] = []
-            for path in filelist:
-                filesize = os.path.getsize(path)
+            for index in order:
+                filesize = manifest.sizes[index]
                 info["files"].append({
-                    "length":
-                    filesize,
-                    "path":
-                    os.path.relpath(path, self.path).split(os.sep),
+                    "length": filesize,
+                    "path": manifest.parts(index),
                 })
                 if filesize < self.piece_length:
                     remainder = self.piece_length - filesize
@@ -489,12 +720,186 @@ class TorrentFile(MetaFile, ProgMixin):
                         "length": remainder,
                         "path": [".pad", str(remainder)],
                     })
-        pieces = bytearray()
-        feeder = Hasher(filelist, self.piece_length, **kws)
+        if self.previous is not None:
+            info["pieces"] = self._updated_pieces(order)
+            return
+        if self.cache is not None and self.align:
+            info["pieces"] = self._cached_pieces(order, kws)
+            return
+        pieces, start = bytearray(), 0
+        if self.journal is not None:
+            pieces = self._resume_pieces(order)
+            start = len(pieces) // SHA1_SIZE
+        feeder = Hasher(filelist,
+                        self.piece_length,
+                        workers=self.workers,
+                        start=start,
+                        sizes=[manifest.sizes[index] for index in order],
+                        **kws)
         for piece in feeder:
             pieces.extend(piece)
+            if self.journal is not None:
+                self.journal.add({"pieces": piece}, self.piece_length)
         info["pieces"] = pieces
 
+    def _resume_pieces(self, order: list) -> bytearray:
+        """
+        Return the pieces finished by an interrupted job.
+
+        Pieces are kept up to the first file that changed since the job
+        was interrupted, and a new journal is started holding them.
+
+        Parameters
+        ----------
+        order : list
+            positions of the files in the manifest, in torrent order.
+
+        Returns
+        -------
+        bytearray
+            the pieces at the start of the content that are finished.
+        """
+        manifest = self.manifest
+        files = [[
+            manifest.parts(index), manifest.sizes[index],
+            manifest.mtimes[index]
+        ] for index in order]
+        pieces = bytearray()
+        if self.resume_journal():
+            for record in self.journal.records:
+                pieces.extend(record["pieces"])
+            offset = 0
+            for current, recorded in zip(files, self.journal.header["files"]):
+                if current != recorded:
+                    break
+                offset += current[1]
+                if self.align and current[1] % self.piece_length:
+                    offset += -current[1] % self.piece_length
+            else:
+                if len(files) == len(self.journal.header["files"]):
+                    offset = len(pieces) // SHA1_SIZE * self.piece_length
+            count = min(len(pieces) // SHA1_SIZE, offset // self.piece_length)
+            del pieces[count * SHA1_SIZE:]
+            logger.debug("Resuming after %d pieces", count)
+            if self.progress == 2:
+                self.prog_bar.update(min(count * self.piece_length, offset))
+        self.start_journal([{"pieces": bytes(pieces)}] if pieces else [],
+                           files=files)
+        return pieces
+
+    def _cached_pieces(self, order: list, kws: dict) -> bytearray:
+        """
+        Hash piece aligned files, reusing the pieces in the hash cache.
+
+        Parameters
+        ----------
+        order : list
+            positions of the files in the manifest, in torrent order.
+        kws : dict
+            keyword arguments for the `Hasher`.
+
+        Returns
+        -------
+        bytearray
+            the pieces of every file.
+        """
+        manifest = self.manifest
+        filelist = [manifest.path(index) for index in order]
+        keys = [
+            self.cache.key(path, self.piece_length, manifest.stat(index))
+            for path, index in zip(filelist, order)
+        ]
+        entries = [self.cache.get(key, v1=True, v2=False) for key in keys]
+        missing = [(path, key[2])
+                   for path, key, entry in zip(filelist, keys, entries)
+                   if entry is None and key[2]]
+        feeder = iter(())
+        if missing:
+            paths, sizes = zip(*missing)
+            feeder = Hasher(list(paths),
+                            self.piece_length,
+                            workers=self.workers,
+                            sizes=sizes,
+                            **kws)
+        pieces = bytearray()
+        for key, entry in zip(keys, entries):
+            size = key[2]
+            if entry is not None:
+                pieces.extend(entry.pieces)
+                if self.progress == 2:
+                    self.prog_bar.update(size)
+            elif size:
+                count = -(-size // self.piece_length)
+                hashes = b"".join(next(feeder) for _ in range(count))
+                self.cache.put(key, pieces=hashes)
+                pieces.extend(hashes)
+        return pieces
+
+    def _updated_pieces(self, order: list) -> bytearray:
+        """
+        Hash the pieces that changed since the previous torrent.
+
+        Pieces covering the same ranges of unchanged files as a piece of
+        the previous torrent are copied from it, the rest are hashed.
+
+        Parameters
+        ----------
+        order : list
+            positions of the files in the manifest, in torrent order.
+
+        Returns
+        -------
+        bytearray
+            the pieces of every file.
+        """
+        manifest = self.manifest
+        filelist = [manifest.path(index) for index in order]
+        sizes = {
+            path: manifest.sizes[index]
+            for path, index in zip(filelist, order)
+        }
+        parts = {
+            path: tuple(manifest.parts(index))
+            for path, index in zip(filelist, order)
+        }
+        unchanged = {
+            parts[path]
+            for path, index in zip(filelist, order)
+            if self.previous.unchanged(path, parts[path], sizes[path],
+                                       manifest.mtimes[index])
+        }
+        index = self.previous.piece_index(unchanged)
+        backend = get_backend(self.hash_backend)
+        pieces, readers = bytearray(), {}
+        try:
+            for spans, pad in piece_spans(filelist, list(sizes.values()),
+                                          self.piece_length, self.align):
+                digest = index.get(
+                    piece_key([(parts[path], offset, length)
+                               for path, offset, length in spans], pad))
+                if digest is None:
+                    for path, _, _ in spans:
+                        if path not in readers:
+                            readers[path] = open_ranges(path, self.io_mode)
+                    digest = hash_piece([(readers[path], offset, length)
+                                         for path, offset, length in spans],
+                                        pad, backend)
+                    self.previous.hashed += 1
+                else:
+                    self.previous.reused += 1
+                for path, offset, length in spans:
+                    if offset + length == sizes[path] and path in readers:
+                        readers.pop(path).close()
+                pieces.extend(digest)
+                if self.progress == 2:
+                    self.prog_bar.update(sum(span[2] for span in spans))
+        finally:
+            for reader in readers.values():
+                reader.close()
+        logger.debug("Reused %d pieces and hashed %d pieces",
+                     self.previous.reused, self.previous.hashed)
+        return pieces
+
 
 class TorrentFileV2(MetaFile, ProgMixin):
     """
@@ -508,6 +913,7 @@ class TorrentFileV2(MetaFile, ProgMixin):
 
     hasher = HasherV2
 
+    @collect_stats
     def __init__(self, **kwargs):
         """
         Construct `TorrentFileV2` Class instance from given parameters.
@@ -521,9 +927,17 @@ class TorrentFileV2(MetaFile, ProgMixin):
         logger.debug("Assembling bittorrent v2 torrent file")
         self.piece_layers = {}
         self.hashes = []
-        size, file_list = utils.filelist_total(self.path)
-        self.kws = {"progress": self.progress, "progress_bar": None}
-        self.total = len(file_list)
+        manifest = self.walk()
+        size = manifest.size
+        self.kws = {
+            "progress": self.progress,
+            "progress_bar": None,
+            "io_mode": self.io_mode,
+            "backend": self.hash_backend,
+            "read_ahead": self.read_ahead,
+            "read_size": self.read_size,
+        }
+        self.total = len(manifest)
 
         if self.progress == 2:
             self.prog_bar = self.get_progress_tracker(size, str(self.path))
@@ -534,6 +948,7 @@ class TorrentFileV2(MetaFile, ProgMixin):
             self.kws["progress_bar"] = self.prog_bar
 
         self.assemble()
+        self.count_stats()
 
     def assemble(self):
         """
@@ -545,43 +960,41 @@ class TorrentFileV2(MetaFile, ProgMixin):
             Metainformation about the torrent.
         """
         info = self.meta["info"]
-        if os.path.isfile(self.path):
-            info["file tree"] = {info["name"]: self._traverse(self.path)}
-            info["length"] = os.path.getsize(self.path)
-        else:
-            info["file tree"] = self._traverse(self.path)
+        manifest = self.manifest
+        leaves = [self._hash_file(index) for index in range(len(manifest))]
+        info["file tree"] = manifest.file_tree(leaves)
+        if manifest.single:
+            info["length"] = manifest.sizes[0]
 
         info["meta version"] = 2
         self.meta["piece layers"] = self.piece_layers
 
-    def _traverse(self, path: str) -> dict:
+    def _hash_file(self, index: int) -> dict:
         """
-        Walk directory tree.
+        Calculate the hashes of a single file.
 
         Parameters
         ----------
-        path : str
-            Path to file or directory.
+        index : int
+            position of the file in the manifest.
+
+        Returns
+        -------
+        dict
+            the file tree leaf of the file.
         """
-        if os.path.isfile(path):
-            # Calculate Size and hashes for each file.
-            size = os.path.getsize(path)
+        path = self.manifest.path(index)
+        size = self.manifest.sizes[index]
 
-            if size == 0:
-                return {"": {"length": size}}
+        if size == 0:
+            return {"length": size}
 
-            logger.debug("Hashing %s", str(path))
-            fhash = HasherV2(path, self.piece_length, **self.kws)
+        logger.debug("Hashing %s", str(path))
+        fhash = HasherV2(path, self.piece_length, size=size, **self.kws)
 
-            if size > self.piece_length:
-                self.piece_layers[fhash.root] = fhash.piece_layer
-            return {"": {"length": size, "pieces root": fhash.root}}
-
-        file_tree = {}
-        if os.path.isdir(path):
-            for name in sorted(os.listdir(path)):
-                file_tree[name] = self._traverse(os.path.join(path, name))
-        return file_tree
+        if size > self.piece_length:
+            self.piece_layers[fhash.root] = fhash.piece_layer
+        return {"length": size, "pieces root": fhash.root}
 
 
 class TorrentFileHybrid(MetaFile, ProgMixin):
@@ -596,6 +1009,7 @@ class TorrentFileHybrid(MetaFile, ProgMixin):
 
     hasher = HasherHybrid
 
+    @collect_stats
     def __init__(self, **kwargs):
         """
         Create Bittorrent v1 v2 hybrid metafiles.
@@ -607,9 +1021,17 @@ class TorrentFileHybrid(MetaFile, ProgMixin):
         self.piece_layers = {}
         self.pieces = []
         self.files = []
-        size, file_list = utils.filelist_total(self.path)
-        self.kws = {"progress": self.progress, "progress_bar": None}
-        self.total = len(file_list)
+        manifest = self.walk()
+        size = manifest.size
+        self.kws = {
+            "progress": self.progress,
+            "progress_bar": None,
+            "io_mode": self.io_mode,
+            "backend": self.hash_backend,
+            "read_ahead": self.read_ahead,
+            "read_size": self.read_size,
+        }
+        self.total = len(manifest)
 
         if self.progress == 0:
             self.prog_bar = self.get_progress_tracker(-1, "")
@@ -620,6 +1042,7 @@ class TorrentFileHybrid(MetaFile, ProgMixin):
             self.kws["progress_bar"] = self.prog_bar
 
         self.assemble()
+        self.count_stats()
 
     def assemble(self):
         """
@@ -627,60 +1050,61 @@ class TorrentFileHybrid(MetaFile, ProgMixin):
         """
         info = self.meta["info"]
         info["meta version"] = 2
+        manifest = self.manifest
+        leaves = [self._hash_file(index) for index in range(len(manifest))]
+        info["file tree"] = manifest.file_tree(leaves)
 
-        if os.path.isfile(self.path):
-            info["file tree"] = {self.name: self._traverse(self.path)}
-            info["length"] = os.path.getsize(self.path)
+        if manifest.single:
+            info["length"] = manifest.sizes[0]
 
         else:
-            info["file tree"] = self._traverse(self.path)
             info["files"] = self.files
 
         info["pieces"] = b"".join(self.pieces)
         self.meta["piece layers"] = self.piece_layers
         return info
 
-    def _traverse(self, path: str) -> dict:
+    def _hash_file(self, index: int) -> dict:
         """
-        Build meta dictionary while walking directory.
+        Calculate the hashes of a single file and add it to the file list.
 
         Parameters
         ----------
-        path : str
-            Path to target file.
-        """
-        if os.path.isfile(path):
-            file_size = os.path.getsize(path)
+        index : int
+            position of the file in the manifest.
 
-            self.files.append({
-                "length":
-                file_size,
-                "path":
-                os.path.relpath(path, self.path).split(os.sep),
-            })
+        Returns
+        -------
+        dict
+            the file tree leaf of the file.
+        """
+        path = self.manifest.path(index)
+        file_size = self.manifest.sizes[index]
 
-            if file_size == 0:
-                return {"": {"length": file_size}}
+        self.files.append({
+            "length": file_size,
+            "path": self.manifest.parts(index),
+        })
 
-            logger.debug("Hashing %s", str(path))
-            file_hash = HasherHybrid(path, self.piece_length, **self.kws)
+        if file_size == 0:
+            return {"length": file_size}
 
-            if file_size > self.piece_length:
-                self.piece_layers[file_hash.root] = file_hash.piece_layer
+        logger.debug("Hashing %s", str(path))
+        file_hash = HasherHybrid(path,
+                                 self.piece_length,
+                                 size=file_size,
+                                 **self.kws)
 
-            self.hashes.append(file_hash)
-            self.pieces.extend(file_hash.pieces)
+        if file_size > self.piece_length:
+            self.piece_layers[file_hash.root] = file_hash.piece_layer
 
-            if file_hash.padding_file:
-                self.files.append(file_hash.padding_file)
+        self.hashes.append(file_hash)
+        self.pieces.extend(file_hash.pieces)
 
-            return {"": {"length": file_size, "pieces root": file_hash.root}}
+        if file_hash.padding_file:
+            self.files.append(file_hash.padding_file)
 
-        tree = {}
-        if os.path.isdir(path):
-            for name in sorted(os.listdir(path)):
-                tree[name] = self._traverse(os.path.join(path, name))
-        return tree
+        return {"length": file_size, "pieces root": file_hash.root}
 
 
 class TorrentAssembler(MetaFile, ProgMixin):
@@ -692,13 +1116,26 @@ class TorrentAssembler(MetaFile, ProgMixin):
 
     Parameters
     ----------
+    save_leaves : str
+        path of a sidecar file the 16KiB leaf hashes are saved to.
+    from_leaves : str
+        path of a sidecar file the piece layers are calculated from
+        instead of reading the content, v2 only.
+    tracker : ProgressAggregator
+        aggregator the progress is reported to, so it can be polled with
+        `snapshot` from another thread while the torrent is assembled.
     **kwargs : dict
         Keyword arguments for torrent options.
     """
 
     hasher = FileHasher
 
-    def __init__(self, **kwargs):
+    @collect_stats
+    def __init__(self,
+                 save_leaves=None,
+                 from_leaves=None,
+                 tracker=None,
+                 **kwargs):
         """
         Create Bittorrent v1 v2 hybrid metafiles.
         """
@@ -710,15 +1147,38 @@ class TorrentAssembler(MetaFile, ProgMixin):
         self.pieces = bytearray()
         self.files = []
         self.hybrid = self.meta_version == "3"
-        size, file_list = utils.filelist_total(self.path)
+        if from_leaves and self.hybrid:
+            raise utils.ArgumentError(
+                "Hybrid torrents need v1 pieces, which can not be "
+                "calculated from leaf hashes")
+        manifest = self.walk()
+        size = manifest.size
         self.kws = {
             "progress": self.progress,
             "progress_bar": None,
             "hybrid": self.hybrid,
+            "io_mode": self.io_mode,
+            "backend": self.hash_backend,
+            "read_ahead": self.read_ahead,
+            "read_size": self.read_size,
         }
-        self.total = len(file_list)
+        self.total = len(manifest)
+        self.leaf_reader = LeafReader(from_leaves) if from_leaves else None
+        self.leaf_writer = LeafWriter(save_leaves) if save_leaves else None
+        self.kws["keep_leaves"] = self.leaf_writer is not None
+
+        self.tracker = tracker
+        if tracker is None and self.workers > 1 and self.progress:
+            # per file progress bars would overlap between workers.
+            self.tracker = ProgressAggregator()
+
+        if self.tracker is not None:
+            self.tracker.begin(size, str(self.path))
+            self.progress = 2
+            self.prog_bar = self.tracker
+            self.kws["progress_bar"] = self.prog_bar
 
-        if self.progress == 2:
+        elif self.progress == 2:
             self.prog_bar = self.get_progress_tracker(size, str(self.path))
             self.kws["progress_bar"] = self.prog_bar
 
@@ -726,7 +1186,23 @@ class TorrentAssembler(MetaFile, ProgMixin):
             self.prog_bar = self.get_progress_tracker(-1, "")
             self.kws["progress_bar"] = self.prog_bar
 
-        self.assemble()
+        self.journal_files = {}
+        if self.journal is not None:
+            records = self.journal.records if self.resume_journal() else []
+            for record in records:
+                self.journal_files[tuple(record["path"])] = record
+            self.start_journal(records)
+
+        try:
+            self.assemble()
+        finally:
+            for sidecar in (self.leaf_reader, self.leaf_writer, self.journal):
+                if sidecar is not None:
+                    sidecar.close()
+        if self.tracker is not None:
+            self.tracker.close_out()
+        self.count_stats()
+        self.commit_cache()
 
     def assemble(self):
         """
@@ -734,62 +1210,680 @@ class TorrentAssembler(MetaFile, ProgMixin):
         """
         info = self.meta["info"]
         info["meta version"] = 2
+        traverse = self._traverse
+        if self.workers > 1:
+            traverse = self._traverse_parallel
 
-        if os.path.isfile(self.path):
-            info["file tree"] = {self.name: self._traverse(self.path)}
-            info["length"] = os.path.getsize(self.path)
+        info["file tree"] = traverse()
+        if self.manifest.single:
+            info["length"] = self.manifest.sizes[0]
 
-        else:
-            info["file tree"] = self._traverse(self.path)
-            if self.hybrid:
-                info["files"] = self.files
+        elif self.hybrid:
+            info["files"] = self.files
 
         if self.hybrid:
             info["pieces"] = self.pieces
         self.meta["piece layers"] = self.piece_layers
+        if self.previous is not None:
+            logger.debug("Reused the hashes of %d of %d files",
+                         self.previous.reused, self.total)
         return info
 
-    def _traverse(self, path: str) -> dict:
+    def _traverse(self) -> dict:
+        """
+        Build the file tree hashing each file of the manifest in turn.
+
+        Returns
+        -------
+        dict
+            the file tree of the content.
+        """
+        manifest = self.manifest
+        return manifest.file_tree(
+            [self._hash_file(index) for index in range(len(manifest))])
+
+    def _hash_file(self, index: int) -> dict:
         """
-        Build meta dictionary while walking directory.
+        Hash a single file, or reuse the hashes stored for it.
 
         Parameters
         ----------
-        path : str
-            Path to target file.
-        """
-        if os.path.isfile(path):
-            file_size = os.path.getsize(path)
-            if self.hybrid:
-                self.files.append({
-                    "length":
-                    file_size,
-                    "path":
-                    os.path.relpath(path, self.path).split(os.sep),
-                })
+        index : int
+            position of the file in the manifest.
 
-            if file_size == 0:
-                return {"": {"length": file_size}}
+        Returns
+        -------
+        dict
+            the file tree leaf of the file.
+        """
+        path = self.manifest.path(index)
+        file_size = self.manifest.sizes[index]
+        if self.hybrid:
+            self.files.append({
+                "length": file_size,
+                "path": self.manifest.parts(index),
+            })
 
+        if file_size == 0:
+            return {"length": file_size}
+
+        key, cached, stamp = None, None, None
+        leaves = self._stored_leaves(index)
+        if leaves is None:
+            cached = self._previous_hashes(index)
+        if leaves is None and cached is None:
+            stamp, cached = self._journal_lookup(index)
+        if leaves is None and cached is None:
+            key, cached = self._cache_lookup(index)
+        if leaves is not None:
+            root, layer = leaves_to_layer(leaves, self.piece_length,
+                                          self.hash_backend)
+            pieces, padding = b"", None
+            if self.progress == 2:
+                self.prog_bar.update(file_size)
+        elif cached is not None:
+            root, layer, pieces = cached
+            padding = padding_file(file_size, self.piece_length)
+            if self.progress == 2:
+                self.prog_bar.update(file_size)
+        else:
             logger.debug("Hashing %s", str(path))
-            hasher = FileHasher(path, self.piece_length, **self.kws)
-            layers = bytearray()
+            hasher = FileHasher(path,
+                                self.piece_length,
+                                size=file_size,
+                                **self.kws)
+            pieces = bytearray()
             for result in hasher:
                 if self.hybrid:
-                    layer_hash, piece = result
-                    self.pieces.extend(piece)
+                    pieces.extend(result[1])
+            root, layer = hasher.root, hasher.piece_layer
+            padding = hasher.padding_file
+            leaves = hasher.leaves
+            self._cache_store(key, root, layer, pieces)
+        self._journal_store(stamp, root, layer, pieces)
+        self._save_leaves(index, leaves)
+        if self.hybrid:
+            self.pieces.extend(pieces)
+        if file_size > self.piece_length:
+            self.piece_layers[root] = layer
+        if self.hybrid and padding:
+            self.files.append(padding)
+
+        return {"length": file_size, "pieces root": root}
+
+    def _traverse_parallel(self) -> dict:
+        """
+        Build meta dictionary hashing files on a pool of workers.
+
+        Every file of the manifest is hashed independently on a thread or
+        process pool.  Results are merged back in the same order the
+        serial walk would produce them.
+
+        Returns
+        -------
+        dict
+            the file tree of the content.
+        """
+        manifest = self.manifest
+        tree_leaves = [{"length": size} for size in manifest.sizes]
+        tree = manifest.file_tree(tree_leaves)
+        if self.pool == "thread":
+            executor = ThreadPoolExecutor(max_workers=self.workers,
+                                          initializer=stats.attach,
+                                          initargs=(stats.current(), ))
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+        pending = deque()
+        with executor:
+            for entry in enumerate(tree_leaves):
+                index = entry[0]
+                key, cached, stamp = None, None, None
+                leaves = self._stored_leaves(index)
+                if leaves is None:
+                    cached = self._previous_hashes(index)
+                if leaves is None and cached is None:
+                    stamp, cached = self._journal_lookup(index)
+                if leaves is None and cached is None:
+                    key, cached = self._cache_lookup(index)
+                # stored results are merged like a finished job
+                future = Future()
+                if leaves is not None:
+                    root, layer = leaves_to_layer(leaves, self.piece_length,
+                                                  self.hash_backend)
+                    future.set_result((root, layer, b"", None, leaves))
+                    futures = [future]
+                elif cached is not None:
+                    padding = padding_file(manifest.sizes[index],
+                                           self.piece_length)
+                    future.set_result((*cached, padding))
+                    futures, key = [future], None
                 else:
-                    layer_hash = result
-                layers.extend(layer_hash)
-            if file_size > self.piece_length:
-                self.piece_layers[hasher.root] = layers
-            if self.hybrid and hasher.padding_file:
-                self.files.append(hasher.padding_file)
-
-            return {"": {"length": file_size, "pieces root": hasher.root}}
-
-        tree = {}
-        if os.path.isdir(path):
-            for name in sorted(os.listdir(path)):
-                tree[name] = self._traverse(os.path.join(path, name))
+                    size = manifest.sizes[index]
+                    reporter = None
+                    if size:
+                        self.prog_bar.start(index, size,
+                                            manifest.relpaths[index])
+                    if size and self.pool == "thread":
+                        # workers in other processes can not report back
+                        reporter = self.prog_bar.reporter(index)
+                    futures = self._submit(executor, manifest.path(index),
+                                           size, reporter)
+                pending.append((entry, futures, key, stamp))
+                while sum(len(i[1]) for i in pending) >= self.workers * 4:
+                    self._merge(*pending.popleft())
+            while pending:
+                self._merge(*pending.popleft())
         return tree
+
+    def _previous_hashes(self, index: int) -> tuple:
+        """
+        Return the hashes of an unchanged file from the previous torrent.
+
+        Parameters
+        ----------
+        index : int
+            position of the file in the manifest.
+
+        Returns
+        -------
+        tuple
+            the pieces root, piece layer and v1 pieces of the file, or None
+            if it has to be hashed.
+        """
+        if self.previous is None or self.leaf_writer is not None:
+            return None
+        manifest = self.manifest
+        return self.previous.v2_hashes(manifest.path(index),
+                                       manifest.parts(index),
+                                       manifest.sizes[index], self.hybrid,
+                                       manifest.mtimes[index])
+
+    def _journal_lookup(self, index: int) -> tuple:
+        """
+        Look up the hashes of a file in the journal of an interrupted job.
+
+        Parameters
+        ----------
+        index : int
+            position of the file in the manifest.
+
+        Returns
+        -------
+        tuple
+            the stamp new hashes are recorded under, or None, and the
+            recorded root, piece layer and pieces, or None when the file
+            has to be hashed.
+        """
+        file_size = self.manifest.sizes[index]
+        if self.journal is None or not file_size:
+            return None, None
+        stamp = [
+            self.manifest.parts(index), file_size, self.manifest.mtimes[index]
+        ]
+        record = self.journal_files.get(tuple(stamp[0]))
+        if record is None or [record["length"], record["mtime"]] != stamp[1:]:
+            return stamp, None
+        return None, (record["root"], record["layer"], record["pieces"])
+
+    def _journal_store(self, stamp: list, root: bytes, layer: bytes,
+                       pieces: bytes):
+        """
+        Record the hashes of a finished file in the journal.
+
+        Parameters
+        ----------
+        stamp : list
+            path, size and modification time of the file before it was
+            hashed, or None.
+        root : bytes
+            the pieces root.
+        layer : bytes
+            the piece layer.
+        pieces : bytes
+            v1 pieces of a hybrid torrent.
+        """
+        if stamp is None:
+            return
+        parts, length, mtime = stamp
+        self.journal.add(
+            {
+                "layer": bytes(layer),
+                "length": length,
+                "mtime": mtime,
+                "path": parts,
+                "pieces": bytes(pieces),
+                "root": bytes(root),
+            }, length)
+
+    def _cache_lookup(self, index: int) -> tuple:
+        """
+        Look up the hashes of a file in the hash cache.
+
+        Empty files are never cached.
+
+        Parameters
+        ----------
+        index : int
+            position of the file in the manifest.
+
+        Returns
+        -------
+        tuple
+            the cache key, or None without a cache, and the cached root,
+            piece layer and pieces, or None when they are not cached.
+        """
+        manifest = self.manifest
+        if self.cache is None or manifest.sizes[index] == 0:
+            return None, None
+        key = self.cache.key(manifest.path(index), self.piece_length,
+                             manifest.stat(index))
+        if self.leaf_writer is not None:
+            # the cache has no leaves, so every file has to be hashed
+            return key, None
+        entry = self.cache.get(key, v1=self.hybrid)
+        if entry is None:
+            return key, None
+        return key, (entry.root, entry.layer, entry.pieces or b"")
+
+    def _cache_store(self, key: tuple, root: bytes, layer: bytes,
+                     pieces: bytes):
+        """
+        Store the hashes of a file in the hash cache.
+
+        Parameters
+        ----------
+        key : tuple
+            cache key taken before the file was hashed, or None.
+        root : bytes
+            the pieces root.
+        layer : bytes
+            the piece layer.
+        pieces : bytes
+            v1 pieces of a hybrid torrent.
+        """
+        if key is not None:
+            self.cache.put(key, root, layer, pieces if self.hybrid else None)
+
+    def _stored_leaves(self, index: int) -> bytes:
+        """
+        Return the leaf hashes of a file from the leaves sidecar.
+
+        Parameters
+        ----------
+        index : int
+            position of the file in the manifest.
+
+        Returns
+        -------
+        bytes
+            the leaf hashes, or None if they are not available.
+        """
+        file_size = self.manifest.sizes[index]
+        if self.leaf_reader is None or not file_size:
+            return None
+        leaves = self.leaf_reader.get(self.manifest.parts(index), file_size)
+        if leaves is None:
+            logger.debug("No leaves stored for %s, hashing it",
+                         self.manifest.path(index))
+        return leaves
+
+    def _save_leaves(self, index: int, leaves: bytes):
+        """
+        Write the leaf hashes of a file to the leaves sidecar.
+
+        Parameters
+        ----------
+        index : int
+            position of the file in the manifest.
+        leaves : bytes
+            the leaf hashes of the file, or None.
+        """
+        if self.leaf_writer is not None and leaves is not None:
+            self.leaf_writer.add(self.manifest.parts(index),
+                                 self.manifest.sizes[index], leaves)
+
+    def _submit(self,
+                executor,
+                path: str,
+                file_size: int,
+                reporter=None) -> list:
+        """
+        Send the hashing work for a single file to the worker pool.
+
+        Large files are split into piece aligned segments that are hashed
+        concurrently, smaller files are hashed by a single worker.
+
+        Parameters
+        ----------
+        executor : Executor
+            the worker pool.
+        path : str
+            path to file.
+        file_size : int
+            size of the file.
+        reporter : object
+            progress bar stand-in the workers report the bytes hashed to.
+
+        Returns
+        -------
+        list
+            pending results for the file.
+        """
+        if not file_size:
+            return []
+        logger.debug("Hashing %s", str(path))
+        ranges = segment_ranges(file_size, self.piece_length, self.workers)
+        keep_leaves = self.leaf_writer is not None
+        if len(ranges) == 1:
+            return [
+                executor.submit(hash_file, path, self.piece_length,
+                                self.hybrid, self.io_mode, self.hash_backend,
+                                self.read_size, keep_leaves, reporter)
+            ]
+        return [
+            executor.submit(hash_segment, path, self.piece_length, start,
+                            stop, self.hybrid, self.io_mode, self.hash_backend,
+                            keep_leaves, reporter) for start, stop in ranges
+        ]
+
+    def _merge(self,
+               entry: tuple,
+               futures: list,
+               key: tuple = None,
+               stamp: list = None):
+        """
+        Merge the hashing results for a single file into the meta dictionary.
+
+        Parameters
+        ----------
+        entry : tuple
+            position in the manifest and file tree leaf of the file.
+        futures : list
+            pending results of `hash_file` or `hash_segment`.
+        key : tuple
+            hash cache key the results are stored under, or None.
+        stamp : list
+            journal stamp the results are recorded under, or None.
+        """
+        index, leaf = entry
+        file_size = self.manifest.sizes[index]
+        if self.hybrid:
+            self.files.append({
+                "length": file_size,
+                "path": self.manifest.parts(index),
+            })
+        if not futures:
+            return
+        leaves = None
+        if len(futures) == 1:
+            result = futures[0].result()
+            root, layers, pieces, padding = result[:4]
+            if len(result) > 4:
+                leaves = result[4]
+        else:
+            results = [future.result() for future in futures]
+            layers = b"".join(result[0] for result in results)
+            pieces = b"".join(result[1] for result in results)
+            if self.leaf_writer is not None:
+                leaves = b"".join(result[2] for result in results)
+            root = pieces_root(layers, self.piece_length, self.hash_backend)
+            padding = padding_file(file_size, self.piece_length)
+        self._cache_store(key, root, layers, pieces)
+        self._journal_store(stamp, root, layers, pieces)
+        self._save_leaves(index, leaves)
+        leaf["pieces root"] = root
+        if file_size > self.piece_length:
+            self.piece_layers[root] = layers
+        if self.hybrid:
+            self.pieces.extend(pieces)
+            if padding:
+                self.files.append(padding)
+        self.prog_bar.finish(index, file_size)
+
+
+class TorrentStream(MetaFile, ProgMixin):
+    """
+    Create a single file torrent from a stream such as stdin or a pipe.
+
+    The content is read once from start to end, so it does not have to
+    exist on disk or be seekable.
+
+    Parameters
+    ----------
+    stream : BinaryIO
+        readable binary stream of the content. Default: stdin
+    name : str
+        name of the file in the torrent.
+    length : int
+        expected size of the content, used to choose the piece length and
+        to show progress. Default: None
+    tee : str
+        path of a file a copy of the content is written to. Default: None
+    **kwargs : dict
+        Keyword arguments for torrent options.
+
+    Raises
+    ------
+    ArgumentError
+        no name was given, or the stream did not have the expected length.
+    """
+
+    @collect_stats
+    def __init__(self, stream=None, name=None, length=None, tee=None,
+                 **kwargs):
+        """
+        Hash the stream and assemble the meta dictionary.
+        """
+        if not name:
+            raise utils.ArgumentError(
+                "A name is required for content read from a stream")
+        self.length = int(length) if length else None
+        if not kwargs.get("piece_length"):
+            kwargs["piece_length"] = STREAM_PIECE_LENGTH
+            if self.length:
+                kwargs["piece_length"] = utils.get_piece_length(self.length)
+        kwargs.update(path=name,
+                      content=None,
+                      update=None,
+                      cache=False,
+                      cache_path=None,
+                      checkpoint=False,
+                      resume=False)
+        super().__init__(**kwargs)
+        self.stream = stream if stream is not None else sys.stdin.buffer
+        self.tee = tee
+        logger.debug("Assembling torrent from stream %s", name)
+        self.assemble()
+        self.count_stats()
+
+    def assemble(self):
+        """
+        Hash the stream and add its hashes to the meta dictionary.
+        """
+        info = self.meta["info"]
+        version = str(self.meta_version or 1)
+        v1, v2 = version in ("1", "3"), version in ("2", "3")
+        total = self.length if self.progress and self.length else -1
+        self.prog_bar = self.get_progress_tracker(total, self.name)
+        tee = None
+        if self.tee:
+            tee = open(self.tee, "wb")  # pylint: disable=R1732
+        try:
+            length, pieces, root, layer = hash_stream(
+                self.stream,
+                self.piece_length,
+                v1=v1,
+                v2=v2,
+                backend=self.hash_backend,
+                tee=tee,
+                progress_bar=self.prog_bar,
+            )
+        finally:
+            if tee is not None:
+                tee.close()
+        if self.length is not None and length != self.length:
+            raise utils.ArgumentError(
+                f"Stream ended after {length} bytes, expected {self.length}")
+        info["length"] = length
+        if v1:
+            info["pieces"] = pieces
+        if v2:
+            info["meta version"] = 2
+            leaf = {"length": length}
+            if root is not None:
+                leaf["pieces root"] = root
+            info["file tree"] = {self.name: {"": leaf}}
+            self.meta["piece layers"] = {}
+            if length > self.piece_length:
+                self.meta["piece layers"][root] = layer
+        return info
+
+
+class TorrentArchive(MetaFile, ProgMixin):
+    """
+    Create a torrent of the files inside a tar or zip archive.
+
+    The torrent is the same as one created from the extracted archive, but
+    the archive is never extracted: names and sizes are read from its index
+    and the contents of the members are hashed as they are read.
+
+    Parameters
+    ----------
+    name : str
+        name of the torrent content. Default: the archive's top level
+        directory, or the name of the archive without its extension.
+    **kwargs : dict
+        Keyword arguments for torrent options, `path` is the archive.
+    """
+
+    @collect_stats
+    def __init__(self, name=None, **kwargs):
+        """
+        Read the archive index, hash its members and assemble the meta.
+        """
+        path = kwargs.get("content") or kwargs.get("path")
+        self.archive = Archive(path)
+        if not kwargs.get("piece_length"):
+            kwargs["piece_length"] = utils.get_piece_length(self.archive.size)
+        kwargs.update(update=None,
+                      cache=False,
+                      cache_path=None,
+                      checkpoint=False,
+                      resume=False)
+        try:
+            super().__init__(**kwargs)
+            self.name = name or self.archive.name
+            self.meta["info"]["name"] = self.name
+            logger.debug("Assembling torrent from archive %s", path)
+            self.assemble()
+            self.count_stats()
+        finally:
+            self.archive.close()
+
+    def assemble(self):
+        """
+        Hash the archive members and add them to the meta dictionary.
+
+        Returns
+        -------
+        dict
+            the info dictionary.
+        """
+        info = self.meta["info"]
+        version = str(self.meta_version or 1)
+        total = self.archive.size if self.progress == 2 else -1
+        self.prog_bar = None
+        if self.progress != 1:
+            self.prog_bar = self.get_progress_tracker(total,
+                                                      str(self.path))
+        if version == "1":
+            self._assemble_v1(info)
+            return info
+        hybrid = version == "3"
+        hashes = hash_members(self.archive,
+                              self.piece_length,
+                              v1=hybrid,
+                              v2=True,
+                              backend=self.hash_backend,
+                              progress_bar=self.prog_bar)
+        info["meta version"] = 2
+        self.meta["piece layers"] = {}
+        tree, files, pieces = {}, [], bytearray()
+        # directories are placed among the files like in a walk, only
+        # empty ones are left as empty dictionaries.
+        entries = [(member.parts, member) for member in self.archive.members]
+        entries.extend((parts, None) for parts in self.archive.directories)
+        for parts, member in sorted(entries, key=itemgetter(0)):
+            node = tree
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+            if member is None:
+                node.setdefault(parts[-1], {})
+                continue
+            length, file_pieces, root, layer = hashes[member.parts]
+            leaf = {"length": length}
+            if length:
+                leaf["pieces root"] = root
+            if length > self.piece_length:
+                self.meta["piece layers"][root] = layer
+            node[member.parts[-1]] = {"": leaf}
+            files.append({"length": length, "path": list(member.parts)})
+            if length:
+                pieces.extend(file_pieces)
+                padding = padding_file(length, self.piece_length)
+                if padding:
+                    files.append(padding)
+        if self.archive.single:
+            info["file tree"] = {self.name: tree[self.archive.name]}
+            info["length"] = self.archive.size
+        else:
+            info["file tree"] = tree
+        if hybrid:
+            info["pieces"] = pieces
+            if not self.archive.single:
+                info["files"] = files
+        return info
+
+    def _assemble_v1(self, info: dict):
+        """
+        Add the v1 file list and pieces of the archive to the info.
+
+        Parameters
+        ----------
+        info : dict
+            the info dictionary.
+        """
+        order = sorted(self.archive.members,
+                       key=lambda member: os.sep.join(member.parts))
+        if self.archive.single:
+            info["length"] = self.archive.size
+        else:
+            info["files"] = []
+            for member in order:
+                info["files"].append({
+                    "length": member.size,
+                    "path": list(member.parts)
+                })
+                if self.align and member.size < self.piece_length:
+                    remainder = self.piece_length - member.size
+                else:
+                    remainder = member.size % self.piece_length
+                if self.align and remainder:
+                    info["files"].append({
+                        "attr": "p",
+                        "length": remainder,
+                        "path": [".pad", str(remainder)],
+                    })
+        if self.align:
+            hashes = hash_members(self.archive,
+                                  self.piece_length,
+                                  backend=self.hash_backend,
+                                  progress_bar=self.prog_bar)
+            info["pieces"] = b"".join(hashes[member.parts][1]
+                                      for member in order)
+        else:
+            info["pieces"] = hash_pieces(self.archive,
+                                         order,
+                                         self.piece_length,
+                                         backend=self.hash_backend,
+                                         progress_bar=self.prog_bar)
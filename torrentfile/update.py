@@ -0,0 +1,328 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#    Copyright (C) 2021-current alexpdev
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+##############################################################################
+"""
+Reuse the hashes of a previous torrent for the same content.
+
+When only a few files of a large directory change, a new torrent can be
+created by hashing just those files and copying every other hash from the
+torrent that was created before.  A file is unchanged when the previous
+torrent lists it with the same length, and it was last modified before the
+previous torrent's creation date.  Creation dates are whole seconds, so
+files modified during the second the previous torrent was created are
+hashed again.
+
+v2 files are reused whole, along with their pieces root and piece layer.
+v1 pieces are reused when they cover exactly the same ranges of unchanged
+files as a piece of the previous torrent, so only pieces overlapping
+changed files, or files that moved to a different offset inside a piece,
+are hashed again.  The files of aligned torrents are placed on piece
+boundaries from their sizes, not from the lengths of the padding files
+listed, which older versions wrote wrong.
+
+Classes
+-------
+- `PreviousTorrent`
+    the hashes and file list of the torrent being updated.
+"""
+
+import os
+import math
+import logging
+
+import pyben
+
+from torrentfile.hasher import piece_spans
+
+logger = logging.getLogger(__name__)
+
+SHA1_SIZE = 20
+
+
+class PreviousTorrent:
+    """
+    Hashes of a previously created torrent for the same content.
+
+    Parameters
+    ----------
+    metafile : str
+        path to the previous .torrent file.
+    path : str
+        path to the content of the new torrent.
+    """
+
+    def __init__(self, metafile: str, path: str):
+        """
+        Read the previous torrent and index its files.
+        """
+        self.metafile = str(metafile)
+        meta = pyben.load(self.metafile)
+        self.info = meta["info"]
+        self.piece_layers = meta.get("piece layers", {})
+        self.piece_length = self.info["piece length"]
+        self.pieces = self.info.get("pieces", b"")
+        self.stamp = meta.get("creation date")
+        if self.stamp is None:
+            self.stamp = int(os.path.getmtime(self.metafile))
+        self.align = False
+        self.reused = 0
+        self.hashed = 0
+        # (path, length, pad) for each entry of the v1 file list
+        self.layout = []
+        self.files = {}
+        single = "length" in self.info
+        if single != os.path.isfile(path):
+            logger.debug("%s has a different layout, nothing is reused",
+                         self.metafile)
+            return
+        if single:
+            self.layout.append(((self.info["name"], ), self.info["length"],
+                                False))
+        for entry in self.info.get("files", []):
+            self.layout.append((tuple(entry["path"]), entry["length"],
+                                entry.get("attr") == "p"))
+        self.align = aligned(self.layout, self.piece_length)
+        if self.align:
+            # older aligned torrents list pads of the wrong length, the
+            # offsets are worked out from the file sizes instead.
+            self.layout = [entry for entry in self.layout if not entry[2]]
+        offset = 0
+        for parts, length, pad in self.layout:
+            if pad and length != -offset % self.piece_length:
+                logger.debug("%s has padding that does not align files, "
+                             "nothing is reused", self.metafile)
+                self.layout, self.files = [], {}
+                return
+            if not pad:
+                self.files[parts] = {"length": length, "offset": offset}
+            offset += length
+            if self.align:
+                offset += -offset % self.piece_length
+        for parts, leaf in tree_files(self.info.get("file tree", {})):
+            record = self.files.setdefault(parts, {"length": leaf["length"]})
+            record["root"] = leaf.get("pieces root")
+
+    def unchanged(self,
+                  path: str,
+                  parts: list,
+                  length: int,
+                  mtime_ns: int = None) -> bool:
+        """
+        Return True if a file has not changed since the previous torrent.
+
+        Parameters
+        ----------
+        path : str
+            path to the file.
+        parts : list
+            path of the file inside the torrent, split into components.
+        length : int
+            current size of the file.
+        mtime_ns : int
+            modification time of the file in nanoseconds, if it is known.
+
+        Returns
+        -------
+        bool
+            the previous torrent lists the file with the same length and the
+            file was not modified since the torrent was created.
+
+        Notes
+        -----
+        Creation dates are whole seconds, so a file modified during the
+        second the previous torrent was created counts as changed.
+        """
+        record = self.files.get(tuple(parts))
+        if record is None or record["length"] != length:
+            return False
+        if mtime_ns is None:
+            mtime_ns = os.stat(path).st_mtime_ns
+        return mtime_ns < self.stamp * 10**9
+
+    def v2_hashes(self,
+                  path: str,
+                  parts: list,
+                  length: int,
+                  hybrid: bool = False,
+                  mtime_ns: int = None) -> tuple:
+        """
+        Return the v2 hashes of an unchanged file.
+
+        Parameters
+        ----------
+        path : str
+            path to the file.
+        parts : list
+            path of the file inside the torrent, split into components.
+        length : int
+            current size of the file.
+        hybrid : bool
+            the v1 pieces of the file are needed too.
+        mtime_ns : int
+            modification time of the file in nanoseconds, if it is known.
+
+        Returns
+        -------
+        tuple
+            the pieces root, piece layer and v1 pieces of the file, or None
+            if the file changed or the hashes are not in the torrent.
+        """
+        if not length or not self.unchanged(path, parts, length, mtime_ns):
+            return None
+        record = self.files[tuple(parts)]
+        root = record.get("root")
+        if root is None:
+            return None
+        layer = root
+        if length > self.piece_length:
+            layer = self.piece_layers.get(root)
+            if layer is None:
+                return None
+        pieces = b""
+        if hybrid:
+            pieces = self._file_pieces(record)
+            if pieces is None:
+                return None
+        self.reused += 1
+        return root, layer, pieces
+
+    def _file_pieces(self, record: dict) -> bytes:
+        """
+        Return the v1 pieces of a piece aligned file.
+
+        Parameters
+        ----------
+        record : dict
+            the file's entry in `files`.
+
+        Returns
+        -------
+        bytes
+            the pieces of the file, or None if the previous torrent is not
+            piece aligned or has no v1 pieces.
+        """
+        offset = record.get("offset")
+        if offset is None or offset % self.piece_length:
+            return None
+        start = offset // self.piece_length * SHA1_SIZE
+        stop = start + math.ceil(
+            record["length"] / self.piece_length) * SHA1_SIZE
+        if stop > len(self.pieces):
+            return None
+        return self.pieces[start:stop]
+
+    def piece_index(self, unchanged: set) -> dict:
+        """
+        Map the pieces of the previous torrent that only cover unchanged
+        files to their hashes.
+
+        Parameters
+        ----------
+        unchanged : set
+            path components tuples of the files that have not changed.
+
+        Returns
+        -------
+        dict
+            hash of each reusable piece keyed by its `piece_key`.
+        """
+        index = {}
+        if not self.pieces:
+            return index
+        paths = [parts if not pad else None for parts, _, pad in self.layout]
+        sizes = [length for _, length, _ in self.layout]
+        spans = piece_spans(paths, sizes, self.piece_length, self.align)
+        for num, (piece, pad) in enumerate(spans):
+            pad += sum(length for parts, _, length in piece if parts is None)
+            piece = [span for span in piece if span[0] is not None]
+            if all(span[0] in unchanged for span in piece):
+                start = num * SHA1_SIZE
+                index[piece_key(piece, pad)] = self.pieces[start:start +
+                                                           SHA1_SIZE]
+        return index
+
+
+def aligned(layout: list, piece_length: int) -> bool:
+    """
+    Return True if the files of a v1 file list start on piece boundaries.
+
+    Every file but the last has to be followed by a padding file, or end
+    on a piece boundary by itself.
+
+    Parameters
+    ----------
+    layout : list
+        (path, length, pad) for each entry of the file list.
+    piece_length : int
+        size of each piece.
+
+    Returns
+    -------
+    bool
+        the file list has padding files and they align every file.
+    """
+    for num, (_, length, pad) in enumerate(layout[:-1]):
+        if not pad and length % piece_length and not layout[num + 1][2]:
+            return False
+    return any(pad for _, _, pad in layout)
+
+
+def piece_key(spans: list, pad: int = 0) -> tuple:
+    """
+    Return a key identifying the contents of a v1 piece.
+
+    Two pieces made of the same ranges of the same unchanged files, with
+    the same padding, have the same hash.
+
+    Parameters
+    ----------
+    spans : list
+        (path components, offset, length) spans of the piece.
+    pad : int
+        number of zero bytes padding the piece.
+
+    Returns
+    -------
+    tuple
+        the key.
+    """
+    return tuple((tuple(parts), offset, length)
+                 for parts, offset, length in spans), pad
+
+
+def tree_files(tree: dict, parts: tuple = ()):
+    """
+    Yield the files of a v2 file tree.
+
+    Parameters
+    ----------
+    tree : dict
+        the file tree, or a directory inside it.
+    parts : tuple
+        path components of the directory.
+
+    Yields
+    ------
+    tuple
+        path components and file tree leaf of each file.
+    """
+    for name, value in tree.items():
+        if name == "":
+            yield parts, value
+        else:
+            yield from tree_files(value, parts + (name, ))
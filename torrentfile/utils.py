@@ -22,12 +22,22 @@ Utility functions and classes used throughout package.
 
 import os
 import math
+import stat
 import ctypes
 import shutil
 import platform
-from typing import Callable, Any, Tuple, List
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from operator import attrgetter, itemgetter
+from typing import Callable, Any, Tuple, List, NamedTuple
 from pathlib import Path
 
+WALKERS_ENV = "TORRENTFILE_WALKERS"
+MAX_WALKERS = 64
+
 if platform.system() == "Windows":  # pragma: nocover
     kernel32 = ctypes.windll.kernel32
     kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7)
@@ -35,21 +45,42 @@ if platform.system() == "Windows":  # pragma: nocover
 
 class Memo:
     """
-    Memoize cache.
+    Bounded least recently used cache of the results of a path function.
+
+    Results are keyed on the path and its modification time, so adding,
+    removing or renaming the entries of a directory, or changing a file,
+    makes its result stale.  Changes deeper inside a directory do not
+    change its modification time, call `clear` after making them.  At most
+    `maxsize` results are kept, the least recently used is evicted first.
 
     Parameters
     ----------
     func : Callable
         The results of this callable will be cached.
+    maxsize : int
+        maximum number of results kept, 0 disables caching.
+
+    Attributes
+    ----------
+    hits : int
+        number of calls answered from the cache.
+    misses : int
+        number of calls that ran the function.
+    evictions : int
+        number of results removed to stay within maxsize.
     """
 
-    def __init__(self, func: Callable) -> None:
+    def __init__(self, func: Callable, maxsize: int = 16) -> None:
         """
         Construct cache.
         """
         self.func = func
-        self.counter = 0
-        self.cache = {}
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
 
     def __call__(self, path: str) -> Any:
         """
@@ -65,13 +96,61 @@ class Memo:
         Any :
             The results of calling the function with path.
         """
-        if path in self.cache and os.path.exists(path):
-            self.counter += 1
-            return self.cache[path]
+        path = os.fspath(path)
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            # missing paths are left to the function to report
+            return self.func(path)
+        with self.lock:
+            if key in self.cache:
+                self.hits += 1
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            self.misses += 1
         result = self.func(path)
-        self.cache[path] = result
+        if not self.maxsize:
+            return result
+        with self.lock:
+            for stale in [other for other in self.cache if other[0] == path]:
+                del self.cache[stale]
+            self.cache[key] = result
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+                self.evictions += 1
         return result
 
+    @property
+    def counter(self) -> int:
+        """
+        Return the number of cache hits.
+        """
+        return self.hits
+
+    def clear(self):
+        """
+        Remove every cached result, the counters are kept.
+        """
+        with self.lock:
+            self.cache.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns
+        -------
+        dict
+            hits, misses, evictions and the number of cached results.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.cache),
+            }
+
 
 class MissingPathError(Exception):
     """
@@ -255,17 +334,371 @@ def _filelist_total(path: os.PathLike) -> Tuple[int, List[str]]:
         int - sum of sizes for all files collected
         list - all file paths within directory tree
     """
-    if path.is_file():
-        file_size = os.path.getsize(path)
-        return file_size, [str(path)]
-    total = 0
-    filelist = []
-    if path.is_dir():
-        for item in path.iterdir():
-            size, paths = filelist_total(item)
-            total += size
-            filelist.extend(paths)
-    return total, sorted(filelist)
+    manifest = FileManifest(str(path))
+    filelist = [manifest.path(index) for index in manifest.sorted()]
+    return manifest.size, filelist
+
+
+class FileStat(NamedTuple):
+    """
+    The parts of a file's status a `FileManifest` keeps.
+
+    Parameters
+    ----------
+    st_dev : int
+        device the file is on.
+    st_ino : int
+        inode number.
+    st_size : int
+        size in bytes.
+    st_mtime_ns : int
+        modification time in nanoseconds.
+    """
+
+    st_dev: int
+    st_ino: int
+    st_size: int
+    st_mtime_ns: int
+
+
+class FileManifest:
+    """
+    The files below a path, found in a single `os.scandir` walk.
+
+    Each file is stat'ed exactly once, its relative path, size,
+    modification time, device and inode are kept in parallel arrays, so
+    the torrent classes, hashers, cache and journal never stat it again.
+    Files are in the order of a recursive walk visiting the names of each
+    directory sorted, which is the order of a v2 file tree.
+
+    Directories can be listed by a pool of threads, which hides the
+    latency of network filesystems.  The files they find are sorted once
+    when the walk is done, into the same order as a walk on one thread.
+
+    Parameters
+    ----------
+    path : str
+        file or directory.
+    walkers : int
+        number of threads listing directories, see `walk_workers`.
+
+    Attributes
+    ----------
+    root : str
+        the path.
+    single : bool
+        path is a file rather than a directory.
+    relpaths : list
+        path of each file relative to root, the file's name when single.
+    sizes : array
+        size of each file.
+    mtimes : array
+        modification time of each file in nanoseconds.
+    devices : array
+        device of each file.
+    inodes : array
+        inode of each file.
+    empty : list
+        (number of files before it, relative path) of every directory
+        without files, and every entry that is neither file nor directory.
+    size : int
+        total size of the files.
+
+    Raises
+    ------
+    MissingPathError
+        path does not exist.
+    """
+
+    def __init__(self, path: str, walkers: int = None):
+        """
+        Walk path and record every file found.
+        """
+        self.root = str(path)
+        self.relpaths = []
+        self.sizes = array("q")
+        self.mtimes = array("q")
+        self.devices = array("Q")
+        self.inodes = array("Q")
+        self.empty = []
+        try:
+            status = os.stat(self.root)
+        except (FileNotFoundError, NotADirectoryError) as err:
+            raise MissingPathError(self.root) from err
+        self.single = stat.S_ISREG(status.st_mode)
+        if self.single:
+            self._record([os.path.basename(self.root)],
+                         [(status.st_size, status.st_mtime_ns, status.st_dev,
+                           status.st_ino)])
+        elif stat.S_ISDIR(status.st_mode):
+            self._scan(walk_workers(walkers))
+        self.size = sum(self.sizes)
+
+    def _record(self, relpaths: list, records: list):
+        """
+        Record files in order from their `_file_record` tuples.
+        """
+        self.relpaths = relpaths
+        self.sizes = array("q", [record[0] for record in records])
+        self.mtimes = array("q", [record[1] for record in records])
+        self.devices = array("Q", [record[2] for record in records])
+        self.inodes = array("Q", [record[3] for record in records])
+
+    def _scan(self, walkers: int):
+        """
+        List every directory below root and record the files in order.
+        """
+        if walkers == 1:
+            relpaths, records = [], []
+            self._scan_dir(self.root, "", relpaths, records)
+            self._record(relpaths, records)
+            return
+        files, dirs, others = [], [], []
+        with ThreadPoolExecutor(max_workers=walkers) as pool:
+            pending = {pool.submit(_list_dir, self.root, ())}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    found, subdirs, other = future.result()
+                    files.extend(found)
+                    others.extend(other)
+                    for dirpath, parts in subdirs:
+                        dirs.append(parts)
+                        pending.add(pool.submit(_list_dir, dirpath, parts))
+        # comparing path components orders files like a sorted recursive walk
+        files.sort(key=itemgetter(0))
+        file_parts = [item[0] for item in files]
+        self._record([os.sep.join(parts) for parts in file_parts],
+                     [item[1] for item in files])
+        filled = set()
+        for parts in file_parts:
+            parent = parts[:-1]
+            while parent and parent not in filled:
+                filled.add(parent)
+                parent = parent[:-1]
+        empty = [parts for parts in dirs if parts not in filled] + others
+        # a directory comes after everything inside it, like in the walk
+        empty.sort(key=lambda parts: tuple((0, part) for part in parts) +
+                   ((1, ), ))
+        self.empty = [(bisect_left(file_parts, parts), os.sep.join(parts))
+                      for parts in empty]
+
+    def _scan_dir(self, dirpath: str, prefix: str, relpaths: list,
+                  records: list):
+        """
+        Record the files below a directory in order, on this thread.
+        """
+        with os.scandir(dirpath) as entries:
+            entries = sorted(entries, key=attrgetter("name"))
+        for entry in entries:
+            relpath = prefix + entry.name
+            count = len(relpaths)
+            if entry.is_file():
+                relpaths.append(relpath)
+                records.append(_file_record(entry))
+                continue
+            if entry.is_dir():
+                self._scan_dir(entry.path, relpath + os.sep, relpaths,
+                               records)
+            else:
+                _check_exists(entry)
+            if count == len(relpaths):
+                self.empty.append((count, relpath))
+
+    def __len__(self) -> int:
+        """
+        Return the number of files.
+        """
+        return len(self.relpaths)
+
+    def path(self, index: int) -> str:
+        """
+        Return the path to a file.
+
+        Parameters
+        ----------
+        index : int
+            position of the file.
+
+        Returns
+        -------
+        str
+            root joined with the file's relative path.
+        """
+        if self.single:
+            return self.root
+        return os.path.join(self.root, self.relpaths[index])
+
+    def parts(self, index: int) -> list:
+        """
+        Return the path of a file inside the torrent split into parts.
+
+        Parameters
+        ----------
+        index : int
+            position of the file.
+
+        Returns
+        -------
+        list
+            path components relative to root.
+        """
+        return self.relpaths[index].split(os.sep)
+
+    def stat(self, index: int) -> FileStat:
+        """
+        Return the status of a file recorded by the walk.
+
+        Parameters
+        ----------
+        index : int
+            position of the file.
+
+        Returns
+        -------
+        FileStat
+            device, inode, size and modification time.
+        """
+        return FileStat(self.devices[index], self.inodes[index],
+                        self.sizes[index], self.mtimes[index])
+
+    def sorted(self) -> list:
+        """
+        Return the positions of the files sorted by path.
+
+        This is the order of the files of v1 torrents.
+
+        Returns
+        -------
+        list
+            positions of the files.
+        """
+        return sorted(range(len(self.relpaths)),
+                      key=self.relpaths.__getitem__)
+
+    def file_tree(self, leaves: list) -> dict:
+        """
+        Build a v2 file tree from the leaf of each file.
+
+        Parameters
+        ----------
+        leaves : list
+            file tree leaf of each file, in the order of the files.
+
+        Returns
+        -------
+        dict
+            the file tree, keys in the order of a sorted walk.
+        """
+        tree = {}
+        empty = iter(self.empty + [(len(leaves), None)])
+        position, relpath = next(empty)
+        for index, leaf in enumerate(leaves):
+            while position == index and relpath is not None:
+                _insert(tree, relpath.split(os.sep), {})
+                position, relpath = next(empty)
+            _insert(tree, self.parts(index), {"": leaf})
+        while relpath is not None:
+            _insert(tree, relpath.split(os.sep), {})
+            position, relpath = next(empty)
+        return tree
+
+
+def _list_dir(dirpath: str, parts: tuple) -> tuple:
+    """
+    List the entries of a single directory.
+
+    Parameters
+    ----------
+    dirpath : str
+        path to the directory.
+    parts : tuple
+        path components of the directory relative to the walk's root.
+
+    Returns
+    -------
+    tuple
+        components and `_file_record` of each file, (path, components)
+        of each subdirectory and the components of every other entry.
+
+    Raises
+    ------
+    MissingPathError
+        an entry is a link to a missing path.
+    """
+    files, subdirs, others = [], [], []
+    with os.scandir(dirpath) as entries:
+        for entry in entries:
+            child = parts + (entry.name, )
+            if entry.is_file():
+                files.append((child, _file_record(entry)))
+            elif entry.is_dir():
+                subdirs.append((entry.path, child))
+            else:
+                _check_exists(entry)
+                others.append(child)
+    return files, subdirs, others
+
+
+def _file_record(entry: os.DirEntry) -> tuple:
+    """
+    Return the size, modification time, device and inode of a file.
+    """
+    status = entry.stat()
+    if not status.st_ino:  # pragma: nocover
+        # scandir leaves the device and inode out on Windows
+        status = os.stat(entry.path)
+    return (status.st_size, status.st_mtime_ns, status.st_dev, status.st_ino)
+
+
+def _check_exists(entry: os.DirEntry):
+    """
+    Raise MissingPathError for a link to a missing path.
+    """
+    if not os.path.exists(entry.path):
+        raise MissingPathError(entry.path)
+
+
+def walk_workers(walkers: int = None) -> int:
+    """
+    Return the number of threads listing directories in a walk.
+
+    When walkers is not given the `TORRENTFILE_WALKERS` environment
+    variable is used, then 1.  The result is kept between 1 and
+    `MAX_WALKERS`.
+
+    Parameters
+    ----------
+    walkers : int
+        requested number of threads.
+
+    Returns
+    -------
+    int
+        number of threads.
+
+    Raises
+    ------
+    ArgumentError
+        the environment variable is not a whole number.
+    """
+    if not walkers:
+        walkers = os.environ.get(WALKERS_ENV) or 1
+        try:
+            walkers = int(walkers)
+        except ValueError as err:
+            raise ArgumentError(f"{WALKERS_ENV} must be a whole number, "
+                                f"not {walkers!r}") from err
+    return min(max(int(walkers), 1), MAX_WALKERS)
+
+
+def _insert(tree: dict, parts: list, value: dict):
+    """
+    Insert value into a nested file tree at the path parts.
+    """
+    for part in parts[:-1]:
+        tree = tree.setdefault(part, {})
+    tree.setdefault(parts[-1], value)
 
 
 def path_size(path: str) -> int: